@@ -22,7 +22,7 @@ except ImportError:
     from pip._internal import main as pipmain  # pip 10
 
 import troposphere
-from troposphere import Template, awslambda, logs, Sub, Output, Export, GetAtt, constants
+from troposphere import Template, awslambda, dynamodb, iam, logs, s3, Sub, Output, Export, GetAtt, constants
 from custom_resources.LambdaBackedCustomResource import LambdaBackedCustomResource
 
 parser = argparse.ArgumentParser(description='Build custom resources CloudForamtion template')
@@ -32,6 +32,12 @@ parser.add_argument('--lambda-dir', help='Where to look for defined Lambda funct
                     default='lambda_code')
 parser.add_argument('--output-dir', help='Where to place the Zip-files and the CloudFormation template',
                     default='output')
+parser.add_argument('--runtime-dir', help='Shared runtime package to include in every Lambda ZIP file',
+                    default=os.path.join('lambda_code', '_runtime'))
+parser.add_argument('--instrument-aws-calls', help='Log a summary of the AWS API calls of every invocation',
+                    action='store_true')
+parser.add_argument('--shared-lookup-cache', help='Create a store to share cached lookups between all functions',
+                    choices=['none', 'dynamodb', 's3'], default='none')
 
 args = parser.parse_args()
 
@@ -56,6 +62,68 @@ template.set_parameter_label(s3_path, "S3 path")
 template.add_parameter_to_group(s3_path, lambda_code_location)
 
 
+def add_shared_lookup_cache(template: Template, kind: str) -> typing.Tuple[dict, dict]:
+    """
+    Add the store for the shared tier of `_runtime.cache` to the template.
+
+    :return: the environment variables and the IAM policy document for the
+             functions using the cache
+    """
+    if kind == 'dynamodb':
+        table = template.add_resource(dynamodb.Table(
+            "LookupCacheTable",
+            BillingMode="PAY_PER_REQUEST",
+            AttributeDefinitions=[
+                dynamodb.AttributeDefinition(AttributeName="CacheKey", AttributeType="S"),
+            ],
+            KeySchema=[
+                dynamodb.KeySchema(AttributeName="CacheKey", KeyType="HASH"),
+            ],
+            TimeToLiveSpecification=dynamodb.TimeToLiveSpecification(
+                AttributeName="ExpiresAt",
+                Enabled=True,
+            ),
+        ))
+        return {'LOOKUP_CACHE_TABLE': troposphere.Ref(table)}, {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "dynamodb:GetItem",
+                    "dynamodb:PutItem",
+                    "dynamodb:DeleteItem",
+                ],
+                "Resource": GetAtt(table, 'Arn'),
+            }],
+        }
+
+    if kind == 's3':
+        bucket = template.add_resource(s3.Bucket(
+            "LookupCacheBucket",
+            LifecycleConfiguration=s3.LifecycleConfiguration(Rules=[
+                s3.LifecycleRule(Status="Enabled", ExpirationInDays=1),
+            ]),
+        ))
+        return {'LOOKUP_CACHE_BUCKET': troposphere.Ref(bucket), 'LOOKUP_CACHE_PREFIX': 'lookup-cache/'}, {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "s3:GetObject",
+                    "s3:PutObject",
+                    "s3:DeleteObject",
+                ],
+                "Resource": Sub("${Bucket.Arn}/lookup-cache/*", Bucket=troposphere.Ref(bucket)),
+            }, {
+                "Effect": "Allow",
+                "Action": "s3:ListBucket",  # Get a 404 instead of a 403 for missing keys
+                "Resource": GetAtt(bucket, 'Arn'),
+            }],
+        }
+
+    return {}, None
+
+
 def rec_split_path(path: str) -> typing.List[str]:
     """
     Split a path in its components.
@@ -157,7 +225,19 @@ def run_pip(*args):
     )
 
 
-def create_zip_file(custom_resource: CustomResource, output_dir: str):
+def add_environment_variables(function_settings: dict, variables: typing.Dict[str, str]) -> dict:
+    """
+    Add environment variables to the Lambda function settings, keeping the existing ones.
+    """
+    environment = function_settings.get('Environment')
+    if environment is None:
+        environment = awslambda.Environment(Variables={})
+        function_settings['Environment'] = environment
+    environment.properties.setdefault('Variables', {}).update(variables)
+    return function_settings
+
+
+def create_zip_file(custom_resource: CustomResource, output_dir: str, runtime_dir: str):
     dot_joined_resource_name = '.'.join(custom_resource.name)
 
     print("Creating ZIP for resource {}".format(dot_joined_resource_name))
@@ -202,6 +282,13 @@ def create_zip_file(custom_resource: CustomResource, output_dir: str):
                 )
             ))
 
+        # Add the shared runtime package
+        shutil.copytree(
+            runtime_dir,
+            os.path.join(pip_dir, os.path.basename(runtime_dir)),
+            ignore=shutil.ignore_patterns('test', '__pycache__'),
+        )
+
         # Add installed/generated files to list to include in ZIP
         entries.update(set(os.scandir(pip_dir)))
 
@@ -241,16 +328,31 @@ except FileExistsError:
 sys.path.insert(0, os.path.dirname(args.class_dir))
 importlib.import_module(os.path.basename(args.class_dir))
 
+lookup_cache_environment, lookup_cache_policy = add_shared_lookup_cache(template, args.shared_lookup_cache)
+
 for custom_resource in defined_custom_resources(args.lambda_dir, args.class_dir):
     custom_resource_name_cfn = custom_resource.troposphere_class.cloudformation_name(
         custom_resource.troposphere_class.name()
     )
 
-    zip_filename = create_zip_file(custom_resource, args.output_dir)
+    zip_filename = create_zip_file(custom_resource, args.output_dir, args.runtime_dir)
+
+    function_settings = custom_resource.troposphere_class.function_settings()
+    if args.instrument_aws_calls:
+        add_environment_variables(function_settings, {'AWS_CALL_INSTRUMENTATION': 'true'})
 
-    role = template.add_resource(custom_resource.troposphere_class.lambda_role(
+    role = custom_resource.troposphere_class.lambda_role(
         "{custom_resource_name}Role".format(custom_resource_name=custom_resource_name_cfn),
-    ))
+    )
+
+    if custom_resource.troposphere_class._uses_lookup_cache and lookup_cache_policy is not None:
+        add_environment_variables(function_settings, lookup_cache_environment)
+        role.Policies.append(iam.Policy(
+            PolicyName='LookupCache',
+            PolicyDocument=lookup_cache_policy,
+        ))
+
+    role = template.add_resource(role)
     awslambdafunction = template.add_resource(awslambda.Function(
         "{custom_resource_name}Function".format(custom_resource_name=custom_resource_name_cfn),
         Code=awslambda.Code(
@@ -259,7 +361,7 @@ for custom_resource in defined_custom_resources(args.lambda_dir, args.class_dir)
                                         zip_filename]),
         ),
         Role=GetAtt(role, 'Arn'),
-        **custom_resource.troposphere_class.function_settings()
+        **function_settings
     ))
     template.add_resource(logs.LogGroup(
         "{custom_resource_name}Logs".format(custom_resource_name=custom_resource_name_cfn),
@@ -18,6 +18,7 @@ class LambdaBackedCustomResource(CustomResource):
     """
     _deprecated = False  # Unix epoch time (integer) of deprecation
     _deprecated_message = ''  # arbitrary string explaining the upgrade path
+    _uses_lookup_cache = False  # Set to True if the lambda code uses `_runtime.cache`
 
     def __init__(self, *args, **kwargs):
         self.resource_type = "Custom::" + self.custom_resource_name(self.name())
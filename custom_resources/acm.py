@@ -1,3 +1,5 @@
+import warnings
+
 from six import string_types
 from troposphere import Tags
 
@@ -9,9 +11,23 @@ class DnsValidatedCertificate(LambdaBackedCustomResource):
         'DomainName': (string_types, True),
         'SubjectAlternativeNames': ([string_types], False),
         'Region': (string_types, False),  # Default: current region
+        'Regions': ([string_types], False),  # Request the certificate(s) in all of these regions, instead of Region
+        'MaxNamesPerCertificate': (int, False),  # Split the names over several certificates. Default: don't split
         'Tags': (Tags, False),
+        'WaitForIssued': (bool, False),  # Wait until the certificates are ISSUED, see the lambda code
     }
 
+    def validate(self):
+        if self.properties.get('WaitForIssued') is True:
+            # The template isn't known here, so warn instead of checking
+            warnings.warn(
+                "{}: WaitForIssued waits for the DNS validation records. When they are created in the same "
+                "stack, from the DnsRecords attribute, they are only created after the wait: the stack hangs "
+                "until the wait times out. Only use it when the records are created outside of the stack.".format(
+                    self.title),
+                stacklevel=2,
+            )
+
     @classmethod
     def _update_lambda_settings(cls, settings):
         # It can take a while before the DNS-entries are generated and visible
@@ -32,6 +48,7 @@ class DnsValidatedCertificate(LambdaBackedCustomResource):
                     "acm:ListTagsForCertificate",
                     "acm:RemoveTagsFromCertificate",
                     "cloudformation:DescribeStacks",  # Read tags
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
                 ],
                 "Resource": "*",
             }],
@@ -8,11 +8,21 @@ class Renotify(LambdaBackedCustomResource):
     Re-trigger the AutoScalingGroup Notification.
 
     Useful to include with additional "DependsOn" resources.
+
+    Every notification configuration of the AutoScalingGroup(s) gets a message
+    with the current details of the group. Topics are published to
+    concurrently, using PublishBatch for several messages to the same topic.
     """
     props = {
-        'AutoScalingGroupName': (string_types, True),
+        'AutoScalingGroupName': (string_types, False),
+        'AutoScalingGroupNames': ([string_types], False),  # Renotify several groups at once
     }
 
+    def validate(self):
+        if ('AutoScalingGroupName' in self.properties) == ('AutoScalingGroupNames' in self.properties):
+            raise TypeError("{}: exactly one of AutoScalingGroupName and AutoScalingGroupNames is required".format(
+                self.__class__.__name__))
+
     @classmethod
     def _lambda_policy(cls):
         return {
@@ -20,6 +30,7 @@ class Renotify(LambdaBackedCustomResource):
             "Statement": [{
                 "Effect": "Allow",
                 "Action": [
+                    "autoscaling:DescribeAutoScalingGroups",
                     "autoscaling:DescribeNotificationConfigurations",
                     "sns:Publish",
                 ],
@@ -4,13 +4,30 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class Version(LambdaBackedCustomResource):
+    """
+    Publish a version of a Lambda function.
+
+    Nothing is published when the newest version already has the same code
+    and configuration. With Retain, older versions that are not used by an
+    alias are deleted, keeping the newest N (including this one). The version
+    is then not deleted with the resource, so it stays available for rollbacks.
+
+    Attributes: Version (number) and CodeSha256.
+    """
     props = {
         'FunctionName': (string_types, True),
         'Description': (string_types, False),
         'CodeSha256': (string_types, False),
         'Dummy': (string_types, False),  # Dummy parameter to trigger updates
+        'Retain': (int, False),  # Number of newest versions to keep. Default: don't delete older versions
     }
 
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        # Pruning may delete many versions
+        settings['Timeout'] = 60
+        return settings
+
     @classmethod
     def _lambda_policy(cls):
         return {
@@ -19,6 +36,7 @@ class Version(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "lambda:ListVersionsByFunction",
+                    "lambda:ListAliases",
                     "lambda:PublishVersion",
                     "lambda:DeleteFunction",  # Yes, you need to DeleteFunction("func:version") to delete a version
                 ],
@@ -33,3 +51,46 @@ class Version(LambdaBackedCustomResource):
         """
         # Keep legacy non-structured name for backward compatibility
         return ['LambdaVersion']
+
+
+class ProvisionedConcurrencyAlias(LambdaBackedCustomResource):
+    """
+    Alias with provisioned concurrency, that waits until the capacity is
+    READY, so functions don't start cold right after a deploy. Typically
+    pointed at the Version attribute of a Version resource.
+
+    Attributes: Arn, FunctionVersion and Status.
+    """
+    props = {
+        'FunctionName': (string_types, True),
+        'FunctionVersion': (string_types, True),
+        'Name': (string_types, True),
+        'Description': (string_types, False),
+        'ProvisionedConcurrentExecutions': (int, True),  # 0 to remove the provisioned concurrency
+        'WaitForReady': (bool, False),  # Default: true
+    }
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        # Allocating capacity takes minutes; longer waits continue in a new invocation
+        settings['Timeout'] = 300
+        return settings
+
+    @classmethod
+    def _lambda_policy(cls):
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "lambda:CreateAlias",
+                    "lambda:UpdateAlias",
+                    "lambda:DeleteAlias",
+                    "lambda:PutProvisionedConcurrencyConfig",
+                    "lambda:GetProvisionedConcurrencyConfig",
+                    "lambda:DeleteProvisionedConcurrencyConfig",
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
+                ],
+                "Resource": "*",
+            }],
+        }
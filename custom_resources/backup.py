@@ -36,7 +36,7 @@ class BackupVault(LambdaBackedCustomResource):
 class BackupPlan(LambdaBackedCustomResource):
     props = {
         'BackupPlan': (dict, True),
-        'BackupPlanTags ': (Tags, False),
+        'BackupPlanTags': (dict, False),
     }
 
     @classmethod
@@ -49,6 +49,8 @@ class BackupPlan(LambdaBackedCustomResource):
                     "backup:CreateBackupPlan",
                     "backup:DeleteBackupPlan",
                     "backup:UpdateBackupPlan",
+                    "backup:TagResource",
+                    "backup:UntagResource",
                 ],
                 "Resource": "*",
             }],
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import time
 
 from six import string_types
@@ -14,19 +16,36 @@ class Tags(LambdaBackedCustomResource):
     Caveat: Some resources fail when no tags are present. It is advisable to
     always configure a tag to be added (via Set={"foo":"bar"}) to avoid this
     case.
+
+    By default, a new Dummy value is generated every time the template is
+    generated, so the tags are looked up again on every stack update (which
+    also updates every resource that uses them). To only refresh when the
+    stack tags change, pass a RefreshTrigger that changes along with them,
+    e.g. a template parameter set to `Tags.refresh_trigger(stack_tags)` by
+    the deploy tooling. Unchanged tags result in identical attributes.
     """
     props = {
         'Omit': ([string_types], False),  # Keys to remove from list
         'Set': (dict, False),  # Keys to set/override/add, with the new values
         'Dummy': (string_types, False),  # Dummy parameter to trigger updates
+        'RefreshTrigger': (string_types, False),  # Look up the tags again when this changes, instead of always
     }
 
     def __init__(self, *args, **kwargs):
-        if 'Dummy' not in kwargs:
+        if 'Dummy' not in kwargs and 'RefreshTrigger' not in kwargs:
             kwargs['Dummy'] = str(time.time())  # Force refresh as much as possible
 
         super(Tags, self).__init__(*args, **kwargs)
 
+    @staticmethod
+    def refresh_trigger(stack_tags):
+        """
+        Deterministic RefreshTrigger value for the given stack tags ({key: value}),
+        independent of their order.
+        """
+        normalized = json.dumps(stack_tags, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
     @classmethod
     def _lambda_policy(cls):
         return {
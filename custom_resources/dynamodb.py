@@ -6,6 +6,8 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 class JoinGlobalTable(LambdaBackedCustomResource):
     props = {
         'TableName': (string_types, True),
+        'Regions': ([string_types], False),  # Join all these regions, instead of the current region
+        'GlobalTableVersion': (string_types, False),  # With Regions: "2017.11.29" (default) or "2019.11.21"
     }
 
     @classmethod
@@ -17,6 +19,22 @@ class JoinGlobalTable(LambdaBackedCustomResource):
                 "Action": [
                     "dynamodb:CreateGlobalTable",
                     "dynamodb:UpdateGlobalTable",
+                    "dynamodb:DescribeGlobalTable",
+                    "dynamodb:DescribeTable",
+                    "dynamodb:UpdateTable",
+                    # Needed by UpdateTable to manage 2019.11.21 replicas:
+                    "dynamodb:CreateTable",
+                    "dynamodb:CreateTableReplica",
+                    "dynamodb:DeleteTableReplica",
+                    "dynamodb:Scan",
+                    "dynamodb:Query",
+                    "dynamodb:UpdateItem",
+                    "dynamodb:PutItem",
+                    "dynamodb:GetItem",
+                    "dynamodb:DeleteItem",
+                    "dynamodb:BatchWriteItem",
+                    "iam:CreateServiceLinkedRole",
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
                 ],
                 "Resource": "*",
             }],
@@ -24,7 +42,7 @@ class JoinGlobalTable(LambdaBackedCustomResource):
 
     @classmethod
     def _update_lambda_settings(cls, settings):
-        settings['Timeout'] = 60  # Default timeout of 3 seconds is not always long enough.
+        settings['Timeout'] = 300  # Waits for the replicas to become ACTIVE
         return settings
 
     @classmethod
@@ -43,6 +61,8 @@ class Item(LambdaBackedCustomResource):
         'ItemKey': (dict, True),
         'ItemValue': (dict, False),
         'Overwrite': (bool, False),
+        'UpdateMode': (string_types, False),  # "put" (default) or "diff": only update changed attributes
+        'ConditionOnOldValues': (bool, False),  # With "diff": fail if the attributes were modified by others
     }
 
     @classmethod
@@ -54,7 +74,46 @@ class Item(LambdaBackedCustomResource):
                 "Action": [
                     "dynamodb:DeleteItem",
                     "dynamodb:PutItem",
+                    "dynamodb:UpdateItem",
                 ],
                 "Resource": "*",
             }],
         }
+
+
+class Items(LambdaBackedCustomResource):
+    props = {
+        'Region': (string_types, False),
+        'TableName': (string_types, True),
+        'Items': ([dict], False),  # Full items (key and value), in DynamoDB JSON
+        'ItemsS3Bucket': (string_types, False),  # Alternative to Items: JSON Lines object in S3
+        'ItemsS3Key': (string_types, False),
+        'ItemsS3VersionId': (string_types, False),  # Needed to delete removed items on update
+    }
+
+    def validate(self):
+        if bool('Items' in self.properties) == bool('ItemsS3Bucket' in self.properties):
+            raise TypeError("{}: specify either Items or ItemsS3Bucket/ItemsS3Key".format(self.__class__.__name__))
+        if bool('ItemsS3Bucket' in self.properties) != bool('ItemsS3Key' in self.properties):
+            raise TypeError("{}: ItemsS3Bucket and ItemsS3Key go together".format(self.__class__.__name__))
+
+    @classmethod
+    def _lambda_policy(cls):
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "dynamodb:BatchWriteItem",
+                    "dynamodb:DescribeTable",
+                    "s3:GetObject",
+                    "s3:GetObjectVersion",
+                ],
+                "Resource": "*",
+            }],
+        }
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        settings['Timeout'] = 300  # Large item sets take many BatchWriteItem calls
+        return settings
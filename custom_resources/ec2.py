@@ -4,21 +4,34 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class FindAmi(LambdaBackedCustomResource):
+    _uses_lookup_cache = True
+
     props = {
         'Region': (string_types, False),  # Default: current region
-        'Name': (string_types, True),  # Like: "amzn-ami-minimal-hvm*"
+        'Regions': ([string_types], False),  # Resolve in all of these regions, instead of Region
+        'AllowPartialFailure': (bool, False),  # With Regions: succeed if at least one region resolved
+        'SsmParameter': (string_types, False),  # Like: "/aws/service/ami-amazon-linux-latest/..."
+        'Alias': (string_types, False),  # Like: "amazon-linux-2023", see ALIASES in the lambda code
+        'Name': (string_types, False),  # Like: "amzn-ami-minimal-hvm*"; required unless SsmParameter or Alias
         'OwnerAlias': (string_types, False),
         'OwnerId': (string_types, False),
         'Architecture': (string_types, False),  # Defaults to: "x86_64",
         'DeviceType': (string_types, False),  # Defaults to: "ebs",
         'VirtualizationType': (string_types, False),  # Defaults to: "hvm",
         'State': (string_types, False),  # Defaults to: 'available',
+        'BypassCache': (bool, False),  # Don't use a cached lookup result
         'Dummy': (string_types, False),  # Dummy parameter to trigger updates
     }
 
+    def validate(self):
+        sources = [key for key in ('SsmParameter', 'Alias', 'Name') if key in self.properties]
+        if len(sources) != 1:
+            raise TypeError("{}: exactly one of SsmParameter, Alias and Name is required".format(
+                self.__class__.__name__))
+
     @classmethod
     def _update_lambda_settings(cls, settings):
-        # Although I don't understand why, this Lambda sometimes needs more than 3 seconds to run
+        # Broad Name filters return thousands of images over several pages
         settings['Timeout'] = 30
         return settings
 
@@ -30,6 +43,7 @@ class FindAmi(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "ec2:DescribeImages",
+                    "ssm:GetParameter",
                 ],
                 "Resource": "*",
             }],
@@ -47,6 +61,7 @@ class FindAmi(LambdaBackedCustomResource):
 class StartedWaiter(LambdaBackedCustomResource):
     props = {
         'InstanceIds': ((string_types, list), True),
+        'WaitForStatusChecks': (bool, False),  # Also wait for the status checks to pass
     }
 
     @classmethod
@@ -4,6 +4,8 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class SolutionStackName(LambdaBackedCustomResource):
+    _uses_lookup_cache = True
+
     props = {
         'Platform': (string_types, True),  # PHP 7.0
         'Architecture': (string_types, False),  # Defaults to 64bit
@@ -12,6 +14,7 @@ class SolutionStackName(LambdaBackedCustomResource):
         'EbMinorVersion': (int, False),  # Defaults to None (any)
         'EbPatchVersion': (int, False),  # Defaults to None (any)
         'Serial': (string_types, False),  # Use this to force an update
+        'BypassCache': (bool, False),  # Don't use a cached lookup result
     }
 
     @classmethod
@@ -27,11 +30,26 @@ class SolutionStackName(LambdaBackedCustomResource):
 
 
 class EnvironmentResources(LambdaBackedCustomResource):
+    """
+    Names (or IDs) of the resources of one or more Elastic Beanstalk
+    environments, see the lambda code for the attributes.
+    """
+    _uses_lookup_cache = True
+
     props = {
-        'EnvironmentId': (string_types, True),  # Ref(eb_environment)
+        'EnvironmentId': (string_types, False),  # Ref(eb_environment)
+        'EnvironmentIds': ([string_types], False),  # Instead of EnvironmentId
+        'EnvironmentNames': ([string_types], False),  # Instead of EnvironmentId
         'Serial': (string_types, False),  # Use this to force an update
+        'BypassCache': (bool, False),  # Don't use a cached lookup result
     }
 
+    def validate(self):
+        sources = [key for key in ('EnvironmentId', 'EnvironmentIds', 'EnvironmentNames') if key in self.properties]
+        if len(sources) != 1:
+            raise TypeError("{}: exactly one of EnvironmentId, EnvironmentIds and EnvironmentNames is required".format(
+                self.__class__.__name__))
+
     @classmethod
     def _lambda_policy(cls):
         return {
@@ -5,17 +5,31 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 class NlbSourceIps(LambdaBackedCustomResource):
     """
-    Gets the source IPs of the given Network Load Balancer
+    Gets the source IPs of the given Network Load Balancer(s)
 
     Return Attributes:
         "IPv4Addresses": ["192.0.2.1", "192.0.2.2"]
         "IPv4Address0": "192.0.2.1"
         "IPv4Address1": "192.0.2.2"
+        "IPv6Addresses", "IPv6Address0", ...: same for IPv6, if any
+
+    With LoadBalancerArns, these are the combined addresses of all NLBs, and
+    the addresses per NLB are prefixed with its name, e.g.
+    "my-nlb.IPv4Addresses".
     """
+    _uses_lookup_cache = True
+
     props = {
-        'LoadBalancerArn': (string_types, True),
+        'LoadBalancerArn': (string_types, False),
+        'LoadBalancerArns': ([string_types], False),  # Instead of LoadBalancerArn
+        'BypassCache': (bool, False),  # Don't use a cached lookup result
     }
 
+    def validate(self):
+        if ('LoadBalancerArn' in self.properties) == ('LoadBalancerArns' in self.properties):
+            raise TypeError("{}: exactly one of LoadBalancerArn and LoadBalancerArns is required".format(
+                self.__class__.__name__))
+
     @classmethod
     def _lambda_policy(cls):
         return {
@@ -2,12 +2,23 @@
 Custom resource to support Amazon Cloudwatch Logs ResourcePolicy as Cloudformation doesn't support this yet.
 You can vote to support it at https://github.com/aws-cloudformation/aws-cloudformation-coverage-roadmap/issues/249
 """
+from six import string_types
+
 from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class ResourcePolicy(LambdaBackedCustomResource):
+    """
+    Without a Group, every resource is a separate policy. An account can only
+    have 10 of them per region, so resources can share policies instead: the
+    statements of all resources with the same Group are packed into as few
+    policies as possible. See the lambda code for details.
+
+    Attributes (with a Group): PolicyNames.
+    """
     props = {
         'PolicyDocument': (dict, True),
+        'Group': (string_types, False),  # Share policies with all resources in this group
     }
 
     @classmethod
@@ -19,6 +30,7 @@ class ResourcePolicy(LambdaBackedCustomResource):
                 "Action": [
                     "logs:PutResourcePolicy",
                     "logs:DeleteResourcePolicy",
+                    "logs:DescribeResourcePolicies",
                 ],
                 "Resource": "*",
             }],
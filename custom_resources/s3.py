@@ -1,18 +1,71 @@
-from six import string_types
+import base64
+import gzip
+import io
+
+from six import string_types, text_type
 
 from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class Object(LambdaBackedCustomResource):
+    """
+    Object in S3, with content from Body, BodyBase64Gzip or a copy of another
+    object.
+
+    BodyBase64Gzip holds binary content, or large content that should take
+    less space in the template:
+
+        Object("Logo", Bucket=..., Key="logo.png", ContentType="image/png",
+               BodyBase64Gzip=Object.encode_body(open("logo.png", "rb").read()))
+
+    Large uploads and copies are done in parts.
+    """
     props = {
         'Region': (string_types, False),  # Default: current region
         'Bucket': (string_types, True),  # Bucket name
         'Key': (string_types, True),  # Location within bucket
         'Body': (object, False),  # string, or JSON-able content. Default: empty file
+        'BodyBase64Gzip': (string_types, False),  # Instead of Body, see encode_body()
+        'SourceBucket': (string_types, False),  # Instead of Body: copy this object
+        'SourceKey': (string_types, False),
+        'SourceVersionId': (string_types, False),
         'ObjectMetadata': (object, False),  # dict, default: {}  ('Metadata' is reserved)
         'ContentType': (string_types, False),
+        'ContentEncoding': (string_types, False),  # With "gzip", BodyBase64Gzip is stored compressed
     }
 
+    def validate(self):
+        sources = [key for key in ('Body', 'BodyBase64Gzip', 'SourceBucket') if key in self.properties]
+        if len(sources) > 1:
+            raise TypeError("{}: at most one of Body, BodyBase64Gzip and SourceBucket is allowed".format(
+                self.__class__.__name__))
+        if ('SourceBucket' in self.properties) != ('SourceKey' in self.properties):
+            raise TypeError("{}: SourceBucket and SourceKey go together".format(self.__class__.__name__))
+        if self.properties.get('ContentEncoding') == 'gzip' and sources in ([], ['Body']):
+            raise TypeError("{}: ContentEncoding gzip needs gzipped content: use BodyBase64Gzip instead of Body".format(
+                self.__class__.__name__))
+
+    @staticmethod
+    def encode_body(content):
+        """
+        Encode content (bytes or str) for BodyBase64Gzip.
+        """
+        if isinstance(content, text_type):
+            content = content.encode('utf-8')
+        compressed = io.BytesIO()
+        # mtime=0 gives the same output for the same content, so the template only changes with the content.
+        # GzipFile rather than gzip.compress(), which Python 2.7 doesn't have
+        with gzip.GzipFile(fileobj=compressed, mode='wb', mtime=0) as f:
+            f.write(content)
+        return base64.b64encode(compressed.getvalue()).decode('ascii')
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        # Large uploads and copies take a while
+        settings['Timeout'] = 300
+        settings['MemorySize'] = 512
+        return settings
+
     @classmethod
     def _lambda_policy(cls):
         return {
@@ -20,7 +73,10 @@ class Object(LambdaBackedCustomResource):
             "Statement": [{
                 "Effect": "Allow",
                 "Action": [
+                    "s3:GetObject",  # Copy source, and compare with the current object
+                    "s3:GetObjectVersion",
                     "s3:PutObject",
+                    "s3:AbortMultipartUpload",
                     "s3:DeleteObject",
                 ],
                 "Resource": "*",
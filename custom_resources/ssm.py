@@ -32,6 +32,7 @@ class Parameter(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "ssm:PutParameter",
+                    "ssm:GetParameter",
                     "ssm:GetParameters",
                     "ssm:DeleteParameter",
                     "ssm:AddTagsToResource",
@@ -48,3 +49,35 @@ class Parameter(LambdaBackedCustomResource):
         """
         # Keep legacy non-structured name for backward compatibility
         return ['SsmParameter']
+
+
+class ParameterSet(LambdaBackedCustomResource):
+    props = {
+        'Path': (string_types, True),  # Prefix of all parameters, e.g. "/my-service/config"
+        'Parameters': (dict, True),  # {name: value}, created as Path/name
+        'Type': (string_types, False),  # Default: "String"
+        'KeyId': (string_types, False),
+        'Description': (string_types, False),
+        'Tags': (Tags, False),
+    }
+
+    @classmethod
+    def _lambda_policy(cls):
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "ssm:PutParameter",
+                    "ssm:DeleteParameters",
+                    "ssm:AddTagsToResource",
+                    "ssm:RemoveTagsFromResource",
+                ],
+                "Resource": "*",
+            }],
+        }
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        settings['Timeout'] = 300  # Writing many parameters may need to back off for throttling
+        return settings
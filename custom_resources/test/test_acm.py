@@ -0,0 +1,14 @@
+import warnings
+
+import pytest
+
+from ..acm import DnsValidatedCertificate
+
+
+def test_wait_for_issued_warns_about_records_in_the_same_stack():
+    with pytest.warns(UserWarning, match='WaitForIssued'):
+        DnsValidatedCertificate('Certificate', DomainName='example.com', WaitForIssued=True).to_dict()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        DnsValidatedCertificate('Certificate', DomainName='example.com').to_dict()
@@ -0,0 +1,49 @@
+import base64
+import gzip
+
+import pytest
+
+from ..s3 import Object
+
+
+def decode_body(encoded):
+    return gzip.decompress(base64.b64decode(encoded))
+
+
+def test_encode_body_round_trips():
+    assert decode_body(Object.encode_body(b'\x00\xffbinary')) == b'\x00\xffbinary'
+    assert decode_body(Object.encode_body(u'caf\xe9')) == u'caf\xe9'.encode('utf-8')
+
+
+def test_encode_body_is_deterministic():
+    assert Object.encode_body('content') == Object.encode_body('content')
+    assert Object.encode_body('content') != Object.encode_body('other content')
+
+
+@pytest.mark.parametrize('sources', [
+    {'Body': 'x', 'BodyBase64Gzip': Object.encode_body('x')},
+    {'Body': 'x', 'SourceBucket': 'b', 'SourceKey': 'k'},
+    {'BodyBase64Gzip': Object.encode_body('x'), 'SourceBucket': 'b', 'SourceKey': 'k'},
+    {'SourceBucket': 'b'},
+    {'SourceKey': 'k'},
+])
+def test_validate_rejects_conflicting_sources(sources):
+    with pytest.raises(TypeError):
+        Object('Object', Bucket='bucket', Key='key', **sources).to_dict()
+
+
+@pytest.mark.parametrize('sources', [
+    {},
+    {'Body': 'x'},
+    {'BodyBase64Gzip': Object.encode_body('x')},
+    {'SourceBucket': 'b', 'SourceKey': 'k', 'SourceVersionId': 'v'},
+])
+def test_validate_accepts_a_single_source(sources):
+    Object('Object', Bucket='bucket', Key='key', **sources).to_dict()
+
+
+def test_validate_rejects_gzip_encoding_of_plain_body():
+    with pytest.raises(TypeError):
+        Object('Object', Bucket='bucket', Key='key', Body='x', ContentEncoding='gzip').to_dict()
+    Object('Object', Bucket='bucket', Key='key', BodyBase64Gzip=Object.encode_body('x'),
+           ContentEncoding='gzip').to_dict()
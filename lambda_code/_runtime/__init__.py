@@ -0,0 +1,8 @@
+"""
+Shared runtime for the custom resource handlers.
+
+This package is copied into every Lambda ZIP file by the build script, next to
+the generated `_metadata.py`. Handlers import it as a top-level package:
+
+    from _runtime import instrumentation
+"""
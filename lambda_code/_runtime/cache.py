@@ -0,0 +1,360 @@
+"""
+Cache for the results of read-only lookups (describe/list calls).
+
+Entries are kept in memory and in /tmp, so warm containers can answer repeated
+lookups without doing any API call. Every entry expires after the TTL of the
+cache. Both tiers are bounded to `max_entries`, evicting the least recently
+used entries first.
+
+Optionally, a shared third tier is used: a DynamoDB table or an S3 prefix,
+shared by all containers (and stacks) in the account. It is configured with the
+`LOOKUP_CACHE_TABLE` or `LOOKUP_CACHE_BUCKET` (and `LOOKUP_CACHE_PREFIX`)
+environment variables; `build.py --shared-lookup-cache` creates the store and
+sets these on the functions that use the cache.
+
+Values must be JSON-serializable.
+
+Usage (at module level, so the cache survives across warm invocations):
+
+    CACHE = cache.LookupCache('ec2.FindAmi', ttl=900)
+
+    image_id = CACHE.lookup(
+        CACHE.make_key(region, filter),
+        lambda: expensive_lookup(region, filter),
+        bypass=bypass_cache_property,
+    )
+"""
+import abc
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import typing
+
+DIRECTORY_ENVIRONMENT_VARIABLE = 'LOOKUP_CACHE_DIRECTORY'
+DEFAULT_DIRECTORY = '/tmp/custom-resources-cache'
+TABLE_ENVIRONMENT_VARIABLE = 'LOOKUP_CACHE_TABLE'
+BUCKET_ENVIRONMENT_VARIABLE = 'LOOKUP_CACHE_BUCKET'
+PREFIX_ENVIRONMENT_VARIABLE = 'LOOKUP_CACHE_PREFIX'
+
+
+class SharedStore(abc.ABC):
+    """
+    Interface of the shared tier.
+
+    Entries are (expires, value) tuples; `expires` is a Unix timestamp.
+    """
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str) -> typing.Tuple[float, typing.Any]:
+        """
+        :raises KeyError: when the entry is not in the store
+        """
+
+    @abc.abstractmethod
+    def put(self, namespace: str, key: str, expires: float, value: typing.Any) -> None:
+        pass
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        pass
+
+
+class MemoryStore(SharedStore):
+    """
+    Local stand-in for the shared tier, e.g. for tests.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, namespace, key):
+        return self.entries[(namespace, key)]
+
+    def put(self, namespace, key, expires, value):
+        # Round-trip through JSON, like the real stores
+        self.entries[(namespace, key)] = (expires, json.loads(json.dumps(value)))
+
+    def delete(self, namespace, key):
+        self.entries.pop((namespace, key), None)
+
+
+class DynamoDbStore(SharedStore):
+    """
+    Table with a string hash key `CacheKey`, and TTL enabled on `ExpiresAt`.
+    """
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('dynamodb')
+        return self._client
+
+    def get(self, namespace, key):
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={'CacheKey': {'S': f"{namespace}/{key}"}},
+        )
+        if 'Item' not in response:
+            raise KeyError(key)
+        item = response['Item']
+        return float(item['ExpiresAt']['N']), json.loads(item['Value']['S'])
+
+    def put(self, namespace, key, expires, value):
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                'CacheKey': {'S': f"{namespace}/{key}"},
+                'ExpiresAt': {'N': str(int(expires))},  # TTL attribute must be an integer
+                'Value': {'S': json.dumps(value)},
+            },
+        )
+
+    def delete(self, namespace, key):
+        self.client.delete_item(
+            TableName=self.table_name,
+            Key={'CacheKey': {'S': f"{namespace}/{key}"}},
+        )
+
+
+class S3Store(SharedStore):
+    """
+    Objects under `{prefix}{namespace}/{key}.json`. Expired objects are not
+    returned, and should be cleaned up by a lifecycle rule on the bucket.
+    """
+    def __init__(self, bucket: str, prefix: str = '', client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('s3')
+        return self._client
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}/{key}.json"
+
+    def get(self, namespace, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(namespace, key))
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(key)
+        entry = json.loads(response['Body'].read())
+        return entry['expires'], entry['value']
+
+    def put(self, namespace, key, expires, value):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(namespace, key),
+            Body=json.dumps({'expires': expires, 'value': value}).encode('utf-8'),
+            ContentType='application/json',
+        )
+
+    def delete(self, namespace, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(namespace, key))
+
+
+def shared_store_from_environment() -> typing.Optional[SharedStore]:
+    if os.environ.get(TABLE_ENVIRONMENT_VARIABLE):
+        return DynamoDbStore(os.environ[TABLE_ENVIRONMENT_VARIABLE])
+    if os.environ.get(BUCKET_ENVIRONMENT_VARIABLE):
+        return S3Store(
+            os.environ[BUCKET_ENVIRONMENT_VARIABLE],
+            os.environ.get(PREFIX_ENVIRONMENT_VARIABLE, ''),
+        )
+    return None
+
+
+class LookupCache:
+    def __init__(
+            self,
+            namespace: str,
+            ttl: float,
+            max_entries: int = 64,
+            directory: typing.Optional[str] = None,
+            shared: typing.Optional[SharedStore] = None,
+            clock: typing.Callable[[], float] = time.time,
+    ):
+        """
+        :param namespace: name of the cache, e.g. the resource type
+        :param ttl: time to live of the entries, in seconds
+        :param max_entries: maximum number of entries in memory and in /tmp
+        :param directory: base directory of the on-disk tier.
+                          Default: $LOOKUP_CACHE_DIRECTORY or /tmp/custom-resources-cache
+        :param shared: the shared tier. Default: configured by the environment, if any
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if directory is None:
+            directory = os.environ.get(DIRECTORY_ENVIRONMENT_VARIABLE, DEFAULT_DIRECTORY)
+        self.directory = os.path.join(directory, namespace)
+        if shared is None:
+            shared = shared_store_from_environment()
+        self.shared = shared
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()  # key -> (expires, value), least recently used first
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Derive a key from JSON-able parts, independent of dict ordering.
+        """
+        normalized = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> typing.Any:
+        """
+        :raises KeyError: when the key is not in the cache, or expired
+        """
+        now = self.clock()
+        with self._lock:
+            try:
+                expires, value = self._memory[key]
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+            except KeyError:
+                pass
+
+            try:
+                expires, value = self._disk_get(key, now)
+                self._memory_put(key, expires, value)
+                return value
+            except KeyError:
+                pass
+
+        expires, value = self._shared_get(key, now)  # may raise KeyError
+        with self._lock:
+            self._memory_put(key, expires, value)
+            self._disk_put(key, expires, value)
+        return value
+
+    def put(self, key: str, value: typing.Any) -> None:
+        expires = self.clock() + self.ttl
+        with self._lock:
+            self._memory_put(key, expires, value)
+            self._disk_put(key, expires, value)
+        self._shared_call('put', key, expires, value)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+        self._shared_call('delete', key)
+
+    def lookup(self, key: str, compute: typing.Callable[[], typing.Any], bypass: bool = False) -> typing.Any:
+        """
+        Return the cached value for key, or compute (and cache) it.
+        None is never cached, so lookups that found nothing are retried.
+
+        :param bypass: always compute, and refresh the cached value
+        """
+        if not bypass:
+            try:
+                value = self.get(key)
+                print(f"Cache hit in {self.namespace} for {key}")
+                return value
+            except KeyError:
+                pass
+
+        value = compute()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def _shared_call(self, method: str, key: str, *args):
+        if self.shared is None:
+            return None
+        try:
+            return getattr(self.shared, method)(self.namespace, key, *args)
+        except Exception as e:
+            # The shared tier is an optimization only
+            print(f"Shared cache {method} failed in {self.namespace} for {key}: {e}")
+            return None
+
+    def _shared_get(self, key: str, now: float) -> typing.Tuple[float, typing.Any]:
+        if self.shared is None:
+            raise KeyError(key)
+        try:
+            expires, value = self.shared.get(self.namespace, key)
+        except KeyError:
+            raise
+        except Exception as e:
+            print(f"Shared cache get failed in {self.namespace} for {key}: {e}")
+            raise KeyError(key)
+        if expires <= now:  # Expiry by the store itself is lazy
+            raise KeyError(key)
+        return expires, value
+
+    def _memory_put(self, key: str, expires: float, value: typing.Any) -> None:
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> typing.Tuple[float, typing.Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(key)
+
+        if entry['expires'] <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise KeyError(key)
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry['expires'], entry['value']
+
+    def _disk_put(self, key: str, expires: float, value: typing.Any) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write atomically: concurrent invocations may read the same file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'expires': expires, 'value': value}, f)
+            os.replace(tmp_path, self._path(key))
+            self._disk_evict()
+        except OSError as e:
+            # The on-disk tier is an optimization only
+            print(f"Could not write cache entry in {self.directory}: {e}")
+
+    def _disk_evict(self) -> None:
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith('.json')
+        ]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,79 @@
+"""
+Run independent AWS calls (e.g. one per region) concurrently.
+
+The work is I/O bound, so a small thread pool gives close to linear speed-ups
+without needing more memory. The pool size is bounded to stay well under the
+API rate limits and the Lambda file descriptor limit.
+
+    outcomes = concurrency.run_concurrently(find_image, regions)
+    for outcome in outcomes:
+        if outcome.error is None:
+            print(outcome.item, outcome.value)
+
+boto3's default session is not thread safe, so use `client()` to get clients
+inside the workers.
+"""
+import concurrent.futures
+import threading
+import typing
+
+import boto3
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class Outcome(typing.NamedTuple):
+    item: typing.Any
+    value: typing.Any  # None on error
+    error: typing.Optional[BaseException]  # None on success
+
+
+def run_concurrently(
+        fn: typing.Callable[[typing.Any], typing.Any],
+        items: typing.Iterable,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+) -> typing.List[Outcome]:
+    """
+    Call `fn(item)` for every item, at most `max_workers` at a time.
+
+    Exceptions are captured in the Outcome instead of raised, so the caller
+    can report partial failures.
+
+    :return: the outcomes, in the order of items
+    """
+    items = list(items)
+    if len(items) == 0:
+        return []
+
+    def call(item):
+        try:
+            return Outcome(item, fn(item), None)
+        except Exception as e:
+            return Outcome(item, None, e)
+
+    if len(items) == 1 or max_workers <= 1:
+        return [call(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(call, items))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client(service_name: str, region_name: typing.Optional[str] = None):
+    """
+    Return a (cached) boto3 client that can be shared between threads.
+
+    Clients are thread safe once created, but creating them from the default
+    session is not. Each client gets its own session, created under a lock.
+
+    The same goes for `get_boto3_client()` of a custom resource: call it
+    before starting the workers, and share the client with them.
+    """
+    key = (service_name, region_name)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = boto3.session.Session().client(service_name, region_name=region_name)
+        return _clients[key]
@@ -0,0 +1,94 @@
+"""
+Let a handler wait for longer than a single Lambda timeout.
+
+When the invocation is about to time out, the handler saves its progress in a
+checkpoint and calls `continue_later()`. That re-invokes the function
+asynchronously with the original CloudFormation event plus the checkpoint, and
+suppresses the response of the current invocation. The new invocation picks
+up the checkpoint via `checkpoint()` and eventually sends the response.
+
+    deadline = continuation.Deadline(self.context)
+    state = continuation.checkpoint(self.event) or {'StartedAt': time.time()}
+    for delay in continuation.backoff():
+        if done():
+            return attributes
+        if deadline.remaining() < delay:
+            continuation.continue_later(self, state)
+            return attributes  # not sent
+        time.sleep(delay)
+
+The function needs `lambda:InvokeFunction` on itself.
+"""
+import json
+import time
+import typing
+
+import boto3
+
+CHECKPOINT_KEY = 'CustomResourcesContinuation'
+MAX_INVOCATIONS = 12  # CloudFormation gives up after an hour anyway
+
+
+class Deadline:
+    """
+    The time left in this invocation, minus a margin to send the response.
+    """
+    def __init__(self, context, margin: float = 10):
+        self._end = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - margin
+
+    def remaining(self) -> float:
+        return self._end - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def backoff(initial: float = 5, maximum: float = 60, factor: float = 2) -> typing.Iterator[float]:
+    """
+    Infinite sequence of poll delays, in seconds.
+    """
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def checkpoint(event: dict) -> typing.Optional[dict]:
+    """
+    :return: the state saved by the previous invocation, if this is a continuation
+    """
+    return event.get(CHECKPOINT_KEY)
+
+
+def invocation(event: dict) -> int:
+    """
+    :return: 1 for the original invocation, 2 for the first continuation, etc.
+    """
+    return (checkpoint(event) or {}).get('Invocation', 1)
+
+
+def continue_later(resource, state: dict, lambda_client=None) -> None:
+    """
+    Re-invoke the current function with the event of `resource` plus `state`,
+    and make sure `resource` does not send a response itself.
+
+    :raises TimeoutError: when the maximum number of invocations is reached
+    """
+    number = invocation(resource.event) + 1
+    if number > MAX_INVOCATIONS:
+        raise TimeoutError(f"Still not done after {MAX_INVOCATIONS} invocations")
+
+    event = dict(resource.event)
+    event[CHECKPOINT_KEY] = dict(state, Invocation=number)
+
+    if lambda_client is None:
+        lambda_client = boto3.client('lambda')
+    lambda_client.invoke(
+        FunctionName=resource.context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(event).encode('utf-8'),
+    )
+    print(f"Continuing in invocation {number}")
+
+    # The response will be sent by the last invocation
+    resource.finish_function = lambda resource: None
@@ -0,0 +1,279 @@
+"""
+Opt-in instrumentation of the AWS API calls made by a handler.
+
+Every botocore client created after `install()` gets hooks on the
+`before-call`, `needs-retry`, `after-call` and `after-call-error` events.
+For each API call we record the service, operation, latency, number of
+retries, number of throttling errors and the response size.
+
+Handlers wrap their Lambda handler with `instrument_handler()`. This is a no-op
+unless the `AWS_CALL_INSTRUMENTATION` environment variable is set to a truthy
+value (`build.py --instrument-aws-calls` does that for all functions). When
+enabled, a JSON summary is printed at the end of every invocation.
+
+Benchmarks and tests can use the programmatic API directly:
+
+    with instrumentation.recording() as recorder:
+        do_something()
+    assert recorder.summary()['calls'] == 1
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import typing
+
+import boto3
+import botocore.session
+
+ENVIRONMENT_VARIABLE = 'AWS_CALL_INSTRUMENTATION'
+
+THROTTLING_ERROR_CODES = frozenset({
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+})
+
+_HOOK_ID = 'custom-resources-instrumentation'
+_CONTEXT_START = 'custom_resources_instrumentation_start'
+_CONTEXT_THROTTLES = 'custom_resources_instrumentation_throttles'
+
+
+class CallRecord(typing.NamedTuple):
+    service: str
+    operation: str
+    latency: float  # seconds
+    retries: int
+    throttles: int  # number of throttling errors, including retried ones
+    error_code: typing.Optional[str]  # None on success
+    response_size: int  # bytes, as reported by Content-Length
+
+
+class Recorder:
+    """
+    Collects CallRecords. Thread safe.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = []  # type: typing.List[CallRecord]
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    @property
+    def records(self) -> typing.List[CallRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def summary(self) -> dict:
+        """
+        Aggregate the records per `service.Operation`.
+        """
+        operations = {}
+        for record in self.records:
+            op = operations.setdefault(f"{record.service}.{record.operation}", {
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'throttles': 0,
+                'latency_ms': 0.0,
+                'max_latency_ms': 0.0,
+                'response_bytes': 0,
+            })
+            latency_ms = record.latency * 1000
+            op['calls'] += 1
+            op['errors'] += 1 if record.error_code is not None else 0
+            op['retries'] += record.retries
+            op['throttles'] += record.throttles
+            op['latency_ms'] += latency_ms
+            op['max_latency_ms'] = max(op['max_latency_ms'], latency_ms)
+            op['response_bytes'] += record.response_size
+
+        totals = {
+            key: sum(op[key] for op in operations.values())
+            for key in ('calls', 'errors', 'retries', 'throttles', 'latency_ms', 'response_bytes')
+        }
+        totals['operations'] = operations
+        return totals
+
+    def log_summary(self) -> None:
+        print(json.dumps({'AwsCallSummary': self.summary()}, sort_keys=True))
+
+
+_active_recorders = []  # type: typing.List[Recorder]
+_active_recorders_lock = threading.Lock()
+
+
+def _record(record: CallRecord) -> None:
+    with _active_recorders_lock:
+        recorders = list(_active_recorders)
+    for recorder in recorders:
+        recorder.add(record)
+
+
+def _split_event_name(event_name: str) -> typing.Tuple[str, str]:
+    # e.g. "after-call.secrets-manager.GetSecretValue"
+    _, service, operation = event_name.split('.', 2)
+    return service, operation
+
+
+def _before_call(context, **kwargs):
+    context[_CONTEXT_START] = time.monotonic()
+    context.setdefault(_CONTEXT_THROTTLES, 0)
+    # Return None, otherwise botocore uses our return value as the response
+
+
+def _needs_retry(response=None, request_dict=None, **kwargs):
+    if response is None or request_dict is None:
+        return  # Connection error, not a throttle
+    error_code = response[1].get('Error', {}).get('Code')
+    if error_code in THROTTLING_ERROR_CODES:
+        context = request_dict['context']
+        context[_CONTEXT_THROTTLES] = context.get(_CONTEXT_THROTTLES, 0) + 1
+    # Return None, otherwise botocore uses our return value as the retry delay
+
+
+def _response_size(http_response) -> int:
+    try:
+        return int(http_response.headers.get('content-length', 0))
+    except (AttributeError, ValueError):
+        return 0
+
+
+def _after_call(http_response, parsed, context, event_name, **kwargs):
+    if _CONTEXT_START not in context:
+        return  # Hooked in after the call started
+    service, operation = _split_event_name(event_name)
+    error_code = parsed.get('Error', {}).get('Code')
+    # needs-retry is emitted for every response, the final one included, so
+    # all throttled attempts are already counted
+    throttles = context.get(_CONTEXT_THROTTLES, 0)
+    _record(CallRecord(
+        service=service,
+        operation=operation,
+        latency=time.monotonic() - context[_CONTEXT_START],
+        retries=parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+        throttles=throttles,
+        error_code=error_code,
+        response_size=_response_size(http_response),
+    ))
+
+
+def _after_call_error(exception, context, event_name, **kwargs):
+    if _CONTEXT_START not in context:
+        return
+    service, operation = _split_event_name(event_name)
+    _record(CallRecord(
+        service=service,
+        operation=operation,
+        latency=time.monotonic() - context[_CONTEXT_START],
+        retries=0,
+        throttles=context.get(_CONTEXT_THROTTLES, 0),
+        error_code=type(exception).__name__,
+        response_size=0,
+    ))
+
+
+def attach(events) -> None:
+    """
+    Register the hooks on an event emitter.
+
+    Accepts a botocore/boto3 session, a client or an event emitter. Clients
+    copy the event emitter of their session when they are created, so
+    attaching to a session only affects clients created afterwards.
+    """
+    if isinstance(events, boto3.session.Session):
+        events = events.events
+    elif isinstance(events, botocore.session.Session):
+        events = events.get_component('event_emitter')
+    elif hasattr(events, 'meta'):  # client
+        events = events.meta.events
+    # unique_id makes this idempotent. Register on the most specific wildcard
+    # name: those handlers run before the ones on plain `before-call`.
+    events.register_first('before-call.*.*', _before_call, unique_id=_HOOK_ID + '-before-call')
+    events.register('needs-retry', _needs_retry, unique_id=_HOOK_ID + '-needs-retry')
+    events.register('after-call', _after_call, unique_id=_HOOK_ID + '-after-call')
+    events.register('after-call-error', _after_call_error, unique_id=_HOOK_ID + '-after-call-error')
+
+
+_installed = False
+
+
+def install() -> None:
+    """
+    Attach the hooks to every botocore session created from now on,
+    and to the boto3 default session.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    original_get_session = botocore.session.get_session
+
+    @functools.wraps(original_get_session)
+    def get_session(*args, **kwargs):
+        session = original_get_session(*args, **kwargs)
+        attach(session)
+        return session
+
+    botocore.session.get_session = get_session  # boto3.Session() uses this
+
+    if boto3.DEFAULT_SESSION is not None:
+        attach(boto3.DEFAULT_SESSION)
+
+
+@contextlib.contextmanager
+def recording() -> typing.Iterator[Recorder]:
+    """
+    Record all AWS API calls made inside the `with`-block.
+    """
+    install()
+    recorder = Recorder()
+    with _active_recorders_lock:
+        _active_recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _active_recorders_lock:
+            _active_recorders.remove(recorder)
+
+
+def enabled() -> bool:
+    return os.environ.get(ENVIRONMENT_VARIABLE, 'false').lower() in ('1', 'true', 'yes', 'on')
+
+
+def instrument_handler(handler: typing.Callable) -> typing.Callable:
+    """
+    Wrap a Lambda handler to log a summary of its AWS API calls.
+
+    Returns the handler unchanged when instrumentation is not enabled.
+    """
+    if not enabled():
+        return handler
+
+    install()  # at import time, before any client is created
+
+    @functools.wraps(handler)
+    def instrumented_handler(event, context):
+        with recording() as recorder:
+            try:
+                return handler(event, context)
+            finally:
+                recorder.log_summary()
+
+    return instrumented_handler
@@ -0,0 +1,124 @@
+"""
+Retries for calls that partially succeed or get throttled, like
+BatchWriteItem with UnprocessedItems, or many concurrent PutParameter calls.
+
+Uses "full jitter" exponential backoff, so concurrent workers that were
+throttled at the same time don't retry in lock-step.
+
+    for delay in retry.delays():
+        unprocessed = write(unprocessed)
+        if not unprocessed:
+            break
+        time.sleep(delay)
+    else:
+        raise RuntimeError("Gave up")
+
+Concurrent workers calling the same API share an AdaptiveRateLimiter:
+
+    limiter = retry.AdaptiveRateLimiter()
+    concurrency.run_concurrently(
+        lambda name: retry.call(lambda: ssm.put_parameter(Name=name, ...), limiter),
+        names,
+    )
+"""
+import random
+import threading
+import time
+import typing
+
+import botocore.exceptions
+
+from .instrumentation import THROTTLING_ERROR_CODES
+
+
+def delays(initial: float = 0.05, maximum: float = 5.0, attempts: int = 8) -> typing.Iterator[float]:
+    """
+    Yield `attempts` delays, in seconds: random between 0 and an exponentially
+    growing cap.
+    """
+    cap = initial
+    for _ in range(attempts):
+        yield random.uniform(0, cap)
+        cap = min(cap * 2, maximum)
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    if not isinstance(error, botocore.exceptions.ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class AdaptiveRateLimiter:
+    """
+    Spaces out the calls of concurrent workers calling the same API.
+
+    The rate is halved on every throttling error, and grows back slowly on
+    success (additive increase, multiplicative decrease), so the workers
+    converge on the rate the API actually allows. Thread safe.
+    """
+    def __init__(
+            self,
+            rate: float = 10.0,
+            minimum_rate: float = 0.5,
+            maximum_rate: float = 50.0,
+            clock: typing.Callable[[], float] = time.monotonic,
+            sleep: typing.Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param rate: initial rate, in calls per second
+        """
+        self.rate = rate
+        self.minimum_rate = minimum_rate
+        self.maximum_rate = maximum_rate
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = clock()
+
+    def acquire(self) -> None:
+        """
+        Block until the next call may be made.
+        """
+        with self._lock:
+            now = self.clock()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            self.sleep(slot - now)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.rate / 2, self.minimum_rate)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.rate + 0.1, self.maximum_rate)
+
+
+def call(
+        fn: typing.Callable[[], typing.Any],
+        limiter: typing.Optional[AdaptiveRateLimiter] = None,
+        attempts: int = 8,
+) -> typing.Any:
+    """
+    Call fn, under the limiter if given, retrying throttling errors with backoff.
+    """
+    retry_delays = delays(initial=0.2, attempts=attempts - 1)
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            if limiter is not None:
+                limiter.throttled()
+            delay = next(retry_delays, None)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        if limiter is not None:
+            limiter.succeeded()
+        return result
@@ -0,0 +1,209 @@
+"""
+Tag reconciliation, shared by all handlers that tag resources.
+
+Tags are compared as {key: value} dicts, so both the CloudFormation list
+format ([{'Key': k, 'Value': v}]) and plain dicts can be used as input. Only
+the difference is applied: tags that were removed from the desired set are
+removed, and only new or changed tags are (re-)added, in as few calls as the
+service allows.
+
+    tags.reconcile(
+        tags.SsmParameterAdapter(ssm_client), parameter_name,
+        old=self.old_resource_properties.get('Tags'),
+        new=self.resource_properties.get('Tags'),
+    )
+
+An adapter translates the delta into the API calls of a service.
+"""
+import abc
+import typing
+
+TagsInput = typing.Union[None, typing.Dict[str, str], typing.List[typing.Dict[str, str]]]
+
+
+def to_dict(tags: TagsInput) -> typing.Dict[str, str]:
+    if tags is None:
+        return {}
+    if isinstance(tags, dict):
+        return dict(tags)
+    return {tag['Key']: tag['Value'] for tag in tags}
+
+
+def to_list(tags: TagsInput) -> typing.List[typing.Dict[str, str]]:
+    """
+    :return: tags in the CloudFormation list format, sorted by key
+    """
+    return [
+        {'Key': key, 'Value': value}
+        for key, value in sorted(to_dict(tags).items())
+    ]
+
+
+class Delta(typing.NamedTuple):
+    to_add: typing.Dict[str, str]  # new or changed tags
+    to_remove: typing.List[str]  # keys, sorted
+
+    def is_empty(self) -> bool:
+        return len(self.to_add) == 0 and len(self.to_remove) == 0
+
+
+def diff(old: TagsInput, new: TagsInput, live: TagsInput = None) -> Delta:
+    """
+    Compute the minimal changes to go from the `old` to the `new` desired tags.
+
+    :param live: the tags currently on the resource, if known. Tags that are
+                 already correct are skipped. Tags that are not in `old` are
+                 never removed: they are managed by someone else.
+    """
+    old = to_dict(old)
+    new = to_dict(new)
+    current = old if live is None else to_dict(live)
+
+    to_add = {
+        key: value
+        for key, value in new.items()
+        if current.get(key) != value
+    }
+    to_remove = sorted(
+        key
+        for key in old.keys()
+        if key not in new and key in current
+    )
+    return Delta(to_add, to_remove)
+
+
+def chunks(items: list, size: int) -> typing.Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Adapter(abc.ABC):
+    """
+    Tagging API of a service.
+
+    Subclasses implement `add()`, `remove()` and `list()`. Services that can
+    add and remove in the same call also override `apply()`.
+    """
+    max_tags_per_call = 50
+
+    @abc.abstractmethod
+    def add(self, resource_id: str, tags: typing.Dict[str, str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def remove(self, resource_id: str, keys: typing.List[str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def list(self, resource_id: str) -> typing.Dict[str, str]:
+        pass
+
+    def apply(self, resource_id: str, delta: Delta) -> None:
+        for keys in chunks(delta.to_remove, self.max_tags_per_call):
+            self.remove(resource_id, keys)
+        for items in chunks(sorted(delta.to_add.items()), self.max_tags_per_call):
+            self.add(resource_id, dict(items))
+
+
+def reconcile(
+        adapter: Adapter,
+        resource_id: str,
+        old: TagsInput,
+        new: TagsInput,
+        use_live_tags: bool = False,
+) -> Delta:
+    """
+    Apply the minimal changes to go from the `old` to the `new` desired tags.
+
+    :param use_live_tags: list the current tags first, and skip the tags that
+                          are already correct. Costs a call, but may save some.
+    :return: the applied delta
+    """
+    live = adapter.list(resource_id) if use_live_tags else None
+    delta = diff(old, new, live)
+    if not delta.is_empty():
+        print(f"Tagging {resource_id}: adding {sorted(delta.to_add.keys())}, removing {delta.to_remove}")
+        adapter.apply(resource_id, delta)
+    return delta
+
+
+class SsmParameterAdapter(Adapter):
+    max_tags_per_call = 50
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, resource_id, tags):
+        self.client.add_tags_to_resource(ResourceType='Parameter', ResourceId=resource_id, Tags=to_list(tags))
+
+    def remove(self, resource_id, keys):
+        self.client.remove_tags_from_resource(ResourceType='Parameter', ResourceId=resource_id, TagKeys=keys)
+
+    def list(self, resource_id):
+        response = self.client.list_tags_for_resource(ResourceType='Parameter', ResourceId=resource_id)
+        return to_dict(response['TagList'])
+
+
+class AcmCertificateAdapter(Adapter):
+    max_tags_per_call = 50
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, resource_id, tags):
+        self.client.add_tags_to_certificate(CertificateArn=resource_id, Tags=to_list(tags))
+
+    def remove(self, resource_id, keys):
+        # omit 'Value' to remove the tag regardless of value
+        self.client.remove_tags_from_certificate(CertificateArn=resource_id, Tags=[{'Key': key} for key in keys])
+
+    def list(self, resource_id):
+        return to_dict(self.client.list_tags_for_certificate(CertificateArn=resource_id).get('Tags', []))
+
+
+class ElasticBeanstalkAdapter(Adapter):
+    max_tags_per_call = 50
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, resource_id, tags):
+        self.client.update_tags_for_resource(ResourceArn=resource_id, TagsToAdd=to_list(tags))
+
+    def remove(self, resource_id, keys):
+        self.client.update_tags_for_resource(ResourceArn=resource_id, TagsToRemove=keys)
+
+    def apply(self, resource_id, delta):
+        # Add and remove in the same call
+        to_add = list(chunks(to_list(delta.to_add), self.max_tags_per_call))
+        to_remove = list(chunks(delta.to_remove, self.max_tags_per_call))
+        for i in range(max(len(to_add), len(to_remove))):
+            kwargs = {}
+            if i < len(to_add):
+                kwargs['TagsToAdd'] = to_add[i]
+            if i < len(to_remove):
+                kwargs['TagsToRemove'] = to_remove[i]
+            self.client.update_tags_for_resource(ResourceArn=resource_id, **kwargs)
+
+    def list(self, resource_id):
+        return to_dict(self.client.list_tags_for_resource(ResourceArn=resource_id)['ResourceTags'])
+
+
+class BackupAdapter(Adapter):
+    max_tags_per_call = 50
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, resource_id, tags):
+        self.client.tag_resource(ResourceArn=resource_id, Tags=tags)
+
+    def remove(self, resource_id, keys):
+        self.client.untag_resource(ResourceArn=resource_id, TagKeyList=keys)
+
+    def list(self, resource_id):
+        tags = {}
+        paginator = self.client.get_paginator('list_tags')
+        for page in paginator.paginate(ResourceArn=resource_id):
+            tags.update(page.get('Tags', {}))
+        return tags
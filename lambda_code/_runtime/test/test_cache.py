@@ -0,0 +1,138 @@
+import os
+
+import botocore.session
+import pytest
+from botocore.stub import Stubber
+
+from ..cache import DynamoDbStore, LookupCache, MemoryStore, SharedStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_key_ignores_dict_order():
+    assert LookupCache.make_key({'a': 1, 'b': 2}) == LookupCache.make_key({'b': 2, 'a': 1})
+    assert LookupCache.make_key({'a': 1}) != LookupCache.make_key({'a': 2})
+
+
+def test_lookup_computes_once(tmp_path):
+    c = LookupCache('test', ttl=60, directory=str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'result': 42}
+
+    assert c.lookup('k', compute) == {'result': 42}
+    assert c.lookup('k', compute) == {'result': 42}
+    assert len(calls) == 1
+
+    assert c.lookup('k', compute, bypass=True) == {'result': 42}
+    assert len(calls) == 2
+
+
+def test_expiry(tmp_path):
+    clock = FakeClock()
+    c = LookupCache('test', ttl=60, directory=str(tmp_path), clock=clock)
+    c.put('k', 'v')
+    clock.now += 59
+    assert c.get('k') == 'v'
+    clock.now += 2
+    with pytest.raises(KeyError):
+        c.get('k')
+    assert not os.path.exists(os.path.join(str(tmp_path), 'test', 'k.json'))
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    LookupCache('test', ttl=60, directory=str(tmp_path)).put('k', [1, 2])
+    assert LookupCache('test', ttl=60, directory=str(tmp_path)).get('k') == [1, 2]
+    with pytest.raises(KeyError):
+        LookupCache('other', ttl=60, directory=str(tmp_path)).get('k')
+
+
+def test_lru_eviction(tmp_path):
+    c = LookupCache('test', ttl=60, max_entries=2, directory=str(tmp_path))
+    c.put('a', 1)
+    c.put('b', 2)
+    os.utime(os.path.join(str(tmp_path), 'test', 'a.json'), (0, 0))
+    os.utime(os.path.join(str(tmp_path), 'test', 'b.json'), (1, 1))
+    LookupCache('test', ttl=60, directory=str(tmp_path)).get('a')  # a is now most recently used on disk
+    c.put('c', 3)
+
+    assert sorted(os.listdir(os.path.join(str(tmp_path), 'test'))) == ['a.json', 'c.json']
+    fresh = LookupCache('test', ttl=60, directory=str(tmp_path))
+    assert fresh.get('a') == 1
+    with pytest.raises(KeyError):
+        fresh.get('b')
+
+
+def test_shared_tier(tmp_path):
+    clock = FakeClock()
+    store = MemoryStore()
+    LookupCache('test', ttl=60, directory=str(tmp_path / 'a'), shared=store, clock=clock).put('k', {'v': 1})
+
+    # Different container: nothing in memory or /tmp
+    other = LookupCache('test', ttl=60, directory=str(tmp_path / 'b'), shared=store, clock=clock)
+    calls = []
+    assert other.lookup('k', lambda: calls.append(1)) == {'v': 1}
+    assert calls == []
+    assert os.path.exists(str(tmp_path / 'b' / 'test' / 'k.json'))
+
+    clock.now += 61
+    with pytest.raises(KeyError):
+        LookupCache('test', ttl=60, directory=str(tmp_path / 'c'), shared=store, clock=clock).get('k')
+
+
+def test_shared_tier_failure_is_ignored(tmp_path):
+    class BrokenStore(MemoryStore):
+        def get(self, namespace, key):
+            raise RuntimeError("unavailable")
+
+        def put(self, namespace, key, expires, value):
+            raise RuntimeError("unavailable")
+
+    c = LookupCache('test', ttl=60, directory=str(tmp_path), shared=BrokenStore())
+    assert c.lookup('k', lambda: 'computed') == 'computed'
+    assert c.get('k') == 'computed'
+
+
+def test_dynamodb_store():
+    client = botocore.session.get_session().create_client(
+        'dynamodb', region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE', aws_secret_access_key='secret',
+    )
+    store = DynamoDbStore('cache-table', client=client)
+    with Stubber(client) as stubber:
+        stubber.add_response('put_item', {}, {
+            'TableName': 'cache-table',
+            'Item': {
+                'CacheKey': {'S': 'ns/k'},
+                'ExpiresAt': {'N': '1060'},
+                'Value': {'S': '["ami-12345678"]'},
+            },
+        })
+        stubber.add_response('get_item', {'Item': {
+            'CacheKey': {'S': 'ns/k'},
+            'ExpiresAt': {'N': '1060'},
+            'Value': {'S': '["ami-12345678"]'},
+        }})
+        stubber.add_response('get_item', {})
+
+        store.put('ns', 'k', 1060.5, ['ami-12345678'])
+        assert store.get('ns', 'k') == (1060, ['ami-12345678'])
+        with pytest.raises(KeyError):
+            store.get('ns', 'other')
+
+
+def test_incomplete_shared_store_fails_early():
+    class IncompleteStore(SharedStore):
+        def get(self, namespace, key):
+            raise KeyError(key)
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
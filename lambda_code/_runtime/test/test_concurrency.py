@@ -0,0 +1,40 @@
+import threading
+import time
+
+from ..concurrency import client, run_concurrently
+
+
+def test_run_concurrently_keeps_order_and_captures_errors():
+    def fn(item):
+        if item == 'b':
+            raise ValueError(item)
+        time.sleep(0.01)
+        return item.upper()
+
+    outcomes = run_concurrently(fn, ['a', 'b', 'c'])
+    assert [o.item for o in outcomes] == ['a', 'b', 'c']
+    assert [o.value for o in outcomes] == ['A', None, 'C']
+    assert outcomes[0].error is None
+    assert isinstance(outcomes[1].error, ValueError)
+
+
+def test_run_concurrently_is_bounded():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def fn(item):
+        with lock:
+            running.append(item)
+            max_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(item)
+
+    run_concurrently(fn, range(10), max_workers=3)
+    assert max(max_running) <= 3
+
+
+def test_client_is_cached():
+    assert client('ec2', 'eu-west-1') is client('ec2', 'eu-west-1')
+    assert client('ec2', 'eu-west-1') is not client('ec2', 'us-east-1')
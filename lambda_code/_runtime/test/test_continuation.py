@@ -0,0 +1,40 @@
+import itertools
+import json
+from unittest import mock
+
+import pytest
+
+from ..continuation import CHECKPOINT_KEY, MAX_INVOCATIONS, backoff, checkpoint, continue_later
+
+
+class Resource:
+    def __init__(self, event):
+        self.event = event
+        self.context = mock.Mock(invoked_function_arn='arn:aws:lambda:eu-west-1:123456789012:function:f')
+        self.finish_function = 'send the response'
+
+
+def test_backoff():
+    assert list(itertools.islice(backoff(initial=5, maximum=30), 5)) == [5, 10, 20, 30, 30]
+
+
+def test_continue_later():
+    lambda_client = mock.Mock()
+    resource = Resource({'RequestType': 'Create'})
+    assert checkpoint(resource.event) is None
+
+    continue_later(resource, {'PhysicalResourceId': 'x'}, lambda_client=lambda_client)
+
+    assert resource.finish_function(resource) is None
+    kwargs = lambda_client.invoke.call_args[1]
+    assert kwargs['FunctionName'] == resource.context.invoked_function_arn
+    assert kwargs['InvocationType'] == 'Event'
+    event = json.loads(kwargs['Payload'])
+    assert event['RequestType'] == 'Create'
+    assert checkpoint(event) == {'PhysicalResourceId': 'x', 'Invocation': 2}
+
+
+def test_continue_later_gives_up():
+    resource = Resource({CHECKPOINT_KEY: {'Invocation': MAX_INVOCATIONS}})
+    with pytest.raises(TimeoutError):
+        continue_later(resource, {}, lambda_client=mock.Mock())
@@ -0,0 +1,135 @@
+import botocore.config
+import botocore.endpoint
+import botocore.session
+from botocore.awsrequest import AWSResponse
+from botocore.stub import Stubber
+
+from .. import instrumentation
+
+
+def ssm_client(config=None):
+    return botocore.session.get_session().create_client(
+        'ssm',
+        region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+        config=config,
+    )
+
+
+class RawResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def throttling_responses(client, throttled: int) -> None:
+    """
+    Answer the first `throttled` requests with a throttling error and the
+    rest with success, without sending them, so botocore's retry handler runs.
+    """
+    responses = [
+        AWSResponse('https://ssm', 400, {}, RawResponse(b'{"__type":"ThrottlingException","message":"Slow down"}'))
+        for _ in range(throttled)
+    ]
+
+    def before_send(request, **kwargs):
+        if len(responses) > 0:
+            return responses.pop(0)
+        return AWSResponse('https://ssm', 200, {}, RawResponse(b'{"Parameter":{"Name":"foo","Value":"bar"}}'))
+
+    client.meta.events.register('before-send.ssm.GetParameter', before_send)
+
+
+def test_records_calls():
+    with instrumentation.recording() as recorder:
+        client = ssm_client()
+        with Stubber(client) as stubber:
+            stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}})
+            stubber.add_client_error('put_parameter', service_error_code='ThrottlingException')
+            stubber.add_client_error('delete_parameter', service_error_code='ParameterNotFound')
+
+            client.get_parameter(Name='foo')
+            for call in (lambda: client.put_parameter(Name='foo', Value='baz'),
+                         lambda: client.delete_parameter(Name='foo')):
+                try:
+                    call()
+                except client.exceptions.ClientError:
+                    pass
+
+    records = recorder.records
+    assert [(r.service, r.operation) for r in records] == [
+        ('ssm', 'GetParameter'),
+        ('ssm', 'PutParameter'),
+        ('ssm', 'DeleteParameter'),
+    ]
+    assert records[0].error_code is None
+    assert records[0].latency >= 0
+    assert records[1].error_code == 'ThrottlingException'
+    assert records[2].error_code == 'ParameterNotFound'
+    assert records[2].throttles == 0
+
+    summary = recorder.summary()
+    assert summary['calls'] == 3
+    assert summary['errors'] == 2
+    assert summary['operations']['ssm.GetParameter']['calls'] == 1
+
+
+def test_counts_throttles_of_retried_calls(monkeypatch):
+    monkeypatch.setattr(botocore.endpoint.time, 'sleep', lambda seconds: None)
+    config = botocore.config.Config(retries={'mode': 'standard', 'total_max_attempts': 3})
+
+    with instrumentation.recording() as recorder:
+        client = ssm_client(config)
+        throttling_responses(client, throttled=2)
+        client.get_parameter(Name='foo')
+
+        client = ssm_client(config)
+        throttling_responses(client, throttled=3)
+        try:
+            client.get_parameter(Name='foo')
+        except client.exceptions.ClientError:
+            pass
+
+    succeeded, failed = recorder.records
+    assert succeeded.error_code is None
+    assert (succeeded.retries, succeeded.throttles) == (2, 2)
+    assert failed.error_code == 'ThrottlingException'
+    assert (failed.retries, failed.throttles) == (2, 3)  # Every attempt, but the final one only once
+
+
+def test_not_recording_outside_block():
+    with instrumentation.recording() as recorder:
+        pass
+
+    client = ssm_client()
+    with Stubber(client) as stubber:
+        stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}})
+        client.get_parameter(Name='foo')
+
+    assert recorder.records == []
+
+
+def test_instrument_handler_disabled_by_default(monkeypatch):
+    monkeypatch.delenv(instrumentation.ENVIRONMENT_VARIABLE, raising=False)
+
+    def handler(event, context):
+        return event
+
+    assert instrumentation.instrument_handler(handler) is handler
+
+
+def test_instrument_handler_logs_summary(monkeypatch, capsys):
+    monkeypatch.setenv(instrumentation.ENVIRONMENT_VARIABLE, 'true')
+
+    def handler(event, context):
+        client = ssm_client()
+        with Stubber(client) as stubber:
+            stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}})
+            client.get_parameter(Name='foo')
+        return 42
+
+    assert instrumentation.instrument_handler(handler)({}, None) == 42
+    assert '"ssm.GetParameter"' in capsys.readouterr().out
@@ -0,0 +1,70 @@
+import botocore.exceptions
+import pytest
+
+from ..retry import AdaptiveRateLimiter, call, delays
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def throttling_error():
+    return botocore.exceptions.ClientError({'Error': {'Code': 'ThrottlingException'}}, 'PutParameter')
+
+
+def test_delays_are_bounded():
+    assert all(0 <= delay <= 5.0 for delay in delays(attempts=20))
+    assert len(list(delays(attempts=3))) == 3
+
+
+def test_limiter_spaces_calls():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=2, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_limiter_adapts():
+    limiter = AdaptiveRateLimiter(rate=8, minimum_rate=1)
+    limiter.throttled()
+    assert limiter.rate == 4
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.rate == 1
+    limiter.succeeded()
+    assert limiter.rate > 1
+
+
+def test_call_retries_throttling_only(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda seconds: None)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise throttling_error()
+        return 'ok'
+
+    limiter = AdaptiveRateLimiter(rate=1000)
+    assert call(flaky, limiter) == 'ok'
+    assert len(attempts) == 3
+
+    def broken():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        call(broken, limiter)
+
+    def always_throttled():
+        raise throttling_error()
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        call(always_throttled, attempts=2)
@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+
+from .. import tags
+
+
+def test_diff():
+    delta = tags.diff(
+        old=[{'Key': 'a', 'Value': '1'}, {'Key': 'b', 'Value': '2'}, {'Key': 'c', 'Value': '3'}],
+        new={'a': '1', 'b': 'changed', 'd': '4'},
+    )
+    assert delta.to_add == {'b': 'changed', 'd': '4'}
+    assert delta.to_remove == ['c']
+
+    assert tags.diff({'a': '1'}, {'a': '1'}).is_empty()
+
+
+def test_diff_with_live_tags():
+    delta = tags.diff(
+        old={'a': '1', 'gone': 'x', 'already-gone': 'y'},
+        new={'a': '1', 'b': '2', 'c': '3'},
+        live={'b': '2', 'other': 'not ours', 'gone': 'x'},
+    )
+    assert delta.to_add == {'a': '1', 'c': '3'}  # 'a' was removed by someone else
+    assert delta.to_remove == ['gone']
+
+
+def test_reconcile_chunks_and_skips_no_op():
+    client = mock.Mock()
+    adapter = tags.SsmParameterAdapter(client)
+    new = {f"k{i:03d}": 'v' for i in range(120)}
+
+    tags.reconcile(adapter, '/param', old={'x': 'y'}, new=new)
+    assert client.remove_tags_from_resource.call_count == 1
+    assert client.add_tags_to_resource.call_count == 3  # 50 + 50 + 20
+
+    client.reset_mock()
+    tags.reconcile(adapter, '/param', old=new, new=new)
+    assert client.mock_calls == []
+
+
+def test_elasticbeanstalk_adds_and_removes_in_one_call():
+    client = mock.Mock()
+    tags.reconcile(tags.ElasticBeanstalkAdapter(client), 'arn', old={'a': '1'}, new={'b': '2'})
+    client.update_tags_for_resource.assert_called_once_with(
+        ResourceArn='arn', TagsToAdd=[{'Key': 'b', 'Value': '2'}], TagsToRemove=['a'])
+
+
+def test_incomplete_adapter_fails_early():
+    class AddOnly(tags.Adapter):
+        def add(self, resource_id, tags):
+            pass
+
+    with pytest.raises(TypeError):
+        AddOnly()
@@ -1,16 +1,49 @@
+"""
+Custom Resource for requesting DNS validated ACM certificates.
+
+Parameters:
+ * DomainName
+ * SubjectAlternativeNames: (default: none)
+ * Region: (default: current region)
+ * Regions: request the certificate(s) in all of these regions, instead of Region
+ * MaxNamesPerCertificate: split DomainName and SubjectAlternativeNames over
+       several certificates with at most this many names each (default: don't split)
+ * Tags: applied to all certificates
+ * WaitForIssued: wait until all certificates are ISSUED (default: false).
+       Only useful when the validation records already exist, or are created
+       outside of the stack: the records of a domain are the same for every
+       certificate in the account. Waits longer than the Lambda timeout by
+       re-invoking itself.
+
+Return:
+  Ref: the certificate ARN, or a comma separated list of ARNs if more than one
+       certificate was requested
+  Attributes:
+   - DnsRecords: JSON object of the DNS validation records of all certificates
+   - <region>: comma separated list of the certificate ARNs in that region
+   - TimeToIssue: seconds between requesting and issuing the certificates
+       (only with WaitForIssued). Also published as a CloudWatch metric.
+"""
+import collections
 import functools
 import json
 import os
 import re
 import time
 import typing
+from distutils.util import strtobool
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, continuation, instrumentation, metrics, tags
 
 REGION = os.environ['AWS_REGION']
 POLL_INTERVAL_SECONDS = 5
 NOT_ALLOWED_IN_TOKEN = re.compile('[\W]+')
+STILL_VALIDATING_STATUSES = frozenset({'PENDING_VALIDATION'})
 
 
 class DomainValidationNotThere(Exception):
@@ -33,16 +66,23 @@ def get_validation_records(describe_stack_response):
     return json.dumps(result)
 
 
+def region_of_arn(arn: str) -> str:
+    # arn:aws:acm:eu-west-1:123456789012:certificate/...
+    return arn.split(':')[3]
+
+
 class DnsValidatedCertificate(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use version ARN instead
 
     def validate(self):
-        self.region = self.resource_properties.get('Region', REGION)
+        self.regions = self.resource_properties.get('Regions') or [self.resource_properties.get('Region', REGION)]
         self.domain_name = self.resource_properties['DomainName']
         self.subject_alternative_names = self.resource_properties.get(
             'SubjectAlternativeNames', None)
+        self.max_names_per_certificate = self.resource_properties.get('MaxNamesPerCertificate', None)
         self.tags = self.resource_properties.get('Tags', [])
+        self.wait_for_issued = strtobool(self.resource_properties.get('WaitForIssued', 'false'))
 
         # strip trailing dots
         if self.domain_name.endswith('.'):
@@ -53,81 +93,199 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
                     self.subject_alternative_names[i] = san[:-1]
 
     @functools.lru_cache()
-    def regional_acm_client(self):
-        return self.get_boto3_session().client('acm', region_name=self.region)
+    def regional_acm_client(self, region):
+        return concurrency.client('acm', region)
+
+    @property
+    def certificate_arns(self) -> typing.List[str]:
+        return self.physical_resource_id.split(',')
+
+    def name_groups(self) -> typing.List[typing.List[str]]:
+        """
+        :return: the names of every certificate to request; the first name
+                 of each group is its DomainName
+        """
+        names = [self.domain_name]
+        for san in self.subject_alternative_names or []:
+            if san not in names:
+                names.append(san)
+
+        if self.max_names_per_certificate is None:
+            return [names]
+        size = int(self.max_names_per_certificate)
+        return [names[i:i + size] for i in range(0, len(names), size)]
 
     def update_tags(self,
+                    certificate_arn: str,
                     new_tags: typing.List[typing.Dict[str, str]],
                     old_tags: typing.List[typing.Dict[str, str]] = None
                     ) -> None:
-        if old_tags is None:
-            old_tags = []
-
-        if len(old_tags) > 0:
-            new_tags_keys = {
-                tag['Key']: True
-                for tag in new_tags
-            }
-
-            to_delete = []
-
-            for tag in old_tags:
-                if tag['Key'] not in new_tags_keys:
-                    to_delete.append({
-                        'Key': tag['Key']
-                        # omit 'value' to remove the tag regardless of value
-                    })
-
-            if len(to_delete) > 0:
-                self.regional_acm_client().remove_tags_from_certificate(
-                    CertificateArn=self.physical_resource_id,
-                    Tags=to_delete,
-                )
-
-        if len(new_tags) > 0:
-            self.regional_acm_client().add_tags_to_certificate(
-                CertificateArn=self.physical_resource_id,
-                Tags=new_tags,
-            )
-
-    def create(self):
-        idempotency_token = NOT_ALLOWED_IN_TOKEN.sub('', self.context.aws_request_id)[:32]
+        tags.reconcile(
+            tags.AcmCertificateAdapter(self.regional_acm_client(region_of_arn(certificate_arn))),
+            certificate_arn,
+            old=old_tags,
+            new=new_tags,
+        )
 
+    def request_certificate(self, region: str, names: typing.List[str], idempotency_token: str) -> str:
         kwargs = {
-            'DomainName': self.domain_name,
+            'DomainName': names[0],
             'ValidationMethod': 'DNS',
             'IdempotencyToken': idempotency_token,
         }
 
-        if self.subject_alternative_names is not None and \
-                len(self.subject_alternative_names) > 0:
-            kwargs['SubjectAlternativeNames'] = self.subject_alternative_names
+        if len(names) > 1:
+            kwargs['SubjectAlternativeNames'] = names[1:]
+        if len(self.tags) > 0:
+            kwargs['Tags'] = self.tags
 
-        response = self.regional_acm_client().request_certificate(**kwargs)
+        response = self.regional_acm_client(region).request_certificate(**kwargs)
+        return response['CertificateArn']
 
-        self.physical_resource_id = response['CertificateArn']
+    def run_for_all(self, fn: typing.Callable, items: list) -> list:
+        """
+        Call fn for all items concurrently, and raise the errors, if any.
+        """
+        outcomes = concurrency.run_concurrently(fn, items)
+        errors = [
+            "{}: {}".format(outcome.item, outcome.error)
+            for outcome in outcomes
+            if outcome.error is not None
+        ]
+        if len(errors) > 0:
+            raise RuntimeError("; ".join(errors))
+        return [outcome.value for outcome in outcomes]
 
-        self.update_tags(self.tags)
+    def create(self):
+        if continuation.checkpoint(self.event) is not None:
+            return self.resume()
 
-        return self.get_attributes()
+        request_token = NOT_ALLOWED_IN_TOKEN.sub('', self.context.aws_request_id)[:32]
 
-    def get_attributes(self):
-        attributes = {}
-        while 'DnsRecords' not in attributes:
+        certificates = [
+            (region, names)
+            for region in self.regions
+            for names in self.name_groups()
+        ]
+        if len(certificates) == 1:
+            tokens = [request_token]
+        else:
+            # Same token for different requests within an hour would return the same certificate
+            tokens = ["{}{:04d}".format(request_token[:28], i) for i in range(len(certificates))]
+
+        outcomes = concurrency.run_concurrently(
+            lambda i: self.request_certificate(*certificates[i], tokens[i]),
+            list(range(len(certificates))),
+        )
+        # Set before raising or waiting, so a failure still reports the ARNs to clean up
+        certificate_arns = [outcome.value for outcome in outcomes if outcome.error is None]
+        if len(certificate_arns) > 0:
+            self.physical_resource_id = ','.join(certificate_arns)
+        errors = [
+            "{}: {}".format(certificates[outcome.item][0], outcome.error)
+            for outcome in outcomes
+            if outcome.error is not None
+        ]
+        if len(errors) > 0:
+            raise RuntimeError("; ".join(errors))
+
+        attributes = self.get_attributes()
+        if self.wait_for_issued:
+            return self.wait_until_issued(attributes, report_metric=True)
+        return attributes
+
+    def resume(self):
+        state = continuation.checkpoint(self.event)
+        self.physical_resource_id = state['PhysicalResourceId']
+        return self.wait_until_issued(self.get_attributes(), report_metric=state['ReportMetric'])
+
+    def wait_for_validation_records(self, certificate_arn: str, deadline: continuation.Deadline) -> dict:
+        acm_client = self.regional_acm_client(region_of_arn(certificate_arn))
+        while True:
             try:
-                description = self.regional_acm_client().describe_certificate(CertificateArn=self.physical_resource_id)
-                print("Waiting for DNS records...")
-                attributes['DnsRecords'] = get_validation_records(description)
+                description = acm_client.describe_certificate(CertificateArn=certificate_arn)
+                return json.loads(get_validation_records(description))
             except DomainValidationNotThere:
-                if self.context.get_remaining_time_in_millis() < POLL_INTERVAL_SECONDS * 1000 * 2:
-                    print("DNS validation records still not available and time is up. Abort...")
+                if deadline.remaining() < POLL_INTERVAL_SECONDS:
+                    print("DNS validation records of {} still not available and time is up. Abort...".format(
+                        certificate_arn))
                     raise RuntimeError("Timeout waiting for DNS validation records")
-                print("Waiting for DNS validation records to become available...")
                 time.sleep(POLL_INTERVAL_SECONDS)
+
+    def get_attributes(self):
+        # Leave some time to report the result
+        deadline = continuation.Deadline(self.context, margin=POLL_INTERVAL_SECONDS * 2)
+
+        print("Waiting for DNS validation records of {} certificate(s)...".format(len(self.certificate_arns)))
+        dns_records = {}
+        for records in self.run_for_all(
+                lambda arn: self.wait_for_validation_records(arn, deadline),
+                self.certificate_arns,
+        ):
+            dns_records.update(records)  # Validation records are the same across regions
+
+        attributes = {'DnsRecords': json.dumps(dns_records, sort_keys=True)}
+        for certificate_arn in self.certificate_arns:
+            region = region_of_arn(certificate_arn)
+            if region in attributes:
+                attributes[region] += ',' + certificate_arn
+            else:
+                attributes[region] = certificate_arn
         return attributes
 
+    def describe_certificate(self, certificate_arn: str) -> dict:
+        acm_client = self.regional_acm_client(region_of_arn(certificate_arn))
+        return acm_client.describe_certificate(CertificateArn=certificate_arn)['Certificate']
+
+    def wait_until_issued(self, attributes: dict, report_metric: bool) -> dict:
+        """
+        Poll with backoff until all certificates are ISSUED. Continues in a new
+        invocation when this one is about to time out.
+        """
+        deadline = continuation.Deadline(self.context)
+        for delay in continuation.backoff(initial=POLL_INTERVAL_SECONDS):
+            descriptions = self.run_for_all(
+                self.describe_certificate,
+                self.certificate_arns,
+            )
+
+            failed = [
+                "{} is {} ({})".format(d['CertificateArn'], d['Status'], d.get('FailureReason', 'no reason given'))
+                for d in descriptions
+                if d['Status'] != 'ISSUED' and d['Status'] not in STILL_VALIDATING_STATUSES
+            ]
+            if len(failed) > 0:
+                raise RuntimeError("; ".join(failed))
+
+            if all(d['Status'] == 'ISSUED' for d in descriptions):
+                time_to_issue = (
+                    max(d['IssuedAt'] for d in descriptions) - min(d['CreatedAt'] for d in descriptions)
+                ).total_seconds()
+                attributes['TimeToIssue'] = int(time_to_issue)
+                if report_metric:
+                    metrics.put_metric('TimeToIssue', time_to_issue, unit='Seconds', dimensions={
+                        'ResourceType': CUSTOM_RESOURCE_NAME,
+                    })
+                return attributes
+
+            print("Waiting for certificates to be issued: {}".format(json.dumps(
+                collections.Counter(d['Status'] for d in descriptions), sort_keys=True)))
+
+            if deadline.remaining() < delay:
+                continuation.continue_later(self, {
+                    'PhysicalResourceId': self.physical_resource_id,
+                    'ReportMetric': report_metric,
+                })
+                return attributes  # Not sent, the next invocation will respond
+            time.sleep(delay)
+
     def update(self):
+        if continuation.checkpoint(self.event) is not None:
+            return self.resume()
+
         if self.has_property_changed('Region') or \
+                self.has_property_changed('Regions') or \
+                self.has_property_changed('MaxNamesPerCertificate') or \
                 self.has_property_changed('DomainName'):
             return self.create()
             # CloudFormation will call delete() on the old resource
@@ -142,21 +300,38 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
                 return self.create()
                 # CloudFormation will call delete() on the old resource
 
-        self.update_tags(
-            new_tags=self.tags,
-            old_tags=self.old_resource_properties.get('Tags', [])
+        self.run_for_all(
+            lambda arn: self.update_tags(
+                arn,
+                new_tags=self.tags,
+                old_tags=self.old_resource_properties.get('Tags', []),
+            ),
+            self.certificate_arns,
         )
 
-        return self.get_attributes()
+        attributes = self.get_attributes()
+        if self.wait_for_issued:
+            return self.wait_until_issued(attributes, report_metric=False)
+        return attributes
 
-    def delete(self):
+    def delete_certificate(self, certificate_arn: str) -> None:
+        acm_client = self.regional_acm_client(region_of_arn(certificate_arn))
         try:
-            self.regional_acm_client().delete_certificate(
-                CertificateArn=self.physical_resource_id,
+            acm_client.delete_certificate(
+                CertificateArn=certificate_arn,
             )  # delete_certificate does not return anything
-        except self.regional_acm_client().exceptions.ResourceNotFoundException:
+        except acm_client.exceptions.ResourceNotFoundException:
             # Certificate was already deleted
             pass
 
+    def delete(self):
+        if not self.physical_resource_id.startswith('arn:'):
+            return  # Create failed before a certificate was requested
+
+        self.run_for_all(
+            self.delete_certificate,
+            self.certificate_arns,
+        )
+
 
-handler = DnsValidatedCertificate.get_handler()
+handler = instrumentation.instrument_handler(DnsValidatedCertificate.get_handler())
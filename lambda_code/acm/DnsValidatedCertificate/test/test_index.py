@@ -0,0 +1,25 @@
+from unittest import mock
+
+import pytest
+
+from ..index import DnsValidatedCertificate
+
+
+def test_partially_failed_create_reports_requested_certificates():
+    resource = DnsValidatedCertificate()
+    resource.context = mock.Mock(aws_request_id='1234-5678')
+    resource.resource_properties = {'DomainName': 'example.com', 'Regions': ['eu-west-1', 'us-east-1', 'eu-west-3']}
+    resource.validate()
+
+    def request_certificate(region, names, idempotency_token):
+        if region == 'us-east-1':
+            raise RuntimeError("limit exceeded")
+        return f"arn:aws:acm:{region}:123456789012:certificate/{idempotency_token}"
+    resource.request_certificate = request_certificate
+
+    with pytest.raises(RuntimeError, match='us-east-1: limit exceeded'):
+        resource.create()
+    assert resource.certificate_arns == [
+        'arn:aws:acm:eu-west-1:123456789012:certificate/123456780000',
+        'arn:aws:acm:eu-west-3:123456789012:certificate/123456780002',
+    ]
@@ -1,34 +1,155 @@
+import collections
+import datetime
 import json
+import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation
+
+DESCRIBE_BATCH_SIZE = 50  # Names per DescribeAutoScalingGroups call
+PUBLISH_BATCH_SIZE = 10  # PublishBatch limit
+PUBLISH_BATCH_BYTES = 256 * 1024  # PublishBatch limit, of all messages together
+
+
+def chunks(items: list, size: int) -> typing.List[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def publish_batches(messages: typing.List[str]) -> typing.List[typing.List[str]]:
+    """
+    Split the messages in batches within both PublishBatch limits: the number
+    of messages, and their total size. Messages of large groups, with many
+    Instances, may need a batch of their own.
+    """
+    batches = []
+    batch, batch_bytes = [], 0
+    for message in messages:
+        message_bytes = len(message.encode('utf-8'))
+        if len(batch) == PUBLISH_BATCH_SIZE or (len(batch) > 0 and batch_bytes + message_bytes > PUBLISH_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(message)
+        batch_bytes += message_bytes
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
 
 
 class RenotifyAsg(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     def validate(self):
-        self.asg_name = self.resource_properties['AutoScalingGroupName']
+        if 'AutoScalingGroupNames' in self.resource_properties:
+            self.asg_names = self.resource_properties['AutoScalingGroupNames']
+        else:
+            self.asg_names = [self.resource_properties['AutoScalingGroupName']]
+        self.asg_names = sorted(set(self.asg_names))
+
+    def describe_groups(self, as_client) -> typing.Dict[str, dict]:
+        groups = {}
+        paginator = as_client.get_paginator('describe_auto_scaling_groups')
+        for names in chunks(self.asg_names, DESCRIBE_BATCH_SIZE):
+            for page in paginator.paginate(AutoScalingGroupNames=names):
+                for group in page['AutoScalingGroups']:
+                    groups[group['AutoScalingGroupName']] = group
+
+        missing = [name for name in self.asg_names if name not in groups]
+        if len(missing) > 0:
+            raise ValueError(f"AutoScalingGroups not found: {', '.join(missing)}")
+        return groups
+
+    def notification_configurations(self, as_client) -> typing.List[dict]:
+        configurations = []
+        paginator = as_client.get_paginator('describe_notification_configurations')
+        for page in paginator.paginate(AutoScalingGroupNames=self.asg_names):
+            configurations.extend(page['NotificationConfigurations'])
+        return configurations
+
+    def message(self, group: dict, notification_type: str, now: str) -> str:
+        """
+        Message in the format of the notifications sent by AutoScaling itself
+        """
+        return json.dumps({
+            "Service": "AWS Auto Scaling",
+            "Event": notification_type,
+            "Time": now,
+            "RequestId": self.event['RequestId'],
+            "AccountId": group['AutoScalingGroupARN'].split(':')[4],
+            "AutoScalingGroupName": group['AutoScalingGroupName'],
+            "AutoScalingGroupARN": group['AutoScalingGroupARN'],
+            "Description": f"Renotify of {group['AutoScalingGroupName']} by {self.stack_id}",
+            "Cause": "Renotify",
+            "Details": {
+                "MinSize": group['MinSize'],
+                "MaxSize": group['MaxSize'],
+                "DesiredCapacity": group['DesiredCapacity'],
+                "AvailabilityZones": group['AvailabilityZones'],
+                "LaunchConfigurationName": group.get('LaunchConfigurationName'),
+                "LaunchTemplate": group.get('LaunchTemplate'),
+                "Instances": [
+                    {
+                        "InstanceId": instance['InstanceId'],
+                        "AvailabilityZone": instance['AvailabilityZone'],
+                        "LifecycleState": instance['LifecycleState'],
+                        "HealthStatus": instance['HealthStatus'],
+                    }
+                    for instance in group.get('Instances', [])
+                ],
+            },
+        }, sort_keys=True)
+
+    @staticmethod
+    def publish(sns_client, topic_arn: str, messages: typing.List[str]) -> None:
+        if len(messages) == 1:
+            sns_client.publish(TopicArn=topic_arn, Message=messages[0])
+            return
+
+        response = sns_client.publish_batch(
+            TopicArn=topic_arn,
+            PublishBatchRequestEntries=[
+                {'Id': f"m{i}", 'Message': message}
+                for i, message in enumerate(messages)
+            ],
+        )
+        failed = response.get('Failed', [])
+        if len(failed) > 0:
+            raise RuntimeError(f"{len(failed)} messages failed: " +
+                               "; ".join(f"{f['Code']}: {f.get('Message', '')}" for f in failed))
 
     def create(self):
         as_client = self.get_boto3_client('autoscaling')
         sns_client = self.get_boto3_client('sns')
 
-        notification_paginator = as_client.get_paginator('describe_notification_configurations')
-        notification_iterator = notification_paginator.paginate(
-            AutoScalingGroupNames=[
-                self.asg_name,
-            ],
+        groups = self.describe_groups(as_client)
+        now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+        messages_by_topic = collections.defaultdict(list)
+        for notification in self.notification_configurations(as_client):
+            messages_by_topic[notification['TopicARN']].append(self.message(
+                groups[notification['AutoScalingGroupName']],
+                notification['NotificationType'],
+                now,
+            ))
+
+        batches = [
+            (topic_arn, batch)
+            for topic_arn, messages in sorted(messages_by_topic.items())
+            for batch in publish_batches(messages)
+        ]
+        print(f"Publishing {sum(len(batch) for _, batch in batches)} notifications "
+              f"to {len(messages_by_topic)} topics")
+        outcomes = concurrency.run_concurrently(
+            lambda topic_and_batch: self.publish(sns_client, *topic_and_batch),
+            batches,
         )
-        for page in notification_iterator:
-            for notification in page['NotificationConfigurations']:
-                sns_client.publish(
-                    TopicArn=notification['TopicARN'],
-                    Message=json.dumps({
-                        "AutoScalingGroupName": self.asg_name,
-                        # TODO: this is incomplete; add additional fields
-                    }),
-                )
+        errors = [f"{outcome.item[0]}: {outcome.error}" for outcome in outcomes if outcome.error is not None]
+        if len(errors) > 0:
+            raise RuntimeError(f"Publishing failed for {len(errors)} of {len(batches)} batches: " +
+                               "; ".join(errors))
 
         return {}
 
@@ -39,4 +160,4 @@ class RenotifyAsg(CloudFormationCustomResource):
         pass
 
 
-handler = RenotifyAsg.get_handler()
+handler = instrumentation.instrument_handler(RenotifyAsg.get_handler())
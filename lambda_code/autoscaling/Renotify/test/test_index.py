@@ -0,0 +1,123 @@
+import json
+from unittest import mock
+
+import pytest
+
+from ..index import PUBLISH_BATCH_BYTES, PUBLISH_BATCH_SIZE, RenotifyAsg, publish_batches
+
+
+def test_publish_batches_limits_count():
+    batches = publish_batches([f"m{i}" for i in range(25)])
+    assert [len(batch) for batch in batches] == [PUBLISH_BATCH_SIZE, PUBLISH_BATCH_SIZE, 5]
+
+
+def test_publish_batches_limits_size():
+    large = 'x' * (PUBLISH_BATCH_BYTES // 3)
+    batches = publish_batches([large] * 4 + ['small'])
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert all(sum(len(m) for m in batch) <= PUBLISH_BATCH_BYTES for batch in batches)
+
+
+def test_publish_batches_keeps_order():
+    messages = [f"m{i}" for i in range(12)]
+    assert sum(publish_batches(messages), []) == messages
+
+
+def group(name, instances=1):
+    return {
+        'AutoScalingGroupName': name,
+        'AutoScalingGroupARN': f"arn:aws:autoscaling:eu-west-1:123456789012:autoScalingGroup:uuid:"
+                               f"autoScalingGroupName/{name}",
+        'MinSize': 1, 'MaxSize': 3, 'DesiredCapacity': 2,
+        'AvailabilityZones': ['eu-west-1a'],
+        'LaunchTemplate': {'LaunchTemplateName': 'lt', 'Version': '1'},
+        'Instances': [
+            {'InstanceId': f"i-{i}", 'AvailabilityZone': 'eu-west-1a', 'LifecycleState': 'InService',
+             'HealthStatus': 'Healthy', 'ProtectedFromScaleIn': False}
+            for i in range(instances)
+        ],
+    }
+
+
+def paginator(key, items):
+    result = mock.Mock()
+    result.paginate.side_effect = lambda **kwargs: [{key: items}]
+    return result
+
+
+def renotify(groups, notifications):
+    autoscaling = mock.Mock()
+    autoscaling.get_paginator.side_effect = lambda operation: {
+        'describe_auto_scaling_groups': paginator('AutoScalingGroups', groups),
+        'describe_notification_configurations': paginator('NotificationConfigurations', [
+            {'AutoScalingGroupName': name, 'TopicARN': topic, 'NotificationType': notification_type}
+            for name, topic, notification_type in notifications
+        ]),
+    }[operation]
+    sns = mock.Mock()
+    sns.publish_batch.return_value = {'Successful': []}
+
+    resource = RenotifyAsg()
+    resource.BOTO3_CLIENTS = {'autoscaling': autoscaling, 'sns': sns}
+    resource.event = {'RequestId': 'request-1'}
+    resource.stack_id = 'stack-1'
+    resource.resource_properties = {'AutoScalingGroupNames': [g['AutoScalingGroupName'] for g in groups]}
+    resource.validate()
+    return resource, sns
+
+
+def test_message_has_autoscaling_format():
+    resource, sns = renotify([group('asg', instances=2)], [('asg', 'topic-1', 'autoscaling:EC2_INSTANCE_LAUNCH')])
+    resource.create()
+
+    sns.publish_batch.assert_not_called()
+    message = json.loads(sns.publish.call_args[1]['Message'])
+    assert sns.publish.call_args[1]['TopicArn'] == 'topic-1'
+    assert message['Event'] == 'autoscaling:EC2_INSTANCE_LAUNCH'
+    assert message['AccountId'] == '123456789012'
+    assert message['RequestId'] == 'request-1'
+    assert message['AutoScalingGroupName'] == 'asg'
+    assert message['Details']['DesiredCapacity'] == 2
+    assert message['Details']['Instances'] == [
+        {'InstanceId': f"i-{i}", 'AvailabilityZone': 'eu-west-1a', 'LifecycleState': 'InService',
+         'HealthStatus': 'Healthy'}
+        for i in range(2)
+    ]
+
+
+def test_several_messages_per_topic_are_batched():
+    groups = [group(f"asg{i}") for i in range(12)]
+    resource, sns = renotify(groups, [
+        (g['AutoScalingGroupName'], 'topic-1', 'autoscaling:EC2_INSTANCE_LAUNCH') for g in groups
+    ] + [('asg0', 'topic-2', 'autoscaling:EC2_INSTANCE_TERMINATE')])
+    resource.create()
+
+    batch_sizes = sorted(len(call[1]['PublishBatchRequestEntries']) for call in sns.publish_batch.call_args_list)
+    assert batch_sizes == [2, 10]
+    assert {call[1]['TopicArn'] for call in sns.publish_batch.call_args_list} == {'topic-1'}
+    sns.publish.assert_called_once()
+    assert sns.publish.call_args[1]['TopicArn'] == 'topic-2'
+
+
+def test_failures_are_aggregated():
+    groups = [group('asg0'), group('asg1')]
+    resource, sns = renotify(groups, [
+        ('asg0', 'topic-1', 'autoscaling:EC2_INSTANCE_LAUNCH'),
+        ('asg1', 'topic-1', 'autoscaling:EC2_INSTANCE_LAUNCH'),
+        ('asg0', 'topic-2', 'autoscaling:EC2_INSTANCE_LAUNCH'),
+    ])
+    sns.publish_batch.return_value = {'Failed': [{'Id': 'm1', 'Code': 'KMSDisabled', 'SenderFault': True}]}
+    sns.publish.side_effect = RuntimeError("topic-2 not found")
+
+    with pytest.raises(RuntimeError) as e:
+        resource.create()
+    assert "2 of 2 batches" in str(e.value)
+    assert "KMSDisabled" in str(e.value)
+    assert "topic-2 not found" in str(e.value)
+
+
+def test_missing_group_fails():
+    resource, sns = renotify([group('asg')], [])
+    resource.asg_names = ['asg', 'gone']
+    with pytest.raises(ValueError, match='gone'):
+        resource.create()
@@ -0,0 +1,175 @@
+"""
+Custom Resource for an alias with provisioned concurrency
+
+Parameters:
+ * FunctionName: required: name or ARN of the function
+ * FunctionVersion: required: version for the alias, e.g. the Version attribute of awslambda.Version
+ * Name: required: name of the alias
+ * Description: optional: description of the alias
+ * ProvisionedConcurrentExecutions: required: 0 to remove the provisioned concurrency
+ * WaitForReady: optional: wait until the provisioned concurrency is READY. Default: true
+
+Waiting is done with backoff, and continues in a new invocation of the
+function when it takes longer than the Lambda timeout, so the stack only
+continues once the capacity is warm.
+
+Return:
+  PhysicalResourceId: the ARN of the alias
+  Attributes:
+   - Arn: the ARN of the alias
+   - FunctionVersion: the version the alias points to
+   - Status: status of the provisioned concurrency (READY or IN_PROGRESS), or NONE
+"""
+import time
+from distutils.util import strtobool
+
+from cfn_custom_resource import CloudFormationCustomResource
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import continuation, instrumentation, metrics
+
+
+class ProvisionedConcurrencyAlias(CloudFormationCustomResource):
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use alias ARN instead
+
+    def validate(self):
+        self.function_name = self.resource_properties['FunctionName']
+        self.function_version = str(self.resource_properties['FunctionVersion'])
+        self.alias_name = self.resource_properties['Name']
+        self.description = self.resource_properties.get('Description', '')
+        self.provisioned_concurrency = int(self.resource_properties['ProvisionedConcurrentExecutions'])
+        self.wait_for_ready = strtobool(self.resource_properties.get('WaitForReady', 'true'))
+
+    def attributes(self, status: str) -> dict:
+        return {
+            'Arn': self.physical_resource_id,
+            'FunctionVersion': self.function_version,
+            'Status': status,
+        }
+
+    def configure_provisioned_concurrency(self) -> None:
+        lambda_client = self.get_boto3_client('lambda')
+        if self.provisioned_concurrency > 0:
+            print(f"Provisioning {self.provisioned_concurrency} concurrent executions for {self.alias_name}")
+            lambda_client.put_provisioned_concurrency_config(
+                FunctionName=self.function_name,
+                Qualifier=self.alias_name,
+                ProvisionedConcurrentExecutions=self.provisioned_concurrency,
+            )
+        else:
+            self.remove_provisioned_concurrency(self.function_name, self.alias_name)
+
+    def remove_provisioned_concurrency(self, function_name: str, alias_name: str) -> None:
+        lambda_client = self.get_boto3_client('lambda')
+        try:
+            lambda_client.delete_provisioned_concurrency_config(
+                FunctionName=function_name,
+                Qualifier=alias_name,
+            )
+        except lambda_client.exceptions.ResourceNotFoundException:
+            pass
+
+    def wait_until_ready(self, started_at: float) -> dict:
+        """
+        Poll with backoff until the provisioned concurrency is READY. Continues
+        in a new invocation when this one is about to time out.
+        """
+        if self.provisioned_concurrency == 0:
+            return self.attributes('NONE')
+        if not self.wait_for_ready:
+            return self.attributes('IN_PROGRESS')
+
+        lambda_client = self.get_boto3_client('lambda')
+        deadline = continuation.Deadline(self.context)
+        for delay in continuation.backoff(initial=5, maximum=30):
+            config = lambda_client.get_provisioned_concurrency_config(
+                FunctionName=self.function_name,
+                Qualifier=self.alias_name,
+            )
+            status = config['Status']
+            print(f"Provisioned concurrency of {self.alias_name} is {status}: "
+                  f"{config.get('AvailableProvisionedConcurrentExecutions', 0)} of "
+                  f"{config.get('RequestedProvisionedConcurrentExecutions')} available")
+
+            if status == 'READY':
+                metrics.put_metric('TimeToReady', time.time() - started_at, unit='Seconds', dimensions={
+                    'ResourceType': CUSTOM_RESOURCE_NAME,
+                })
+                return self.attributes(status)
+            if status == 'FAILED':
+                raise RuntimeError(f"Provisioned concurrency failed: {config.get('StatusReason', 'no reason given')}")
+
+            if deadline.remaining() < delay:
+                continuation.continue_later(self, {
+                    'PhysicalResourceId': self.physical_resource_id,
+                    'StartedAt': started_at,
+                })
+                return self.attributes(status)  # Not sent, the next invocation will respond
+            time.sleep(delay)
+
+    def resume(self) -> dict:
+        state = continuation.checkpoint(self.event)
+        self.physical_resource_id = state['PhysicalResourceId']
+        return self.wait_until_ready(state['StartedAt'])
+
+    def create(self):
+        if continuation.checkpoint(self.event) is not None:
+            return self.resume()
+
+        started_at = time.time()
+        lambda_client = self.get_boto3_client('lambda')
+        alias_kwargs = {
+            'FunctionName': self.function_name,
+            'Name': self.alias_name,
+            'FunctionVersion': self.function_version,
+            'Description': self.description,
+        }
+        try:
+            alias = lambda_client.create_alias(**alias_kwargs)
+        except lambda_client.exceptions.ResourceConflictException:
+            # e.g. a retried Create: take over the existing alias
+            print(f"Alias {self.alias_name} already exists, updating it")
+            alias = lambda_client.update_alias(**alias_kwargs)
+        self.physical_resource_id = alias['AliasArn']
+        self.configure_provisioned_concurrency()
+        return self.wait_until_ready(started_at)
+
+    def update(self):
+        if continuation.checkpoint(self.event) is not None:
+            return self.resume()
+
+        if self.has_property_changed('FunctionName') or self.has_property_changed('Name'):
+            return self.create()
+            # CloudFormation will call delete() on the old alias
+
+        started_at = time.time()
+        self.get_boto3_client('lambda').update_alias(
+            FunctionName=self.function_name,
+            Name=self.alias_name,
+            FunctionVersion=self.function_version,
+            Description=self.description,
+        )
+        # Pointing the alias to another version re-allocates the provisioned concurrency by itself
+        if self.has_property_changed('ProvisionedConcurrentExecutions'):
+            self.configure_provisioned_concurrency()
+        return self.wait_until_ready(started_at)
+
+    def delete(self):
+        if not self.physical_resource_id.startswith('arn:'):
+            return  # Create failed before creating the alias
+
+        # arn:aws:lambda:region:account:function:function-name:alias-name
+        _, _, _, _, _, _, function_name, alias_name = self.physical_resource_id.split(':')
+        self.remove_provisioned_concurrency(function_name, alias_name)
+
+        lambda_client = self.get_boto3_client('lambda')
+        try:
+            lambda_client.delete_alias(FunctionName=function_name, Name=alias_name)
+        except lambda_client.exceptions.ResourceNotFoundException:
+            pass
+
+
+handler = instrumentation.instrument_handler(ProvisionedConcurrencyAlias.get_handler())
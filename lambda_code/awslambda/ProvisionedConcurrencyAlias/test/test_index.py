@@ -0,0 +1,129 @@
+from unittest import mock
+
+import botocore.session
+import pytest
+from botocore.stub import Stubber
+
+from ..index import ProvisionedConcurrencyAlias
+
+ALIAS_ARN = 'arn:aws:lambda:eu-west-1:123456789012:function:f:live'
+PROPERTIES = {'FunctionName': 'f', 'FunctionVersion': '3', 'Name': 'live', 'ProvisionedConcurrentExecutions': '5'}
+ALIAS_PARAMS = {'FunctionName': 'f', 'Name': 'live', 'FunctionVersion': '3', 'Description': ''}
+CONFIG_PARAMS = {'FunctionName': 'f', 'Qualifier': 'live'}
+
+
+def alias_resource(properties=None, old_properties=None, event=None, physical_resource_id=None):
+    client = botocore.session.get_session().create_client(
+        'lambda',
+        region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+    )
+    resource = ProvisionedConcurrencyAlias()
+    resource.BOTO3_CLIENTS = {'lambda': client}
+    resource.context = mock.Mock()
+    resource.context.get_remaining_time_in_millis.return_value = 900 * 1000
+    resource.event = event or {}
+    resource.resource_properties = dict(PROPERTIES, **(properties or {}))
+    resource.old_resource_properties = dict(PROPERTIES, **(old_properties or {}))
+    resource.physical_resource_id = physical_resource_id
+    resource.validate()
+    return resource, Stubber(client)
+
+
+def alias_response():
+    return {'AliasArn': ALIAS_ARN, 'Name': 'live', 'FunctionVersion': '3'}
+
+
+def config_response(status, **kwargs):
+    return dict({'Status': status, 'RequestedProvisionedConcurrentExecutions': 5}, **kwargs)
+
+
+@mock.patch('time.sleep')
+def test_create_waits_until_ready(sleep):
+    resource, stubber = alias_resource()
+    stubber.add_response('create_alias', alias_response(), ALIAS_PARAMS)
+    stubber.add_response('put_provisioned_concurrency_config', {'Status': 'IN_PROGRESS'},
+                         dict(CONFIG_PARAMS, ProvisionedConcurrentExecutions=5))
+    stubber.add_response('get_provisioned_concurrency_config', config_response('IN_PROGRESS'), CONFIG_PARAMS)
+    stubber.add_response('get_provisioned_concurrency_config', config_response('READY'), CONFIG_PARAMS)
+    with stubber:
+        assert resource.create() == {'Arn': ALIAS_ARN, 'FunctionVersion': '3', 'Status': 'READY'}
+    stubber.assert_no_pending_responses()
+    assert resource.physical_resource_id == ALIAS_ARN
+    assert sleep.call_count == 1
+
+
+def test_create_takes_over_existing_alias():
+    resource, stubber = alias_resource({'WaitForReady': 'false'})
+    stubber.add_client_error('create_alias', service_error_code='ResourceConflictException')
+    stubber.add_response('update_alias', alias_response(), ALIAS_PARAMS)
+    stubber.add_response('put_provisioned_concurrency_config', {'Status': 'IN_PROGRESS'},
+                         dict(CONFIG_PARAMS, ProvisionedConcurrentExecutions=5))
+    with stubber:
+        assert resource.create()['Status'] == 'IN_PROGRESS'
+    stubber.assert_no_pending_responses()
+    assert resource.physical_resource_id == ALIAS_ARN
+
+
+def test_create_fails_when_provisioning_fails():
+    resource, stubber = alias_resource()
+    stubber.add_response('create_alias', alias_response(), ALIAS_PARAMS)
+    stubber.add_response('put_provisioned_concurrency_config', {'Status': 'IN_PROGRESS'},
+                         dict(CONFIG_PARAMS, ProvisionedConcurrentExecutions=5))
+    stubber.add_response('get_provisioned_concurrency_config',
+                         config_response('FAILED', StatusReason='not enough concurrency'), CONFIG_PARAMS)
+    with stubber, pytest.raises(RuntimeError, match='not enough concurrency'):
+        resource.create()
+    assert resource.physical_resource_id == ALIAS_ARN  # So the alias is deleted
+
+
+def test_create_continues_later_when_out_of_time():
+    resource, stubber = alias_resource()
+    resource.context.get_remaining_time_in_millis.return_value = 12 * 1000
+    stubber.add_response('create_alias', alias_response(), ALIAS_PARAMS)
+    stubber.add_response('put_provisioned_concurrency_config', {'Status': 'IN_PROGRESS'},
+                         dict(CONFIG_PARAMS, ProvisionedConcurrentExecutions=5))
+    stubber.add_response('get_provisioned_concurrency_config', config_response('IN_PROGRESS'), CONFIG_PARAMS)
+    with stubber, mock.patch('_runtime.continuation.continue_later') as continue_later:
+        resource.create()
+    state = continue_later.call_args[0][1]
+    assert state['PhysicalResourceId'] == ALIAS_ARN
+
+
+def test_resume_from_checkpoint_only_waits():
+    resource, stubber = alias_resource(event={'CustomResourcesContinuation': {
+        'PhysicalResourceId': ALIAS_ARN, 'StartedAt': 1000.0, 'Invocation': 2,
+    }})
+    stubber.add_response('get_provisioned_concurrency_config', config_response('READY'), CONFIG_PARAMS)
+    with stubber:
+        assert resource.create()['Status'] == 'READY'
+    stubber.assert_no_pending_responses()  # No create_alias
+    assert resource.physical_resource_id == ALIAS_ARN
+
+
+def test_update_of_version_only_updates_alias():
+    resource, stubber = alias_resource({'WaitForReady': 'false'}, {'FunctionVersion': '2'},
+                                       physical_resource_id=ALIAS_ARN)
+    stubber.add_response('update_alias', alias_response(), ALIAS_PARAMS)
+    with stubber:
+        assert resource.update()['Status'] == 'IN_PROGRESS'
+    stubber.assert_no_pending_responses()
+
+
+def test_update_of_concurrency_to_zero_removes_config():
+    resource, stubber = alias_resource({'ProvisionedConcurrentExecutions': '0'}, physical_resource_id=ALIAS_ARN)
+    stubber.add_response('update_alias', alias_response(), ALIAS_PARAMS)
+    stubber.add_response('delete_provisioned_concurrency_config', {}, CONFIG_PARAMS)
+    with stubber:
+        assert resource.update()['Status'] == 'NONE'
+    stubber.assert_no_pending_responses()
+
+
+def test_delete_removes_config_and_alias():
+    resource, stubber = alias_resource(physical_resource_id=ALIAS_ARN)
+    stubber.add_client_error('delete_provisioned_concurrency_config', service_error_code='ResourceNotFoundException')
+    stubber.add_response('delete_alias', {}, {'FunctionName': 'f', 'Name': 'live'})
+    with stubber:
+        resource.delete()
+    stubber.assert_no_pending_responses()
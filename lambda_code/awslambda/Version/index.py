@@ -1,11 +1,27 @@
 import os
+import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation
 
 
 REGION = os.environ['AWS_REGION']
 
+# Configuration that is part of a published version, next to the code
+CONFIGURATION_FIELDS = (
+    'Runtime', 'Role', 'Handler', 'Timeout', 'MemorySize', 'Environment', 'VpcConfig',
+    'DeadLetterConfig', 'TracingConfig', 'Layers', 'FileSystemConfigs', 'ImageConfigResponse',
+    'Architectures', 'EphemeralStorage', 'PackageType',
+)
+
+
+def version_number(version: dict) -> int:
+    return int(version['Version'])
+
 
 class Version(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
@@ -20,24 +36,107 @@ class Version(CloudFormationCustomResource):
                 self.kwargs['CodeSha256'] = self.resource_properties['CodeSha256']
             if 'Description' in self.resource_properties:
                 self.kwargs['Description'] = self.resource_properties['Description']
+            self.retain = self.resource_properties.get('Retain', None)
+            if self.retain is not None:
+                self.retain = int(self.retain)
 
             return True
 
-        except (AttributeError, KeyError):
+        except (AttributeError, KeyError, ValueError):
             return False
 
+    def list_versions(self) -> typing.Tuple[dict, typing.List[dict]]:
+        """
+        :return: $LATEST, and the published versions, oldest first
+        """
+        latest = None
+        versions = []
+        paginator = self.get_boto3_client('lambda').get_paginator('list_versions_by_function')
+        for page in paginator.paginate(FunctionName=self.kwargs['FunctionName']):
+            for version in page['Versions']:
+                if version['Version'] == '$LATEST':
+                    latest = version
+                else:
+                    versions.append(version)
+        return latest, sorted(versions, key=version_number)
+
+    def aliased_versions(self) -> typing.Set[str]:
+        aliased = set()
+        paginator = self.get_boto3_client('lambda').get_paginator('list_aliases')
+        for page in paginator.paginate(FunctionName=self.kwargs['FunctionName']):
+            for alias in page['Aliases']:
+                aliased.add(alias['FunctionVersion'])
+                aliased.update(alias.get('RoutingConfig', {}).get('AdditionalVersionWeights', {}).keys())
+        return aliased
+
+    def is_published(self, latest: dict, version: dict) -> bool:
+        """
+        Whether `version` already has the code and configuration that would be published
+        """
+        code_sha256 = self.kwargs.get('CodeSha256', latest['CodeSha256'])
+        return version['CodeSha256'] == code_sha256 == latest['CodeSha256'] and \
+            version.get('Description', '') == self.kwargs.get('Description', latest.get('Description', '')) and \
+            all(version.get(field) == latest.get(field) for field in CONFIGURATION_FIELDS)
+
+    def delete_versions(self, versions: typing.List[dict]) -> None:
+        lambda_client = self.get_boto3_client('lambda')
+
+        def delete_version(version):
+            try:
+                lambda_client.delete_function(FunctionName=version['FunctionArn'])
+            except lambda_client.exceptions.ResourceNotFoundException:
+                pass
+
+        print(f"Deleting versions {', '.join(version['Version'] for version in versions)}")
+        outcomes = concurrency.run_concurrently(delete_version, versions, max_workers=4)
+        for outcome in outcomes:
+            if outcome.error is not None:
+                # e.g. still in use by provisioned concurrency; try again next time
+                print(f"Could not delete version {outcome.item['Version']}: {outcome.error}")
+
+    def prune(self, current: dict, versions: typing.List[dict]) -> None:
+        keep = {version['Version'] for version in versions[-self.retain:]} if self.retain > 0 else set()
+        keep.add(current['Version'])
+        keep.update(self.aliased_versions())
+        to_delete = [version for version in versions if version['Version'] not in keep]
+        if len(to_delete) > 0:
+            self.delete_versions(to_delete)
+
     def create(self):
-        result = self.get_boto3_client('lambda').publish_version(**self.kwargs)
-        self.physical_resource_id = result['FunctionArn']
-        return {}
+        latest, versions = self.list_versions()
+        if len(versions) > 0 and self.is_published(latest, versions[-1]):
+            current = versions[-1]
+            print(f"Version {current['Version']} already has code {current['CodeSha256']}, not publishing")
+        else:
+            current = self.get_boto3_client('lambda').publish_version(**self.kwargs)
+            versions.append(current)
+
+        self.physical_resource_id = current['FunctionArn']
+
+        if self.retain is not None:
+            self.prune(current, versions)
+
+        return {
+            'Version': current['Version'],
+            'CodeSha256': current['CodeSha256'],
+        }
 
     def update(self):
         return self.create()
 
     def delete(self):
-        self.get_boto3_client('lambda').delete_function(
-            FunctionName=self.physical_resource_id,
-        )
+        if self.retain is not None:
+            # Leave the version for rollbacks; it's pruned by the next publish, or deleted with the function
+            return
+        if not self.physical_resource_id.startswith('arn:'):
+            return  # Create failed, nothing was published
+        lambda_client = self.get_boto3_client('lambda')
+        try:
+            lambda_client.delete_function(
+                FunctionName=self.physical_resource_id,
+            )
+        except lambda_client.exceptions.ResourceNotFoundException:
+            pass
 
 
-handler = Version.get_handler()
+handler = instrumentation.instrument_handler(Version.get_handler())
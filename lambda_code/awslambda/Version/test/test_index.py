@@ -0,0 +1,96 @@
+from unittest import mock
+
+from ..index import Version
+
+FUNCTION_ARN = 'arn:aws:lambda:eu-west-1:123456789012:function:f'
+
+
+class ResourceNotFoundException(Exception):
+    pass
+
+
+def function_version(number, code_sha256='abc', **configuration):
+    return dict({
+        'FunctionArn': FUNCTION_ARN if number == '$LATEST' else f"{FUNCTION_ARN}:{number}",
+        'Version': str(number),
+        'CodeSha256': code_sha256,
+        'Runtime': 'python3.8',
+        'MemorySize': 128,
+    }, **configuration)
+
+
+def paginator(key, items):
+    result = mock.Mock()
+    result.paginate.return_value = [{key: items}]
+    return result
+
+
+def version_resource(properties, versions, aliases=()):
+    client = mock.Mock()
+    client.exceptions.ResourceNotFoundException = ResourceNotFoundException
+    client.get_paginator.side_effect = lambda operation: {
+        'list_versions_by_function': paginator('Versions', versions),
+        'list_aliases': paginator('Aliases', list(aliases)),
+    }[operation]
+    client.publish_version.side_effect = lambda **kwargs: function_version(
+        max(int(v['Version']) for v in versions if v['Version'] != '$LATEST') + 1,
+        code_sha256=versions[0]['CodeSha256'],
+    )
+
+    resource = Version()
+    resource.BOTO3_CLIENTS = {'lambda': client}
+    resource.resource_properties = dict({'FunctionName': 'f'}, **properties)
+    resource.validate()
+    return resource, client
+
+
+def deleted(client):
+    return sorted(call[1]['FunctionName'] for call in client.delete_function.call_args_list)
+
+
+def test_does_not_publish_when_newest_version_is_the_same():
+    resource, client = version_resource({}, [
+        function_version('$LATEST', code_sha256='new'),
+        function_version(1, code_sha256='old'),
+        function_version(2, code_sha256='new'),
+    ])
+    assert resource.create() == {'Version': '2', 'CodeSha256': 'new'}
+    client.publish_version.assert_not_called()
+    assert resource.physical_resource_id == f"{FUNCTION_ARN}:2"
+
+
+def test_publishes_when_configuration_changed():
+    resource, client = version_resource({}, [
+        function_version('$LATEST', MemorySize=256),
+        function_version(1),
+    ])
+    assert resource.create()['Version'] == '2'
+    client.publish_version.assert_called_once_with(FunctionName='f')
+
+
+def test_publishes_when_only_an_older_version_is_the_same():
+    resource, client = version_resource({}, [
+        function_version('$LATEST', code_sha256='a'),
+        function_version(1, code_sha256='a'),
+        function_version(2, code_sha256='b'),  # e.g. after a rollback
+    ])
+    assert resource.create()['Version'] == '3'
+
+
+def test_retain_keeps_newest_and_aliased_versions():
+    resource, client = version_resource({'Retain': '2'}, [
+        function_version('$LATEST', code_sha256='new'),
+        *(function_version(i) for i in range(1, 6)),
+    ], aliases=[
+        {'Name': 'live', 'FunctionVersion': '1'},
+        {'Name': 'canary', 'FunctionVersion': '3', 'RoutingConfig': {'AdditionalVersionWeights': {'2': 0.1}}},
+    ])
+    assert resource.create()['Version'] == '6'
+    assert deleted(client) == [f"{FUNCTION_ARN}:4"]  # 5 and 6 are the newest, 1, 2 and 3 are aliased
+
+
+def test_retain_leaves_version_on_delete():
+    resource, client = version_resource({'Retain': '2'}, [])
+    resource.physical_resource_id = f"{FUNCTION_ARN}:3"
+    resource.delete()
+    client.delete_function.assert_not_called()
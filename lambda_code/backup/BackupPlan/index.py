@@ -5,6 +5,7 @@ try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation, tags
 
 
 REGION = os.environ['AWS_REGION']
@@ -16,7 +17,7 @@ class BackupPlan(CloudFormationCustomResource):
 
     def validate(self):
         self.backup_plan = self.resource_properties['BackupPlan']
-        self.backup_plan_tags = self.resource_properties.get('BackupPlanTags', [])
+        self.backup_plan_tags = self.resource_properties.get('BackupPlanTags', {})
 
         # Replace string to int for some key's
         for rule in self.backup_plan["Rules"]:
@@ -56,6 +57,13 @@ class BackupPlan(CloudFormationCustomResource):
 
         resp = bu.update_backup_plan(**params)
 
+        tags.reconcile(
+            tags.BackupAdapter(bu),
+            resp['BackupPlanArn'],
+            old=self.old_resource_properties.get('BackupPlanTags', {}),
+            new=self.backup_plan_tags,
+        )
+
         return {}
 
     def delete(self):
@@ -68,4 +76,4 @@ class BackupPlan(CloudFormationCustomResource):
             pass
 
 
-handler = BackupPlan.get_handler()
+handler = instrumentation.instrument_handler(BackupPlan.get_handler())
@@ -5,6 +5,7 @@ try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -48,4 +49,4 @@ class BackupPlan(CloudFormationCustomResource):
             pass
 
 
-handler = BackupPlan.get_handler()
+handler = instrumentation.instrument_handler(BackupPlan.get_handler())
@@ -5,6 +5,7 @@ try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -45,4 +46,4 @@ class BackupVault(CloudFormationCustomResource):
             pass
 
 
-handler = BackupVault.get_handler()
+handler = instrumentation.instrument_handler(BackupVault.get_handler())
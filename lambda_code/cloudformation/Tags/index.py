@@ -5,6 +5,7 @@ import traceback
 import six
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation, tags
 
 
 REGION = os.environ['AWS_REGION']
@@ -23,7 +24,7 @@ class Tags(CloudFormationCustomResource):
         self.omit = self.resource_properties.get('Omit', [])
         self.set = self.resource_properties.get('Set', {})
 
-    def create(self):
+    def get_stack_tags(self):
         stack_region = self.stack_id.split(':')[3]
 
         print(f"Getting tags set on {self.stack_id} in region {stack_region}")
@@ -38,12 +39,13 @@ class Tags(CloudFormationCustomResource):
         )
 
         stack_description = stack_description['Stacks'][0]
-        tags_dict = {
-            tag['Key']: tag['Value']
-            for tag in stack_description['Tags']
-        }
+        return tags.to_dict(stack_description['Tags'])
+
+    def create(self):
+        # Not cached: the stack tags can change between deploys
+        tags_dict = self.get_stack_tags()
         print("Found tags:")
-        print(json.dumps(tags_dict))
+        print(json.dumps(tags_dict, sort_keys=True))
 
         for key in self.omit:
             tags_dict.pop(key, None)
@@ -51,15 +53,15 @@ class Tags(CloudFormationCustomResource):
         for key, value in self.set.items():
             tags_dict[key] = value
 
+        # Sorted, so the same tags always give the same attributes, and
+        # resources using them are not updated needlessly
+        tags_dict = dict(sorted(tags_dict.items()))
         print("Tags after Omit/Set:")
         print(json.dumps(tags_dict))
 
         attrs = tags_dict.copy()
         attrs['TagDict'] = tags_dict.copy()
-        attrs['TagList'] = [
-            {'Key': k, 'Value': v}
-            for k, v in tags_dict.items()
-        ]
+        attrs['TagList'] = tags.to_list(tags_dict)
 
         print("Returning Attributes:")
         print(json.dumps(attrs))
@@ -102,4 +104,4 @@ class Tags(CloudFormationCustomResource):
             resource._base_logger.debug(traceback.format_exc())
 
 
-handler = Tags.get_handler()
+handler = instrumentation.instrument_handler(Tags.get_handler())
@@ -10,6 +10,7 @@ import os
 
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -109,4 +110,4 @@ class UserPoolClient(CloudFormationCustomResource):
             pass
 
 
-handler = UserPoolClient.get_handler()
+handler = instrumentation.instrument_handler(UserPoolClient.get_handler())
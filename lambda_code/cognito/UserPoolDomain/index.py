@@ -7,6 +7,7 @@ try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -92,4 +93,4 @@ class UserPoolDomain(CloudFormationCustomResource):
             pass
 
 
-handler = UserPoolDomain.get_handler()
+handler = instrumentation.instrument_handler(UserPoolDomain.get_handler())
@@ -2,6 +2,7 @@ import os
 
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -97,4 +98,4 @@ class UserPoolIdentityProvider(CloudFormationCustomResource):
         return {}
 
 
-handler = UserPoolIdentityProvider.get_handler()
+handler = instrumentation.instrument_handler(UserPoolIdentityProvider.get_handler())
@@ -0,0 +1,15 @@
+"""
+Make the handlers importable in unit tests the same way they are at run-time.
+
+In the Lambda ZIP file, `_runtime` is located next to `index.py`.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('AWS_REGION', 'eu-west-1')
+
+# Don't share cached lookups between test runs
+os.environ.setdefault('LOOKUP_CACHE_DIRECTORY', tempfile.mkdtemp(prefix='custom-resources-cache-'))
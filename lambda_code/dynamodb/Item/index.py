@@ -6,13 +6,23 @@ Parameters:
  * TableName: required: name of the tables to join.
  * ItemKey: required: Key Attributes and their values
  * ItemValue: optional: Other Attributes and their values
+ * UpdateMode: optional: how to update the item when its key did not change:
+     - put (default): replace the whole item with PutItem
+     - diff: UpdateItem with only the attributes that changed or were removed.
+       Attributes written by others in the meantime are left alone.
+ * ConditionOnOldValues: optional, with UpdateMode diff: only update if the
+       changed attributes still have their previous values (default: false)
 """
 import functools
 import os
 from distutils.util import strtobool
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation
 
 NOT_CREATED = "NOT CREATED"
 
@@ -33,6 +43,11 @@ class Item(CloudFormationCustomResource):
         self.item_key = self.resource_properties['ItemKey']
         self.item_value = self.resource_properties.get('ItemValue', {})
         self.overwrite = strtobool(self.resource_properties.get('Overwrite', 'false'))
+        self.update_mode = self.resource_properties.get('UpdateMode', 'put')
+        self.condition_on_old_values = strtobool(self.resource_properties.get('ConditionOnOldValues', 'false'))
+
+        if self.update_mode not in ('put', 'diff'):
+            raise ValueError(f"Unknown UpdateMode {self.update_mode}")
 
         for key in self.item_key.keys():
             if key in self.item_value:
@@ -94,6 +109,10 @@ class Item(CloudFormationCustomResource):
         # else:
         self.physical_resource_id = new_physical_id
 
+        if self.update_mode == 'diff':
+            self.update_changed_attributes()
+            return self.attributes()
+
         self.regional_dynamodb_client().put_item(
             TableName=self.table_name,
             Item=self.construct_item(),
@@ -101,6 +120,55 @@ class Item(CloudFormationCustomResource):
 
         return self.attributes()
 
+    def update_changed_attributes(self):
+        old_value = self.old_resource_properties.get('ItemValue', {})
+        changed = sorted(k for k, v in self.item_value.items() if old_value.get(k) != v)
+        removed = sorted(k for k in old_value.keys() if k not in self.item_value)
+        if len(changed) == 0 and len(removed) == 0:
+            print("No attributes changed")
+            return
+
+        names = {}
+        values = {}
+        clauses = []
+        if len(changed) > 0:
+            assignments = []
+            for i, k in enumerate(changed):
+                names[f"#s{i}"] = k
+                values[f":s{i}"] = self.item_value[k]
+                assignments.append(f"#s{i} = :s{i}")
+            clauses.append("SET " + ", ".join(assignments))
+        if len(removed) > 0:
+            for i, k in enumerate(removed):
+                names[f"#r{i}"] = k
+            clauses.append("REMOVE " + ", ".join(f"#r{i}" for i in range(len(removed))))
+
+        extra_params = {}
+        if self.condition_on_old_values:
+            conditions = []
+            for name, k in sorted(names.items()):
+                if k in old_value:
+                    values[f":o{name[1:]}"] = old_value[k]
+                    conditions.append(f"{name} = :o{name[1:]}")
+                else:
+                    conditions.append(f"attribute_not_exists({name})")
+            extra_params['ConditionExpression'] = " AND ".join(conditions)
+        if len(values) > 0:  # May not be empty
+            extra_params['ExpressionAttributeValues'] = values
+
+        print(f"Updating attributes {changed}, removing {removed}")
+        client = self.regional_dynamodb_client()
+        try:
+            client.update_item(
+                TableName=self.table_name,
+                Key=self.item_key,
+                UpdateExpression=" ".join(clauses),
+                ExpressionAttributeNames=names,
+                **extra_params,
+            )
+        except client.exceptions.ConditionalCheckFailedException:
+            raise RuntimeError("Item was modified since the last update, not overwriting it")
+
     def delete(self):
         if self.physical_resource_id == NOT_CREATED:
             return
@@ -111,4 +179,4 @@ class Item(CloudFormationCustomResource):
         )
 
 
-handler = Item.get_handler()
+handler = instrumentation.instrument_handler(Item.get_handler())
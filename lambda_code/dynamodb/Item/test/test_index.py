@@ -0,0 +1,93 @@
+import botocore.session
+import pytest
+from botocore.stub import Stubber
+
+from ..index import Item
+
+KEY = {'pk': {'S': 'a'}}
+
+
+def item_resource(properties, old_properties):
+    client = botocore.session.get_session().create_client(
+        'dynamodb',
+        region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+    )
+    resource = Item()
+    resource.regional_dynamodb_client = lambda: client
+    resource.resource_properties = dict({'TableName': 'table', 'ItemKey': KEY, 'UpdateMode': 'diff'}, **properties)
+    resource.old_resource_properties = dict({'TableName': 'table', 'ItemKey': KEY}, **old_properties)
+    resource.validate()
+    resource.physical_resource_id = resource.construct_physical_id()
+    return resource, Stubber(client)
+
+
+OLD_VALUE = {'same': {'S': '1'}, 'changed': {'S': 'old'}, 'removed': {'N': '3'}}
+NEW_VALUE = {'same': {'S': '1'}, 'changed': {'S': 'new'}, 'added': {'BOOL': True}}
+
+
+def test_diff_updates_only_changed_and_removed_attributes():
+    resource, stubber = item_resource({'ItemValue': NEW_VALUE}, {'ItemValue': OLD_VALUE})
+    stubber.add_response('update_item', {}, {
+        'TableName': 'table',
+        'Key': KEY,
+        'UpdateExpression': "SET #s0 = :s0, #s1 = :s1 REMOVE #r0",
+        'ExpressionAttributeNames': {'#s0': 'added', '#s1': 'changed', '#r0': 'removed'},
+        'ExpressionAttributeValues': {':s0': {'BOOL': True}, ':s1': {'S': 'new'}},
+    })
+    with stubber:
+        resource.update()
+    stubber.assert_no_pending_responses()
+
+
+def test_diff_with_condition_on_old_values():
+    resource, stubber = item_resource(
+        {'ItemValue': NEW_VALUE, 'ConditionOnOldValues': 'true'},
+        {'ItemValue': OLD_VALUE},
+    )
+    stubber.add_response('update_item', {}, {
+        'TableName': 'table',
+        'Key': KEY,
+        'UpdateExpression': "SET #s0 = :s0, #s1 = :s1 REMOVE #r0",
+        'ExpressionAttributeNames': {'#s0': 'added', '#s1': 'changed', '#r0': 'removed'},
+        'ConditionExpression': "#r0 = :or0 AND attribute_not_exists(#s0) AND #s1 = :os1",
+        'ExpressionAttributeValues': {
+            ':s0': {'BOOL': True},
+            ':s1': {'S': 'new'},
+            ':or0': {'N': '3'},
+            ':os1': {'S': 'old'},
+        },
+    })
+    with stubber:
+        resource.update()
+    stubber.assert_no_pending_responses()
+
+
+def test_diff_with_failed_condition():
+    resource, stubber = item_resource(
+        {'ItemValue': {'a': {'S': 'new'}}, 'ConditionOnOldValues': 'true'},
+        {'ItemValue': {'a': {'S': 'old'}}},
+    )
+    stubber.add_client_error('update_item', service_error_code='ConditionalCheckFailedException')
+    with stubber, pytest.raises(RuntimeError, match='modified since the last update'):
+        resource.update()
+
+
+def test_diff_only_removing_has_no_attribute_values():
+    resource, stubber = item_resource({'ItemValue': {}}, {'ItemValue': {'gone': {'S': 'x'}}})
+    stubber.add_response('update_item', {}, {
+        'TableName': 'table',
+        'Key': KEY,
+        'UpdateExpression': "REMOVE #r0",
+        'ExpressionAttributeNames': {'#r0': 'gone'},
+    })
+    with stubber:
+        resource.update()
+    stubber.assert_no_pending_responses()
+
+
+def test_diff_without_changes_does_not_call_dynamodb():
+    resource, stubber = item_resource({'ItemValue': OLD_VALUE}, {'ItemValue': OLD_VALUE})
+    with stubber:
+        resource.update()  # The Stubber raises on unexpected calls
@@ -0,0 +1,206 @@
+"""
+Custom Resource for writing a set of items into a DynamoDB table
+
+Parameters:
+ * Region: optional: region where the DynamoDB table is located. Default: current region of the Lambda
+ * TableName: required: name of the table
+ * Items: list of items (key and other attributes), in DynamoDB JSON
+ * ItemsS3Bucket, ItemsS3Key, ItemsS3VersionId: alternative to Items: a JSON
+       Lines object in S3, one item (in DynamoDB JSON) per line
+
+Items are written with BatchWriteItem, several batches concurrently. On
+update, only the items that were added or changed are written, and the items
+that were removed are deleted. That needs the previous items exactly as they
+were written: Items, or an S3 object with ItemsS3VersionId. An S3 object
+without a version may have been overwritten since, so then all items are
+written, and nothing is deleted. Likewise, such items are left in place when
+the resource is deleted. Use ItemsS3VersionId to get deletes.
+
+Return:
+  Attributes:
+   - ItemCount: number of items
+   - Written, Deleted: number of items written and deleted by this request
+"""
+import functools
+import json
+import os
+import time
+import typing
+
+import botocore.exceptions
+from cfn_custom_resource import CloudFormationCustomResource
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation, retry
+
+REGION = os.environ['AWS_REGION']
+BATCH_SIZE = 25  # BatchWriteItem limit
+MAX_CONCURRENT_BATCHES = 4
+
+
+def is_immutable(properties: dict) -> bool:
+    """
+    Whether the items of `properties` can be loaded again later, exactly as they are now
+    """
+    return 'Items' in properties or 'ItemsS3VersionId' in properties
+
+
+def diff_items(old_items: typing.Dict[str, dict], new_items: typing.Dict[str, dict]
+               ) -> typing.Tuple[typing.List[dict], typing.List[dict]]:
+    """
+    :param old_items: the previously written items, by key
+    :param new_items: the wanted items, by key
+    :return: the items to write (added or changed), and the items to delete
+    """
+    changed = [item for key, item in new_items.items() if old_items.get(key) != item]
+    removed = [item for key, item in old_items.items() if key not in new_items]
+    return changed, removed
+
+
+class Items(CloudFormationCustomResource):
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+
+    @functools.lru_cache()
+    def regional_dynamodb_client(self, region):
+        return concurrency.client('dynamodb', region)
+
+    def validate(self):
+        self.region = self.resource_properties.get('Region', REGION)
+        self.table_name = self.resource_properties['TableName']
+        if ('Items' in self.resource_properties) == ('ItemsS3Bucket' in self.resource_properties):
+            raise ValueError("Specify either Items or ItemsS3Bucket/ItemsS3Key")
+
+    def load_items(self, properties: dict) -> typing.List[dict]:
+        if 'Items' in properties:
+            return properties['Items']
+
+        kwargs = {
+            'Bucket': properties['ItemsS3Bucket'],
+            'Key': properties['ItemsS3Key'],
+        }
+        if 'ItemsS3VersionId' in properties:
+            kwargs['VersionId'] = properties['ItemsS3VersionId']
+        body = self.get_boto3_client('s3').get_object(**kwargs)['Body']
+        return [
+            json.loads(line)
+            for line in body.iter_lines()
+            if len(line.strip()) > 0
+        ]
+
+    @functools.lru_cache()
+    def key_attributes(self, region: str, table_name: str) -> typing.Tuple[str, ...]:
+        table = self.regional_dynamodb_client(region).describe_table(TableName=table_name)['Table']
+        return tuple(key['AttributeName'] for key in table['KeySchema'])
+
+    def index_items(self, region: str, table_name: str, items: typing.List[dict]) -> typing.Dict[str, dict]:
+        """
+        :return: the items by their (serialized) key
+        :raises ValueError: on duplicate keys
+        """
+        key_attributes = self.key_attributes(region, table_name)
+        by_key = {}
+        for item in items:
+            key = json.dumps([item[attribute] for attribute in key_attributes], sort_keys=True)
+            if key in by_key:
+                raise ValueError(f"Duplicate item key: {key}")
+            by_key[key] = item
+        return by_key
+
+    def write_batch(self, region: str, table_name: str, requests: typing.List[dict]) -> None:
+        dynamodb_client = self.regional_dynamodb_client(region)
+        unprocessed = {table_name: requests}
+        for delay in retry.delays(attempts=10):
+            response = dynamodb_client.batch_write_item(RequestItems=unprocessed)
+            unprocessed = response.get('UnprocessedItems', {})
+            if len(unprocessed) == 0:
+                return
+            time.sleep(delay)
+        raise RuntimeError(f"{len(unprocessed[table_name])} items still unprocessed after retrying")
+
+    def write(self, region: str, table_name: str, requests: typing.List[dict]) -> None:
+        if len(requests) == 0:
+            return
+        batches = [requests[i:i + BATCH_SIZE] for i in range(0, len(requests), BATCH_SIZE)]
+        print(f"Writing {len(requests)} requests to {table_name} in {len(batches)} batches")
+        outcomes = concurrency.run_concurrently(
+            lambda batch: self.write_batch(region, table_name, batch),
+            batches,
+            max_workers=MAX_CONCURRENT_BATCHES,
+        )
+        errors = [str(outcome.error) for outcome in outcomes if outcome.error is not None]
+        if len(errors) > 0:
+            raise RuntimeError(f"{len(errors)} of {len(batches)} batches failed: {'; '.join(errors)}")
+
+    def delete_requests(self, region: str, table_name: str, items: typing.Iterable[dict]) -> typing.List[dict]:
+        key_attributes = self.key_attributes(region, table_name)
+        return [
+            {'DeleteRequest': {'Key': {attribute: item[attribute] for attribute in key_attributes}}}
+            for item in items
+        ]
+
+    def create(self):
+        items = self.index_items(self.region, self.table_name, self.load_items(self.resource_properties))
+        self.write(self.region, self.table_name, [
+            {'PutRequest': {'Item': item}}
+            for item in items.values()
+        ])
+        return {
+            'ItemCount': len(items),
+            'Written': len(items),
+            'Deleted': 0,
+        }
+
+    def update(self):
+        old_region = self.old_resource_properties.get('Region', REGION)
+        old_table_name = self.old_resource_properties['TableName']
+        if old_region != self.region or old_table_name != self.table_name:
+            # Write everything to the new table, and clean up the old one
+            attributes = self.create()
+            if is_immutable(self.old_resource_properties):
+                old_items = self.load_items(self.old_resource_properties)
+                self.write(old_region, old_table_name, self.delete_requests(old_region, old_table_name, old_items))
+            else:
+                print(f"Previous S3 object may have changed, not deleting the items from {old_table_name}")
+            return attributes
+
+        new_items = self.index_items(self.region, self.table_name, self.load_items(self.resource_properties))
+
+        if is_immutable(self.old_resource_properties):
+            old_items = self.index_items(self.region, self.table_name, self.load_items(self.old_resource_properties))
+        else:
+            print("Previous S3 object may have changed, so its content is unknown: writing all items")
+            old_items = {}
+        changed, removed = diff_items(old_items, new_items)
+        print(f"{len(changed)} items added or changed, {len(removed)} removed, "
+              f"{len(new_items) - len(changed)} unchanged")
+
+        self.write(
+            self.region, self.table_name,
+            [{'PutRequest': {'Item': item}} for item in changed] +
+            self.delete_requests(self.region, self.table_name, removed),
+        )
+        return {
+            'ItemCount': len(new_items),
+            'Written': len(changed),
+            'Deleted': len(removed),
+        }
+
+    def delete(self):
+        if not is_immutable(self.resource_properties):
+            print("S3 object may have changed since the items were written, not deleting them")
+            return
+
+        try:
+            items = self.load_items(self.resource_properties)
+            self.write(self.region, self.table_name, self.delete_requests(self.region, self.table_name, items))
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] not in ('NoSuchKey', 'NoSuchVersion'):
+                raise
+            print("S3 object not found, don't know which items to delete")
+        except self.regional_dynamodb_client(self.region).exceptions.ResourceNotFoundException:
+            print("Table not found, assuming items are gone")
+
+
+handler = instrumentation.instrument_handler(Items.get_handler())
@@ -0,0 +1,117 @@
+import io
+import json
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from ..index import Items, diff_items
+
+
+class ResourceNotFoundException(Exception):
+    pass
+
+
+def item(key, value='v'):
+    return {'pk': {'S': key}, 'value': {'S': value}}
+
+
+def items_resource(properties, old_properties=None, s3_objects=None):
+    dynamodb = mock.Mock()
+    dynamodb.describe_table.return_value = {'Table': {'KeySchema': [{'AttributeName': 'pk', 'KeyType': 'HASH'}]}}
+    dynamodb.batch_write_item.return_value = {}
+    dynamodb.exceptions.ResourceNotFoundException = ResourceNotFoundException
+
+    def get_object(Bucket, Key, VersionId=None):
+        if (Key, VersionId) not in s3_objects:
+            code = 'NoSuchVersion' if VersionId else 'NoSuchKey'
+            raise ClientError({'Error': {'Code': code, 'Message': Key}}, 'GetObject')
+        content = '\n'.join(json.dumps(i) for i in s3_objects[(Key, VersionId)]).encode('utf-8')
+        return {'Body': StreamingBody(io.BytesIO(content), len(content))}
+    s3 = mock.Mock()
+    s3.get_object.side_effect = get_object
+
+    resource = Items()
+    resource.regional_dynamodb_client = lambda region: dynamodb
+    resource.BOTO3_CLIENTS = {'s3': s3}
+    resource.resource_properties = dict({'TableName': 'table'}, **properties)
+    resource.old_resource_properties = dict({'TableName': 'table'}, **(old_properties or {}))
+    resource.validate()
+    return resource, dynamodb
+
+
+def requests(dynamodb):
+    return [
+        request
+        for call in dynamodb.batch_write_item.call_args_list
+        for request in call[1]['RequestItems']['table']
+    ]
+
+
+def test_diff_items():
+    changed, removed = diff_items(
+        {'a': item('a'), 'b': item('b'), 'c': item('c')},
+        {'a': item('a'), 'b': item('b', 'changed'), 'd': item('d')},
+    )
+    assert changed == [item('b', 'changed'), item('d')]
+    assert removed == [item('c')]
+
+
+def test_update_of_inline_items_writes_the_difference():
+    resource, dynamodb = items_resource(
+        {'Items': [item('a'), item('b', 'changed'), item('d')]},
+        old_properties={'Items': [item('a'), item('b'), item('c')]},
+    )
+    assert resource.update() == {'ItemCount': 3, 'Written': 2, 'Deleted': 1}
+    assert requests(dynamodb) == [
+        {'PutRequest': {'Item': item('b', 'changed')}},
+        {'PutRequest': {'Item': item('d')}},
+        {'DeleteRequest': {'Key': {'pk': {'S': 'c'}}}},
+    ]
+
+
+def test_update_from_versioned_s3_object_writes_the_difference():
+    resource, dynamodb = items_resource(
+        {'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'items.jsonl', 'ItemsS3VersionId': '2'},
+        old_properties={'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'items.jsonl', 'ItemsS3VersionId': '1'},
+        s3_objects={('items.jsonl', '1'): [item('a'), item('b')], ('items.jsonl', '2'): [item('a')]},
+    )
+    assert resource.update() == {'ItemCount': 1, 'Written': 0, 'Deleted': 1}
+
+
+def test_update_from_unversioned_s3_object_writes_everything():
+    # The old object may have been overwritten: it doesn't tell what was written before
+    resource, dynamodb = items_resource(
+        {'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'new.jsonl'},
+        old_properties={'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'old.jsonl'},
+        s3_objects={('new.jsonl', None): [item('a'), item('b')]},
+    )
+    assert resource.update() == {'ItemCount': 2, 'Written': 2, 'Deleted': 0}
+    assert requests(dynamodb) == [{'PutRequest': {'Item': item('a')}}, {'PutRequest': {'Item': item('b')}}]
+
+
+def test_delete_of_inline_items():
+    resource, dynamodb = items_resource({'Items': [item('a'), item('b')]})
+    resource.delete()
+    assert requests(dynamodb) == [
+        {'DeleteRequest': {'Key': {'pk': {'S': 'a'}}}},
+        {'DeleteRequest': {'Key': {'pk': {'S': 'b'}}}},
+    ]
+
+
+def test_delete_from_unversioned_s3_object_leaves_items():
+    resource, dynamodb = items_resource(
+        {'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'items.jsonl'},
+        s3_objects={('items.jsonl', None): [item('overwritten')]},
+    )
+    resource.delete()
+    dynamodb.batch_write_item.assert_not_called()
+
+
+def test_delete_with_missing_s3_object_succeeds():
+    resource, dynamodb = items_resource(
+        {'ItemsS3Bucket': 'bucket', 'ItemsS3Key': 'items.jsonl', 'ItemsS3VersionId': '1'},
+        s3_objects={},
+    )
+    resource.delete()
+    dynamodb.batch_write_item.assert_not_called()
@@ -3,19 +3,43 @@ Custom Resource for joining up DynamoDB tables in to a Global Table.
 
 Parameters:
  * TableName: required: name of the tables to join.
+ * Regions: join all of these regions at once, instead of only the current
+       region. The resource waits until the replicas in all regions are ACTIVE.
+       Replicas that are no longer wanted are removed one at a time.
+ * GlobalTableVersion: only with Regions (default: 2017.11.29):
+     - 2017.11.29: the tables must exist in all Regions, and are joined with
+       CreateGlobalTable/UpdateGlobalTable.
+     - 2019.11.21: the table must exist in the current region only. DynamoDB
+       creates the replicas in the other Regions (via UpdateTable), and
+       deletes them again when the resource is deleted.
+
+Return (only with Regions):
+  Attributes:
+   - <region>: status of the table in that region
 
 Requirements:
  * All tables must share the same name and have Streams enabled (cfr AWS documentation)
 """
 
+import json
 import os
+import time
+import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, continuation, instrumentation
 
 
 REGION = os.environ['AWS_REGION']
 
+KNOWN_PROPERTIES = frozenset({'TableName', 'Regions', 'GlobalTableVersion'})
+VERSION_2017 = '2017.11.29'
+VERSION_2019 = '2019.11.21'
+
 
 class JoinGlobalTable(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
@@ -23,15 +47,22 @@ class JoinGlobalTable(CloudFormationCustomResource):
 
     def validate(self):
         try:
-            self.table_name = self.resource_properties.pop('TableName')
+            self.table_name = self.resource_properties['TableName']
+            self.regions = self.resource_properties.get('Regions')
+            self.version = self.resource_properties.get('GlobalTableVersion', VERSION_2017)
 
-            if len(self.resource_properties) > 0:
+            if len(set(self.resource_properties.keys()) - KNOWN_PROPERTIES) > 0:
+                return False
+            if self.version not in (VERSION_2017, VERSION_2019):
                 return False
             return True
         except KeyError:
             return False
 
     def create(self):
+        if self.regions is not None:
+            return self.join_regions()
+
         boto_client = self.get_boto3_client('dynamodb')
         try:
             print(f"Trying to create global table {self.table_name}")
@@ -62,20 +93,214 @@ class JoinGlobalTable(CloudFormationCustomResource):
 
         return {}
 
+    def add_missing_replicas_2017(self) -> typing.Tuple[str, typing.List[str]]:
+        """
+        Create the global table with all regions, or add the missing ones.
+        Idempotent.
+
+        :return: the ARN of the global table, and the regions that were missing
+        """
+        boto_client = self.get_boto3_client('dynamodb')
+        try:
+            description = boto_client.describe_global_table(
+                GlobalTableName=self.table_name,
+            )['GlobalTableDescription']
+        except boto_client.exceptions.GlobalTableNotFoundException:
+            print(f"Creating global table {self.table_name} in {', '.join(self.regions)}")
+            description = boto_client.create_global_table(
+                GlobalTableName=self.table_name,
+                ReplicationGroup=[{'RegionName': region} for region in self.regions],
+            )['GlobalTableDescription']
+            return description['GlobalTableArn'], []
+
+        joined = {replica['RegionName'] for replica in description['ReplicationGroup']}
+        missing = [region for region in self.regions if region not in joined]
+        if len(missing) > 0 and description['GlobalTableStatus'] == 'ACTIVE':
+            print(f"Joining {', '.join(missing)} to global table {self.table_name}")
+            boto_client.update_global_table(
+                GlobalTableName=self.table_name,
+                ReplicaUpdates=[{'Create': {'RegionName': region}} for region in missing],
+            )
+        return description['GlobalTableArn'], missing
+
+    def add_missing_replicas_2019(self) -> typing.Tuple[str, typing.List[str]]:
+        """
+        Add the next missing replica, if the table is ready for it. Idempotent.
+
+        :return: the ARN of the table, and the regions that were missing
+        """
+        boto_client = self.get_boto3_client('dynamodb')
+        table = boto_client.describe_table(TableName=self.table_name)['Table']
+        replicas = {replica['RegionName'] for replica in table.get('Replicas', [])}
+        missing = [region for region in self.regions if region != REGION and region not in replicas]
+        if len(missing) > 0 and table['TableStatus'] == 'ACTIVE':
+            # Only one replica can be added at a time
+            print(f"Adding replica in {missing[0]} to table {self.table_name}")
+            boto_client.update_table(
+                TableName=self.table_name,
+                ReplicaUpdates=[{'Create': {'RegionName': missing[0]}}],
+            )
+        return table['TableArn'], missing
+
+    def replica_statuses_2017(self) -> typing.Dict[str, str]:
+        """
+        Status of the replica in every region, according to the global table.
+        A replica is only ACTIVE when the global table is ACTIVE as well.
+        """
+        boto_client = self.get_boto3_client('dynamodb')
+        description = boto_client.describe_global_table(
+            GlobalTableName=self.table_name,
+        )['GlobalTableDescription']
+        global_status = description['GlobalTableStatus']
+        replicas = {
+            # ReplicaStatus is not always returned, the status of the global table applies then
+            replica['RegionName']: replica.get('ReplicaStatus', global_status)
+            for replica in description['ReplicationGroup']
+        }
+        statuses = {}
+        for region in self.regions:
+            status = replicas.get(region, 'NOT_JOINED')
+            statuses[region] = global_status if status == 'ACTIVE' else status
+        return statuses
+
+    def replica_status_2019(self, region: str) -> str:
+        dynamodb_client = concurrency.client('dynamodb', region)
+        try:
+            return dynamodb_client.describe_table(TableName=self.table_name)['Table']['TableStatus']
+        except dynamodb_client.exceptions.ResourceNotFoundException:
+            return 'NOT_FOUND'  # Replica not created yet
+
+    def replica_statuses_2019(self) -> typing.Dict[str, str]:
+        statuses = {}
+        for outcome in concurrency.run_concurrently(self.replica_status_2019, self.regions):
+            if outcome.error is not None:
+                raise RuntimeError(f"Could not describe table in {outcome.item}: {outcome.error}")
+            statuses[outcome.item] = outcome.value
+        return statuses
+
+    def join_regions(self):
+        """
+        Join all regions, and wait with backoff until all replicas are ACTIVE.
+        Continues in a new invocation when this one is about to time out.
+        """
+        deadline = continuation.Deadline(self.context)
+        for delay in continuation.backoff(initial=5, maximum=30):
+            if self.version == VERSION_2017:
+                self.physical_resource_id, missing = self.add_missing_replicas_2017()
+                statuses = self.replica_statuses_2017()
+            else:
+                self.physical_resource_id, missing = self.add_missing_replicas_2019()
+                statuses = self.replica_statuses_2019()
+            print(f"Replica status: {json.dumps(statuses, sort_keys=True)}")
+
+            if len(missing) == 0 and all(status == 'ACTIVE' for status in statuses.values()):
+                return statuses
+
+            if deadline.remaining() < delay:
+                continuation.continue_later(self, {'PhysicalResourceId': self.physical_resource_id, 'Phase': 'join'})
+                return statuses  # Not sent, the next invocation will respond
+            time.sleep(delay)
+
     def update(self):
-        if self.has_property_changed('TableName'):
+        if self.has_property_changed('TableName') or \
+                self.has_property_changed('GlobalTableVersion'):
             # We need a new GlobalTable, switch to create and let CLEANUP delete the old one
             return self.create()
 
+        if self.regions is not None:
+            state = continuation.checkpoint(self.event)
+            if state is None or state.get('Phase') == 'remove':
+                removed = set(self.old_resource_properties.get('Regions') or []) - set(self.regions)
+                if not self.remove_replicas(removed):
+                    return {}  # Not sent, the next invocation will respond
+            return self.join_regions()
+
         # Nothing else can change
         # Ignore request succesfully
         print("Ignoring update")
         return {}
 
+    def remove_next_replica(self, regions: typing.Set[str]) -> typing.List[str]:
+        """
+        Remove the next replica in `regions`, if the table is ready for it. Idempotent.
+
+        :return: the regions that still have a replica, including the one being removed
+        """
+        boto_client = self.get_boto3_client('dynamodb')
+        if self.version == VERSION_2017:
+            try:
+                description = boto_client.describe_global_table(
+                    GlobalTableName=self.table_name,
+                )['GlobalTableDescription']
+            except boto_client.exceptions.GlobalTableNotFoundException:
+                print("Global table not found, assuming success...")
+                return []
+            remaining = sorted(
+                replica['RegionName']
+                for replica in description['ReplicationGroup']
+                if replica['RegionName'] in regions
+            )
+            if len(remaining) > 0 and description['GlobalTableStatus'] == 'ACTIVE':
+                print(f"Removing {remaining[0]} from {self.table_name}")
+                try:
+                    boto_client.update_global_table(
+                        GlobalTableName=self.table_name,
+                        ReplicaUpdates=[{'Delete': {'RegionName': remaining[0]}}],
+                    )
+                except boto_client.exceptions.ReplicaNotFoundException:
+                    print("Not joined, assuming success...")
+            return remaining
+
+        try:
+            table = boto_client.describe_table(TableName=self.table_name)['Table']
+        except boto_client.exceptions.ResourceNotFoundException:
+            print("Table not found, assuming success...")
+            return []
+        remaining = sorted(
+            replica['RegionName']
+            for replica in table.get('Replicas', [])
+            if replica['RegionName'] in regions and replica['RegionName'] != REGION
+        )
+        if len(remaining) > 0 and table['TableStatus'] == 'ACTIVE':
+            # Only one replica can be removed at a time
+            print(f"Removing replica in {remaining[0]} from {self.table_name}")
+            boto_client.update_table(
+                TableName=self.table_name,
+                ReplicaUpdates=[{'Delete': {'RegionName': remaining[0]}}],
+            )
+        return remaining
+
+    def remove_replicas(self, regions: typing.Iterable[str]) -> bool:
+        """
+        Remove the replicas in `regions`, one at a time, and wait with backoff
+        until they're gone. Continues in a new invocation when this one is
+        about to time out.
+
+        :return: whether all replicas are removed, False when continued later
+        """
+        regions = set(regions)
+        if len(regions) == 0:
+            return True
+        deadline = continuation.Deadline(self.context)
+        for delay in continuation.backoff(initial=5, maximum=30):
+            remaining = self.remove_next_replica(regions)
+            if len(remaining) == 0:
+                return True
+            print(f"Replicas left to remove: {', '.join(remaining)}")
+
+            if deadline.remaining() < delay:
+                continuation.continue_later(self, {'PhysicalResourceId': self.physical_resource_id, 'Phase': 'remove'})
+                return False
+            time.sleep(delay)
+
     def delete(self):
+        if self.regions is not None:
+            self.remove_replicas(self.regions)
+            return
+
         boto_client = self.get_boto3_client('dynamodb')
         try:
-            print("Trying to delete global table {self.table_name}")
+            print(f"Trying to delete global table {self.table_name}")
             boto_client.update_global_table(
                 GlobalTableName=self.table_name,
                 ReplicaUpdates=[
@@ -87,4 +312,4 @@ class JoinGlobalTable(CloudFormationCustomResource):
             print("Delete failed, assuming success...")
 
 
-handler = JoinGlobalTable.get_handler()
+handler = instrumentation.instrument_handler(JoinGlobalTable.get_handler())
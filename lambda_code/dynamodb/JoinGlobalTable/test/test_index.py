@@ -0,0 +1,96 @@
+from unittest import mock
+
+from ..index import JoinGlobalTable, VERSION_2017
+
+TABLE_ARN = 'arn:aws:dynamodb::123456789012:global-table/table'
+
+
+def global_table(status, replicas):
+    return {'GlobalTableDescription': {
+        'GlobalTableArn': TABLE_ARN,
+        'GlobalTableStatus': status,
+        'ReplicationGroup': [
+            dict({'RegionName': region}, **({'ReplicaStatus': replica_status} if replica_status else {}))
+            for region, replica_status in replicas.items()
+        ],
+    }}
+
+
+def join_global_table(properties, describe_responses):
+    client = mock.Mock()
+    client.describe_global_table.side_effect = describe_responses
+    resource = JoinGlobalTable()
+    resource.BOTO3_CLIENTS = {'dynamodb': client}
+    resource.context = mock.Mock()
+    resource.context.get_remaining_time_in_millis.return_value = 900 * 1000
+    resource.resource_properties = dict({'TableName': 'table'}, **properties)
+    resource.validate()
+    return resource, client
+
+
+@mock.patch('time.sleep')
+def test_2017_waits_for_global_table_and_replicas(sleep):
+    resource, client = join_global_table({'Regions': ['eu-west-1', 'us-east-1'], 'GlobalTableVersion': VERSION_2017}, [
+        global_table('UPDATING', {'eu-west-1': None, 'us-east-1': None}),  # Joining
+        global_table('UPDATING', {'eu-west-1': None, 'us-east-1': None}),  # Readiness
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'CREATING'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'CREATING'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': None}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': None}),
+    ])
+    assert resource.create() == {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE'}
+    assert resource.physical_resource_id == TABLE_ARN
+    assert sleep.call_count == 2
+    client.describe_table.assert_not_called()
+    client.update_global_table.assert_not_called()
+
+
+@mock.patch('time.sleep')
+def test_2017_joins_missing_regions(sleep):
+    resource, client = join_global_table({'Regions': ['eu-west-1', 'us-east-1']}, [
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE'}),
+        global_table('UPDATING', {'eu-west-1': 'ACTIVE', 'us-east-1': 'CREATING'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE'}),
+    ])
+    assert resource.create() == {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE'}
+    client.update_global_table.assert_called_once_with(
+        GlobalTableName='table', ReplicaUpdates=[{'Create': {'RegionName': 'us-east-1'}}])
+
+
+@mock.patch('time.sleep')
+def test_2017_removes_one_replica_at_a_time(sleep):
+    resource, client = join_global_table({'Regions': ['eu-west-1', 'us-east-1', 'ap-south-1']}, [
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE', 'ap-south-1': 'ACTIVE'}),
+        global_table('UPDATING', {'eu-west-1': 'ACTIVE', 'us-east-1': 'DELETING', 'ap-south-1': 'ACTIVE'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE', 'us-east-1': 'ACTIVE'}),
+        global_table('ACTIVE', {'eu-west-1': 'ACTIVE'}),
+    ])
+    resource.old_resource_properties = {'TableName': 'table', 'Regions': ['eu-west-1', 'us-east-1', 'ap-south-1']}
+    resource.resource_properties = {'TableName': 'table', 'Regions': ['eu-west-1']}
+    resource.validate()
+
+    assert resource.remove_replicas({'us-east-1', 'ap-south-1'})
+    assert client.update_global_table.call_args_list == [
+        mock.call(GlobalTableName='table', ReplicaUpdates=[{'Delete': {'RegionName': 'ap-south-1'}}]),
+        mock.call(GlobalTableName='table', ReplicaUpdates=[{'Delete': {'RegionName': 'us-east-1'}}]),
+    ]
+
+
+@mock.patch('time.sleep')
+def test_2019_delete_continues_later_when_out_of_time(sleep):
+    resource, client = join_global_table({'Regions': ['eu-west-1', 'us-east-1'], 'GlobalTableVersion': '2019.11.21'}, [])
+    resource.context.get_remaining_time_in_millis.return_value = 12 * 1000
+    resource.event = {'RequestType': 'Delete'}
+    resource.physical_resource_id = 'arn:aws:dynamodb:eu-west-1:123456789012:table/table'
+    client.describe_table.return_value = {'Table': {
+        'TableStatus': 'UPDATING',
+        'Replicas': [{'RegionName': 'us-east-1'}],
+    }}
+
+    with mock.patch('_runtime.continuation.continue_later') as continue_later:
+        resource.delete()
+    client.update_table.assert_not_called()  # Not ACTIVE yet
+    continue_later.assert_called_once_with(resource, {
+        'PhysicalResourceId': resource.physical_resource_id, 'Phase': 'remove',
+    })
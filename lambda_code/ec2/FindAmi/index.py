@@ -3,25 +3,68 @@ Custom Resource for finding latest the AMI id for a given Description
 
 Parameters:
  * Region: (default: current region)
- * Name: Like: "amzn-ami-minimal-hvm*"
+ * Regions: List of regions to resolve concurrently, instead of Region
+ * AllowPartialFailure: Succeed if at least one of the Regions resolved (default: false)
+ * SsmParameter: Public parameter holding the latest AMI ID,
+       like "/aws/service/ami-amazon-linux-latest/al2023-ami-kernel-default-x86_64"
+ * Alias: Shorthand for a well-known SsmParameter, see ALIASES, like "amazon-linux-2023"
+ * Name: Like: "amzn-ami-minimal-hvm*"; required unless SsmParameter or Alias is given
  * OwnerAlias
  * OwnerId
  * Architecture: Defaults to: "x86_64",
  * DeviceType: Defaults to: "ebs",
  * VirtualizationType: Defaults to: "hvm",
  * State: Defaults to: 'available',
+ * BypassCache: Don't use a cached result (default: false)
+
+SsmParameter and Alias are resolved with a single GetParameter call, and the
+other filters are ignored (except Architecture, to pick the Alias variant).
+Otherwise, the newest image matching the filters is looked up with
+DescribeImages.
+
+Return:
+ * Ref: the AMI ID in the (first resolved) region
+ * Attributes:
+   * <region>: the AMI ID in that region, for every resolved region
+   * FailedRegions: comma separated list of the regions that did not resolve
 """
 
 import os
-import boto3
+from distutils.util import strtobool
+
 import structlog
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import cache, concurrency, instrumentation
 
 
 REGION = os.environ['AWS_REGION']
 
+CACHE = cache.LookupCache('ec2.FindAmi', ttl=15 * 60)
+
+# Alias -> Architecture -> public SSM parameter
+ALIASES = {
+    'amazon-linux-2': {
+        'x86_64': '/aws/service/ami-amazon-linux-latest/amzn2-ami-hvm-x86_64-gp2',
+        'arm64': '/aws/service/ami-amazon-linux-latest/amzn2-ami-hvm-arm64-gp2',
+    },
+    'amazon-linux-2023': {
+        'x86_64': '/aws/service/ami-amazon-linux-latest/al2023-ami-kernel-default-x86_64',
+        'arm64': '/aws/service/ami-amazon-linux-latest/al2023-ami-kernel-default-arm64',
+    },
+    'ubuntu-22.04': {
+        'x86_64': '/aws/service/canonical/ubuntu/server/22.04/stable/current/amd64/hvm/ebs-gp2/ami-id',
+        'arm64': '/aws/service/canonical/ubuntu/server/22.04/stable/current/arm64/hvm/ebs-gp2/ami-id',
+    },
+    'windows-server-2022': {
+        'x86_64': '/aws/service/ami-windows-latest/Windows_Server-2022-English-Full-Base',
+    },
+}
+
 structlog.configure(processors=[structlog.processors.JSONRenderer()])
 
 
@@ -38,8 +81,21 @@ class FindAmi(CloudFormationCustomResource):
 
     def validate(self):
         self.filter = {}
+        self.ssm_parameter = None
 
         try:
+            self.regions = self.resource_properties.get('Regions') or [self.resource_properties.get('Region', REGION)]
+            self.allow_partial_failure = strtobool(self.resource_properties.get('AllowPartialFailure', 'false'))
+            self.bypass_cache = strtobool(self.resource_properties.get('BypassCache', 'false'))
+
+            if 'SsmParameter' in self.resource_properties:
+                self.ssm_parameter = self.resource_properties['SsmParameter']
+                return True
+            if 'Alias' in self.resource_properties:
+                architecture = self.resource_properties.get('Architecture', 'x86_64')
+                self.ssm_parameter = ALIASES[self.resource_properties['Alias']][architecture]
+                return True
+
             self.filter['name'] = self.resource_properties['Name']
             dict_element_copy_if_exists(
                 self.resource_properties, 'OwnerAlias',
@@ -58,12 +114,16 @@ class FindAmi(CloudFormationCustomResource):
         except (AttributeError, KeyError):
             return False
 
-    def create(self):
-        structlog.get_logger().log("Handling request", filter=self.filter)
-        ec2_client = boto3.client(  # Don't use self.get_boto3_client, since we may vary regions
-            'ec2',
-            region_name=self.resource_properties.get('Region', REGION),
-        )
+    def resolve_ssm_parameter(self, region):
+        ssm_client = concurrency.client('ssm', region)  # Not self.get_boto3_client, we vary regions
+        try:
+            response = ssm_client.get_parameter(Name=self.ssm_parameter)
+        except ssm_client.exceptions.ParameterNotFound:
+            return None
+        return response['Parameter']['Value']
+
+    def find_latest_image_id(self, region):
+        ec2_client = concurrency.client('ec2', region)  # Not self.get_boto3_client, we vary regions
 
         ami_filter = []
         for key, value in self.filter.items():
@@ -72,24 +132,66 @@ class FindAmi(CloudFormationCustomResource):
                 'Values': [value],
             })
 
-        structlog.get_logger().log("Converted to AMI filter; doing API call", filter=ami_filter)
-        ami_list = ec2_client.describe_images(
-            Filters=ami_filter
-        )
-        structlog.get_logger().log("API call done, sorting")
-        sorted_ami_list = sorted(
-            ami_list['Images'],
-            key=lambda k: k.get('CreationDate', ''),
-            reverse=True
+        structlog.get_logger().info("Converted to AMI filter; doing API calls", region=region, filter=ami_filter)
+        latest_ami = None
+        images_seen = 0
+        # Keep only the newest image, instead of collecting and sorting all pages
+        for page in ec2_client.get_paginator('describe_images').paginate(Filters=ami_filter):
+            for image in page['Images']:
+                images_seen += 1
+                if latest_ami is None or image.get('CreationDate', '') > latest_ami.get('CreationDate', ''):
+                    latest_ami = image
+        structlog.get_logger().info("API calls done", region=region, images_seen=images_seen)
+
+        if latest_ami is None:
+            return None
+        return latest_ami['ImageId']
+
+    def find_image_id(self, region):
+        if self.ssm_parameter is not None:
+            image_id = CACHE.lookup(
+                CACHE.make_key(region, self.ssm_parameter),
+                lambda: self.resolve_ssm_parameter(region),
+                bypass=self.bypass_cache,
+            )
+            if image_id is None:
+                raise LookupError(f"SSM parameter {self.ssm_parameter} not found.")
+        else:
+            image_id = CACHE.lookup(
+                CACHE.make_key(region, self.filter),
+                lambda: self.find_latest_image_id(region),
+                bypass=self.bypass_cache,
+            )
+            if image_id is None:
+                raise LookupError("No image found matching filters.")
+        return image_id
+
+    def create(self):
+        structlog.get_logger().info("Handling request", regions=self.regions,
+                                    ssm_parameter=self.ssm_parameter, filter=self.filter)
+
+        attributes = {}
+        failures = []
+        for outcome in concurrency.run_concurrently(self.find_image_id, self.regions):
+            if outcome.error is None:
+                attributes[outcome.item] = outcome.value
+            else:
+                failures.append(f"{outcome.item}: {outcome.error}")
+        attributes['FailedRegions'] = ','.join(
+            region for region in self.regions if region not in attributes
         )
-        if len(sorted_ami_list) == 0:
-            self.status = self.STATUS_FAILED
-            self.failure_reason = "No image found matching filters."
-            return {}
 
-        latest_ami = sorted_ami_list[0]
-        self.physical_resource_id = latest_ami['ImageId']
-        return {}
+        if len(failures) > 0:
+            structlog.get_logger().info("Lookup failed", failures=failures)
+            if len(attributes) == 1 or not self.allow_partial_failure:  # only FailedRegions
+                self.status = self.STATUS_FAILED
+                self.failure_reason = " ".join(failures)
+                return {}
+
+        self.physical_resource_id = next(
+            attributes[region] for region in self.regions if region in attributes
+        )
+        return attributes
 
     def update(self):
         return self.create()
@@ -99,4 +201,4 @@ class FindAmi(CloudFormationCustomResource):
         pass
 
 
-handler = FindAmi.get_handler()
+handler = instrumentation.instrument_handler(FindAmi.get_handler())
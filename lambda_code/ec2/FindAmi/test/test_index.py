@@ -0,0 +1,155 @@
+import botocore.session
+import pytest
+from botocore.stub import ANY, Stubber
+
+from .. import index
+from ..index import FindAmi
+from _runtime.cache import LookupCache, MemoryStore
+
+
+def image(image_id, creation_date):
+    return {'ImageId': image_id, 'CreationDate': creation_date}
+
+
+@pytest.fixture()
+def stubs(tmp_path, monkeypatch):
+    """
+    Stubbers for the clients per (service, region), and an empty cache.
+    """
+    monkeypatch.setattr(index, 'CACHE', LookupCache('ec2.FindAmi', ttl=60, directory=str(tmp_path),
+                                                    shared=MemoryStore()))
+    stubbers = {}
+
+    def stub(service_name, region_name):
+        if (service_name, region_name) not in stubbers:
+            stubbers[(service_name, region_name)] = Stubber(botocore.session.get_session().create_client(
+                service_name, region_name=region_name,
+                aws_access_key_id='AKIDEXAMPLE', aws_secret_access_key='secret',
+            ))
+            stubbers[(service_name, region_name)].activate()
+        return stubbers[(service_name, region_name)]
+
+    monkeypatch.setattr(index.concurrency, 'client', lambda service_name, region_name=None: stub(
+        service_name, region_name).client)
+    yield stub
+    for stubber in stubbers.values():
+        stubber.assert_no_pending_responses()
+
+
+def find_ami(properties):
+    resource = FindAmi()
+    resource.resource_properties = properties
+    assert resource.validate()
+    return resource
+
+
+def stub_images(stub, *pages):
+    next_token = None
+    for i, images in enumerate(pages):
+        response = {'Images': images}
+        expected_params = {'Filters': ANY}
+        if next_token is not None:
+            expected_params['NextToken'] = next_token
+        if i < len(pages) - 1:
+            next_token = response['NextToken'] = f"page-{i + 1}"
+        stub.add_response('describe_images', response, expected_params)
+
+
+def test_keeps_newest_image_across_pages(stubs):
+    stub_images(
+        stubs('ec2', 'eu-west-1'),
+        [image('ami-old', '2020-01-01T00:00:00.000Z'), image('ami-new', '2023-06-01T00:00:00.000Z')],
+        [image('ami-older', '2019-01-01T00:00:00.000Z'), image('ami-newest', '2024-01-01T00:00:00.000Z')],
+        [image('ami-middle', '2022-01-01T00:00:00.000Z')],
+    )
+    resource = find_ami({'Name': 'amzn-ami-*', 'Region': 'eu-west-1'})
+
+    assert resource.create() == {'eu-west-1': 'ami-newest', 'FailedRegions': ''}
+    assert resource.physical_resource_id == 'ami-newest'
+
+
+def test_resolves_all_regions(stubs):
+    stub_images(stubs('ec2', 'eu-west-1'), [image('ami-eu', '2024-01-01T00:00:00.000Z')])
+    stub_images(stubs('ec2', 'us-east-1'), [image('ami-us', '2024-01-01T00:00:00.000Z')])
+    resource = find_ami({'Name': 'amzn-ami-*', 'Regions': ['us-east-1', 'eu-west-1']})
+
+    assert resource.create() == {'us-east-1': 'ami-us', 'eu-west-1': 'ami-eu', 'FailedRegions': ''}
+    assert resource.physical_resource_id == 'ami-us'  # First of Regions, not first to finish
+
+
+def test_fails_on_partial_failure(stubs):
+    stub_images(stubs('ec2', 'eu-west-1'), [image('ami-eu', '2024-01-01T00:00:00.000Z')])
+    stub_images(stubs('ec2', 'us-east-1'), [])
+    resource = find_ami({'Name': 'amzn-ami-*', 'Regions': ['us-east-1', 'eu-west-1']})
+
+    assert resource.create() == {}
+    assert resource.status == resource.STATUS_FAILED
+    assert resource.failure_reason == "us-east-1: No image found matching filters."
+
+
+def test_allows_partial_failure(stubs):
+    stub_images(stubs('ec2', 'eu-west-1'), [image('ami-eu', '2024-01-01T00:00:00.000Z')])
+    stubs('ec2', 'us-east-1').add_client_error('describe_images', 'UnauthorizedOperation')
+    resource = find_ami({'Name': 'amzn-ami-*', 'Regions': ['us-east-1', 'eu-west-1'],
+                         'AllowPartialFailure': 'true'})
+
+    assert resource.create() == {'eu-west-1': 'ami-eu', 'FailedRegions': 'us-east-1'}
+    assert resource.physical_resource_id == 'ami-eu'  # First region that resolved
+    assert resource.status != resource.STATUS_FAILED
+
+
+def test_fails_when_all_regions_fail_despite_allow_partial_failure(stubs):
+    stub_images(stubs('ec2', 'eu-west-1'), [])
+    stub_images(stubs('ec2', 'us-east-1'), [])
+    resource = find_ami({'Name': 'amzn-ami-*', 'Regions': ['us-east-1', 'eu-west-1'],
+                         'AllowPartialFailure': 'true'})
+
+    assert resource.create() == {}
+    assert resource.status == resource.STATUS_FAILED
+    assert resource.failure_reason == ("us-east-1: No image found matching filters. "
+                                       "eu-west-1: No image found matching filters.")
+
+
+def stub_parameter(stub, name, value):
+    stub.add_response('get_parameter', {'Parameter': {'Name': name, 'Value': value}}, {'Name': name})
+
+
+def test_resolves_ssm_parameter(stubs):
+    stub_parameter(stubs('ssm', 'eu-west-1'), '/my/ami', 'ami-ssm')
+    resource = find_ami({'SsmParameter': '/my/ami', 'Region': 'eu-west-1', 'Name': 'ignored-*'})
+
+    assert resource.create() == {'eu-west-1': 'ami-ssm', 'FailedRegions': ''}
+    assert resource.physical_resource_id == 'ami-ssm'
+
+
+def test_resolves_alias_for_architecture(stubs):
+    stub_parameter(stubs('ssm', 'eu-west-1'), index.ALIASES['amazon-linux-2023']['arm64'], 'ami-arm')
+    resource = find_ami({'Alias': 'amazon-linux-2023', 'Architecture': 'arm64', 'Region': 'eu-west-1'})
+
+    assert resource.create() == {'eu-west-1': 'ami-arm', 'FailedRegions': ''}
+
+
+def test_unknown_alias_is_invalid():
+    resource = FindAmi()
+    resource.resource_properties = {'Alias': 'windows-server-2022', 'Architecture': 'arm64'}
+    assert not resource.validate()
+
+
+def test_caches_ssm_parameter(stubs):
+    stub_parameter(stubs('ssm', 'eu-west-1'), '/my/ami', 'ami-ssm')  # Only once
+    properties = {'SsmParameter': '/my/ami', 'Region': 'eu-west-1'}
+
+    assert find_ami(properties).create()['eu-west-1'] == 'ami-ssm'
+    assert find_ami(properties).create()['eu-west-1'] == 'ami-ssm'
+
+    stub_parameter(stubs('ssm', 'eu-west-1'), '/my/ami', 'ami-newer')
+    assert find_ami(dict(properties, BypassCache='true')).create()['eu-west-1'] == 'ami-newer'
+
+
+def test_missing_ssm_parameter(stubs):
+    stubs('ssm', 'eu-west-1').add_client_error('get_parameter', 'ParameterNotFound')
+    resource = find_ami({'SsmParameter': '/does/not/exist', 'Region': 'eu-west-1'})
+
+    assert resource.create() == {}
+    assert resource.status == resource.STATUS_FAILED
+    assert resource.failure_reason == "eu-west-1: SSM parameter /does/not/exist not found."
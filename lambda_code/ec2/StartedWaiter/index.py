@@ -8,28 +8,42 @@ tries to add the instance, which will fail.
 This resource simply waits for the given EC2 instance(s) to become "started",
 or the Lambda times out.
 
+Large sets of instances are polled in chunks, concurrently. The wait fails
+immediately if an instance is going down (shutting-down, terminated, stopping).
+
 Parameters:
  * InstanceIds: either a list of instance IDs, or a single InstanceId
+ * WaitForStatusChecks: also wait for the instance and system status checks
+   to pass (default: false)
 
 Return:
   Ref: random
   Attributes:
    - InstanceIds: verbatim copy of input
 """
+import collections
 import json
 import os
 import time
 import traceback
+from distutils.util import strtobool
 
 import six
 
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation
 
 
 REGION = os.environ['AWS_REGION']
 
 POLL_INTERVAL = 5
+CHUNK_SIZE = 100  # instance IDs per DescribeInstanceStatus request
+TERMINAL_STATES = frozenset({'shutting-down', 'terminated', 'stopping'})
+PASSED_STATUS_CHECKS = frozenset({'ok', 'not-applicable'})
 
 
 class StartedWaiter(CloudFormationCustomResource):
@@ -48,39 +62,81 @@ class StartedWaiter(CloudFormationCustomResource):
                 self.instance_ids = set(instance_ids)
             else:
                 self.instance_ids = {instance_ids}
+            self.wait_for_status_checks = strtobool(self.resource_properties.get('WaitForStatusChecks', 'false'))
 
             return True
         except (AttributeError, KeyError):
             return False
 
+    def describe_chunk(self, ec2_client, instance_ids: list) -> list:
+        statuses = []
+        paginator = ec2_client.get_paginator('describe_instance_status')
+        for page in paginator.paginate(
+                InstanceIds=instance_ids,
+                IncludeAllInstances=True,  # Otherwise only running instances are returned
+        ):
+            statuses.extend(page['InstanceStatuses'])
+        return statuses
+
+    def is_started(self, instance_status: dict) -> bool:
+        if instance_status['InstanceState']['Name'] != 'running':
+            return False
+        if not self.wait_for_status_checks:
+            return True
+        return (
+            instance_status['InstanceStatus']['Status'] in PASSED_STATUS_CHECKS and
+            instance_status['SystemStatus']['Status'] in PASSED_STATUS_CHECKS
+        )
+
     def create(self):
         ec2_client = self.get_boto3_client('ec2')
 
         instance_ids_remaining = self.instance_ids.copy()
+        poll = 0
         while len(instance_ids_remaining) > 0:
-            print("Waiting for: ", ", ".join(instance_ids_remaining))
-            status = ec2_client.describe_instance_status(
-                InstanceIds=list(instance_ids_remaining),
+            poll += 1
+            remaining = sorted(instance_ids_remaining)
+            chunks = [remaining[i:i + CHUNK_SIZE] for i in range(0, len(remaining), CHUNK_SIZE)]
+            outcomes = concurrency.run_concurrently(
+                lambda chunk: self.describe_chunk(ec2_client, chunk),
+                chunks,
             )
-            for instance in status['InstanceStatuses']:
-                instance_id = instance['InstanceId']
-                instance_state = instance['InstanceState']['Name']
-                print("{} : {}".format(
-                    instance_id, instance_state,
-                ))
-                if instance_state == 'running':
-                    print("{} is running".format(instance_id))
-                    instance_ids_remaining.remove(instance_id)
+            for outcome in outcomes:
+                if outcome.error is not None:
+                    raise outcome.error
+
+            states = collections.Counter()
+            terminal = []
+            for outcome in outcomes:
+                for instance_status in outcome.value:
+                    instance_id = instance_status['InstanceId']
+                    instance_state = instance_status['InstanceState']['Name']
+                    states[instance_state] += 1
+                    if instance_state in TERMINAL_STATES:
+                        terminal.append("{} is {}".format(instance_id, instance_state))
+                    elif self.is_started(instance_status):
+                        instance_ids_remaining.discard(instance_id)
+
+            print(json.dumps({
+                'Poll': poll,
+                'States': states,
+                'Remaining': len(instance_ids_remaining),
+                'Waiting for': sorted(instance_ids_remaining)[:5],  # sample only
+            }, sort_keys=True))
+
+            if len(terminal) > 0:
+                raise RuntimeError("Instances will not start: {}".format(", ".join(sorted(terminal))))
 
             if len(instance_ids_remaining) == 0:
                 break  # before sleep
 
             if self.context.get_remaining_time_in_millis() < POLL_INTERVAL * 1000 * 2:
-                raise TimeoutError("Lambda is about to timeout, still waiting for: {}".format(
-                    ", ".join(instance_ids_remaining),
+                raise TimeoutError("Lambda is about to timeout, still waiting for {} instances: {}".format(
+                    len(instance_ids_remaining),
+                    ", ".join(sorted(instance_ids_remaining)),
                 ))
 
-            time.sleep(5)
+            time.sleep(POLL_INTERVAL)
             # loop around
 
         return {
@@ -124,4 +180,4 @@ class StartedWaiter(CloudFormationCustomResource):
             resource._base_logger.debug(traceback.format_exc())
 
 
-handler = StartedWaiter.get_handler()
+handler = instrumentation.instrument_handler(StartedWaiter.get_handler())
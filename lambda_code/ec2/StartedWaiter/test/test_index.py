@@ -0,0 +1,93 @@
+from unittest import mock
+
+import pytest
+
+from ..index import CHUNK_SIZE, StartedWaiter
+
+
+def instance_status(instance_id, state='running', checks='ok'):
+    return {
+        'InstanceId': instance_id,
+        'InstanceState': {'Name': state},
+        'InstanceStatus': {'Status': checks},
+        'SystemStatus': {'Status': 'ok'},
+    }
+
+
+def waiter(properties, polls):
+    """
+    :param polls: for every poll, a function that returns the status of an instance ID
+    :return: the resource, the requested chunks, and a replacement for time.sleep
+    """
+    poll = [0]
+    requested = []
+
+    def paginate(InstanceIds, IncludeAllInstances):
+        requested.append(InstanceIds)
+        return [{'InstanceStatuses': [polls[poll[0]](instance_id) for instance_id in InstanceIds]}]
+
+    def sleep(seconds):
+        poll[0] += 1
+
+    client = mock.Mock()
+    client.get_paginator.return_value.paginate.side_effect = paginate
+
+    resource = StartedWaiter()
+    resource.BOTO3_CLIENTS = {'ec2': client}
+    resource.context = mock.Mock()
+    resource.context.get_remaining_time_in_millis.return_value = 300 * 1000
+    resource.resource_properties = properties
+    resource.validate()
+    return resource, requested, sleep
+
+
+def test_polls_in_chunks_until_all_are_running():
+    instance_ids = [f"i-{i:04d}" for i in range(CHUNK_SIZE * 2 + 1)]
+    resource, requested, sleep = waiter({'InstanceIds': instance_ids}, [
+        lambda instance_id: instance_status(instance_id, 'pending' if instance_id == 'i-0150' else 'running'),
+        lambda instance_id: instance_status(instance_id),
+    ])
+    with mock.patch('time.sleep', side_effect=sleep):
+        assert resource.create() == {'InstanceIds': instance_ids}
+
+    first_poll = sorted(len(chunk) for chunk in requested[:3])
+    assert first_poll == [1, CHUNK_SIZE, CHUNK_SIZE]
+    assert requested[3:] == [['i-0150']]  # Only the remaining instance is polled again
+
+
+def test_fails_fast_on_terminated_instance():
+    resource, requested, sleep = waiter({'InstanceIds': ['i-1', 'i-2']}, [
+        lambda instance_id: instance_status(instance_id, 'terminated' if instance_id == 'i-2' else 'pending'),
+    ])
+    with mock.patch('time.sleep', side_effect=sleep), pytest.raises(RuntimeError, match='i-2 is terminated'):
+        resource.create()
+    assert len(requested) == 1
+
+
+def test_waits_for_status_checks():
+    resource, requested, sleep = waiter({'InstanceIds': 'i-1', 'WaitForStatusChecks': 'true'}, [
+        lambda instance_id: instance_status(instance_id, checks='initializing'),
+        lambda instance_id: instance_status(instance_id, checks='impaired'),
+        lambda instance_id: instance_status(instance_id, checks='ok'),
+    ])
+    with mock.patch('time.sleep', side_effect=sleep):
+        assert resource.create() == {'InstanceIds': 'i-1'}
+    assert len(requested) == 3
+
+
+def test_ignores_status_checks_by_default():
+    resource, requested, sleep = waiter({'InstanceIds': 'i-1'}, [
+        lambda instance_id: instance_status(instance_id, checks='impaired'),
+    ])
+    with mock.patch('time.sleep', side_effect=sleep):
+        resource.create()
+    assert len(requested) == 1
+
+
+def test_times_out_before_the_lambda():
+    resource, requested, sleep = waiter({'InstanceIds': 'i-1'}, [
+        lambda instance_id: instance_status(instance_id, 'pending'),
+    ])
+    resource.context.get_remaining_time_in_millis.return_value = 5 * 1000
+    with pytest.raises(TimeoutError, match='i-1'):
+        resource.create()
@@ -2,39 +2,114 @@
 Custom Resource for Elastic Beanstalk environment resources ID's
 
 Parameters:
-    EnvironmentId:
+    EnvironmentId: the environment to describe
+    EnvironmentIds, EnvironmentNames: alternative to EnvironmentId: several
+        environments, described concurrently
     Serial: dummy, use this to force an update
+    BypassCache: don't use a cached lookup result
+
+Return:
+  Attributes, for every resource type (AutoScalingGroups, Instances,
+  LaunchConfigurations, LaunchTemplates, LoadBalancers, Triggers, Queues):
+   - <Type>: the name (or ID) of the first resource of that type
+   - <Type>Json: JSON list of the names (or IDs) of all resources of that type
+   - <Type>0, <Type>1, ...: the names (or IDs), individually
+  With several environments, these are combined over all environments, and
+  also returned per environment, prefixed with "<environment id or name>.".
 """
+import json
+import typing
+from distutils.util import strtobool
 
 from cfn_custom_resource import CloudFormationCustomResource
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import cache, concurrency, instrumentation
+
+# Instances come and go with scaling, so don't keep the result long
+CACHE = cache.LookupCache('elasticbeanstalk.EnvironmentResources', ttl=60)
+
+MAX_WORKERS = 4
+
+
+def resource_identifier(resource: dict) -> str:
+    # Instances and LaunchTemplates have an Id, the other types a Name
+    return resource['Name'] if 'Name' in resource else resource['Id']
+
+
+def resource_attributes(resources: typing.Dict[str, typing.List[str]], prefix: str = '') -> dict:
+    attributes = {}
+    for resource_type, identifiers in sorted(resources.items()):
+        attributes[f"{prefix}{resource_type}Json"] = json.dumps(identifiers)
+        if len(identifiers) > 0:
+            attributes[f"{prefix}{resource_type}"] = identifiers[0]
+        for i, identifier in enumerate(identifiers):
+            attributes[f"{prefix}{resource_type}{i}"] = identifier
+    return attributes
 
 
 class EnvironmentResources(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
-    eb_client = boto3.client('elasticbeanstalk')
-
     def validate(self):
         try:
-            self.envId = self.resource_properties['EnvironmentId']
+            if 'EnvironmentIds' in self.resource_properties:
+                self.environments = [('EnvironmentId', e) for e in self.resource_properties['EnvironmentIds']]
+            elif 'EnvironmentNames' in self.resource_properties:
+                self.environments = [('EnvironmentName', e) for e in self.resource_properties['EnvironmentNames']]
+            else:
+                self.environments = [('EnvironmentId', self.resource_properties['EnvironmentId'])]
+            self.bypass_cache = strtobool(self.resource_properties.get('BypassCache', 'false'))
             return True
 
         except (AttributeError, KeyError):
             return False
 
+    @staticmethod
+    def describe_environment_resources(parameter: str, environment: str) -> typing.Dict[str, typing.List[str]]:
+        """
+        :return: {resource type: sorted names or IDs}
+        """
+        eb_client = concurrency.client('elasticbeanstalk')
+        result = eb_client.describe_environment_resources(**{parameter: environment})["EnvironmentResources"]
+        return {
+            resource_type: sorted(resource_identifier(resource) for resource in resources)
+            for resource_type, resources in result.items()
+            if isinstance(resources, list)  # Skip EnvironmentName
+        }
+
+    def lookup(self, parameter: str, environment: str) -> typing.Dict[str, typing.List[str]]:
+        return CACHE.lookup(
+            CACHE.make_key(parameter, environment),
+            lambda: self.describe_environment_resources(parameter, environment),
+            bypass=self.bypass_cache,
+        )
+
     def create(self):
-        attributes = {}
-
-        result = eb_client.describe_environment_resources(EnvironmentId=self.envId)["EnvironmentResources"]
-        for resourceType in result: 
-            for resource in result[resourceType]:
-                if isinstance(resource, dict):
-                    attributes[resourceType] = resource['Name']
-                    
+        outcomes = concurrency.run_concurrently(
+            lambda environment: self.lookup(*environment),
+            self.environments,
+            max_workers=MAX_WORKERS,
+        )
+        errors = [f"{outcome.item[1]}: {outcome.error}" for outcome in outcomes if outcome.error is not None]
+        if len(errors) > 0:
+            raise RuntimeError("; ".join(errors))
+
+        combined = {}
+        for outcome in outcomes:
+            for resource_type, identifiers in outcome.value.items():
+                combined.setdefault(resource_type, set()).update(identifiers)
+        attributes = resource_attributes({
+            resource_type: sorted(identifiers)
+            for resource_type, identifiers in combined.items()
+        })
+
+        if len(self.environments) > 1:
+            for outcome in outcomes:
+                attributes.update(resource_attributes(outcome.value, prefix=f"{outcome.item[1]}."))
+
         return attributes
 
     def update(self):
@@ -45,4 +120,4 @@ class EnvironmentResources(CloudFormationCustomResource):
         pass
 
 
-handler = EnvironmentResources.get_handler()
+handler = instrumentation.instrument_handler(EnvironmentResources.get_handler())
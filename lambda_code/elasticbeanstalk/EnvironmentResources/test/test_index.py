@@ -0,0 +1,91 @@
+from unittest import mock
+
+import pytest
+
+from .. import index
+from ..index import EnvironmentResources, resource_attributes
+
+
+ENVIRONMENTS = {
+    'e-1': {
+        'EnvironmentName': 'env-1',
+        'AutoScalingGroups': [{'Name': 'asg-1'}],
+        'Instances': [{'Id': 'i-2'}, {'Id': 'i-1'}],
+        'LaunchConfigurations': [],
+        'LaunchTemplates': [{'Id': 'lt-1'}],
+        'LoadBalancers': [{'Name': 'arn:lb-1'}],
+        'Triggers': [],
+        'Queues': [],
+    },
+    'e-2': {
+        'EnvironmentName': 'env-2',
+        'AutoScalingGroups': [{'Name': 'asg-2'}],
+        'Instances': [{'Id': 'i-3'}],
+        'LaunchConfigurations': [],
+        'LaunchTemplates': [{'Id': 'lt-1'}],
+        'LoadBalancers': [],
+        'Triggers': [],
+        'Queues': [],
+    },
+}
+
+
+def describe_environment_resources(EnvironmentId):
+    if EnvironmentId not in ENVIRONMENTS:
+        raise RuntimeError(f"No Environment found for EnvironmentId = '{EnvironmentId}'.")
+    return {'EnvironmentResources': ENVIRONMENTS[EnvironmentId]}
+
+
+@pytest.fixture()
+def eb_client():
+    client = mock.Mock()
+    client.describe_environment_resources.side_effect = describe_environment_resources
+    with mock.patch.object(index.concurrency, 'client', return_value=client):
+        yield client
+
+
+def environment_resources(properties):
+    resource = EnvironmentResources()
+    resource.resource_properties = dict(properties, BypassCache='true')
+    resource.validate()
+    return resource
+
+
+def test_resource_attributes():
+    assert resource_attributes({'Instances': ['i-1', 'i-2'], 'Queues': []}, prefix='p.') == {
+        'p.InstancesJson': '["i-1", "i-2"]',
+        'p.Instances': 'i-1',
+        'p.Instances0': 'i-1',
+        'p.Instances1': 'i-2',
+        'p.QueuesJson': '[]',
+    }
+
+
+def test_single_environment_keeps_the_attribute_names(eb_client):
+    attributes = environment_resources({'EnvironmentId': 'e-1'}).create()
+    assert attributes['AutoScalingGroups'] == 'asg-1'
+    assert attributes['LoadBalancers'] == 'arn:lb-1'
+    # Instances and LaunchTemplates only have an Id
+    assert attributes['Instances'] == 'i-1'
+    assert attributes['InstancesJson'] == '["i-1", "i-2"]'
+    assert attributes['LaunchTemplates'] == 'lt-1'
+    assert 'EnvironmentName' not in attributes
+    assert not any(key.startswith('e-1.') for key in attributes)
+
+
+def test_several_environments_are_combined_and_prefixed(eb_client):
+    attributes = environment_resources({'EnvironmentIds': ['e-1', 'e-2']}).create()
+    assert attributes['AutoScalingGroupsJson'] == '["asg-1", "asg-2"]'
+    assert attributes['LaunchTemplatesJson'] == '["lt-1"]'  # Deduplicated
+    assert attributes['Instances'] == 'i-1'
+    assert attributes['e-1.Instances1'] == 'i-2'
+    assert attributes['e-2.Instances'] == 'i-3'
+    assert attributes['e-2.LoadBalancersJson'] == '[]'
+    assert 'e-2.LoadBalancers' not in attributes
+
+
+def test_errors_are_aggregated(eb_client):
+    with pytest.raises(RuntimeError) as e:
+        environment_resources({'EnvironmentIds': ['e-1', 'e-gone', 'e-missing']}).create()
+    assert 'e-gone' in str(e.value) and 'e-missing' in str(e.value)
+    assert 'e-1:' not in str(e.value)
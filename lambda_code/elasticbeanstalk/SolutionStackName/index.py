@@ -9,14 +9,26 @@ Parameters:
     EbMinorVersion: (default: None)
     EbPatchVersion: (default: None)
     Serial: dummy, use this to force an update
+    BypassCache: Don't use a cached list of solution stacks (default: false)
+
+Return:
+    Ref: the Solution Stack Name
+    Attributes:
+        Architecture, Ami, Platform: components of the selected Solution Stack Name
+        EbMajorVersion, EbMinorVersion, EbPatchVersion: version of the selected
+            Solution Stack, or '' if it has no version
 """
+import itertools
 import re
+import typing
+from distutils.util import strtobool
 
 from cfn_custom_resource import CloudFormationCustomResource
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import cache, instrumentation
 
 
 platform_pattern = re.compile(
@@ -25,6 +37,94 @@ platform_pattern = re.compile(
     r' running (?P<platform>.+)$',
 )
 
+CACHE = cache.LookupCache('elasticbeanstalk.SolutionStackName', ttl=60 * 60)
+
+ANY = '*'  # Wildcard for a version component in the catalogue index
+
+
+def split_solution_stack_name(solution_stack_name: str) -> typing.Optional[dict]:
+    """
+    Attempts to split the string in to its components.
+
+    :return: the components, or None if the name is not in the expected format
+    """
+    match = platform_pattern.search(solution_stack_name)
+    if match is None:
+        return None
+
+    group_dict = match.groupdict()
+    for x in ('major', 'minor', 'patch'):
+        group_dict[x] = int(group_dict[x]) if group_dict.get(x) is not None else None
+
+    return group_dict
+
+
+class SolutionStackCatalogue:
+    """
+    Parsed Solution Stack Names, indexed by (platform, arch, major, minor, patch).
+
+    Every stack is indexed under all combinations of its version components
+    and the ANY wildcard, so a lookup with any subset of the version filters
+    is a single dict access. Within an index entry, the order of the
+    original list is kept.
+    """
+    def __init__(self, solution_stack_names: typing.Iterable[str]):
+        self.solution_stack_names = tuple(solution_stack_names)
+        self.unparseable = []
+        self.index = {}  # type: typing.Dict[tuple, typing.List[typing.Tuple[str, dict]]]
+
+        for name in self.solution_stack_names:
+            components = split_solution_stack_name(name)
+            if components is None:
+                self.unparseable.append(name)
+                continue
+            versions = [
+                (components[x], ANY) if components[x] is not None else (ANY,)
+                for x in ('major', 'minor', 'patch')
+            ]
+            for major, minor, patch in itertools.product(*versions):
+                key = (components['platform'], components['arch'], major, minor, patch)
+                self.index.setdefault(key, []).append((name, components))
+
+    def find(
+            self,
+            platform: str,
+            arch: str,
+            major: typing.Optional[int] = None,
+            minor: typing.Optional[int] = None,
+            patch: typing.Optional[int] = None,
+            ami_starts_with: str = '',
+    ) -> typing.Optional[typing.Tuple[str, dict]]:
+        """
+        :return: the first (name, components) matching the filter, or None
+        """
+        key = (
+            platform, arch,
+            ANY if major is None else major,
+            ANY if minor is None else minor,
+            ANY if patch is None else patch,
+        )
+        for name, components in self.index.get(key, []):
+            if components['ami'].startswith(ami_starts_with):
+                return name, components
+        return None
+
+
+_catalogue = None  # type: typing.Optional[SolutionStackCatalogue]
+
+
+def get_catalogue(solution_stack_names: typing.List[str]) -> SolutionStackCatalogue:
+    """
+    Return the catalogue of the given names, re-using the one of a previous
+    (warm) invocation if the list did not change.
+    """
+    global _catalogue
+    if _catalogue is None or _catalogue.solution_stack_names != tuple(solution_stack_names):
+        _catalogue = SolutionStackCatalogue(solution_stack_names)
+        if len(_catalogue.unparseable) > 0:
+            print("Ignoring Solution Stacks with an unexpected name: " + ", ".join(_catalogue.unparseable))
+    return _catalogue
+
 
 class SolutionStackName(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
@@ -45,6 +145,7 @@ class SolutionStackName(CloudFormationCustomResource):
                 self.filter['patch'] = int(self.resource_properties['EbPatchVersion'])
 
             self.ami_starts_with = self.resource_properties.get('AmiStartsWith', '')
+            self.bypass_cache = strtobool(self.resource_properties.get('BypassCache', 'false'))
 
             return True
 
@@ -54,36 +155,33 @@ class SolutionStackName(CloudFormationCustomResource):
     @staticmethod
     def split_solution_stack_name(solution_stack_name):
         """Attempts to split the string in to its components"""
+        return split_solution_stack_name(solution_stack_name)
 
-        match = re.search(platform_pattern, solution_stack_name)
-
-        group_dict = match.groupdict()
-        for x in ('major', 'minor', 'patch'):
-            group_dict[x] = int(group_dict[x]) if group_dict.get(x) is not None else None
-
-        return group_dict
-
-    def filter_stack(self, stack_dict):
-        for key, value in self.filter.items():
-            if stack_dict[key] != value:
-                return False
-        # All filter items match
-
-        return stack_dict['ami'].startswith(self.ami_starts_with)
-
-    def create(self):
+    def list_available_solution_stacks(self):
         eb_client = self.get_boto3_client('elasticbeanstalk')
+        return eb_client.list_available_solution_stacks()['SolutionStacks']
 
-        all_stacks = eb_client.list_available_solution_stacks()['SolutionStacks']
-
-        filtered_stacks = [
-            s
-            for s in all_stacks
-            if self.filter_stack(self.split_solution_stack_name(s))
-        ]
-
-        self.physical_resource_id = filtered_stacks[0]  # May raise IndexError
-        return {}
+    def create(self):
+        all_stacks = CACHE.lookup(
+            CACHE.make_key(),  # The list only depends on the region, which is fixed per function
+            self.list_available_solution_stacks,
+            bypass=self.bypass_cache,
+        )
+
+        found = get_catalogue(all_stacks).find(ami_starts_with=self.ami_starts_with, **self.filter)
+        if found is None:
+            raise ValueError(f"No Solution Stack found matching {self.filter} "
+                             f"and AmiStartsWith={self.ami_starts_with!r}")
+
+        self.physical_resource_id, components = found
+        return {
+            'Architecture': components['arch'],
+            'Ami': components['ami'],
+            'Platform': components['platform'],
+            'EbMajorVersion': '' if components['major'] is None else components['major'],
+            'EbMinorVersion': '' if components['minor'] is None else components['minor'],
+            'EbPatchVersion': '' if components['patch'] is None else components['patch'],
+        }
 
     def update(self):
         return self.create()
@@ -93,4 +191,4 @@ class SolutionStackName(CloudFormationCustomResource):
         pass
 
 
-handler = SolutionStackName.get_handler()
+handler = instrumentation.instrument_handler(SolutionStackName.get_handler())
@@ -1,4 +1,4 @@
-from ..index import SolutionStackName
+from ..index import SolutionStackCatalogue, SolutionStackName, get_catalogue
 
 
 def test_solution_stack_name():
@@ -13,3 +13,44 @@ def test_solution_stack_name():
         'patch': 4,
         'platform': 'Python 3.6',
     }
+
+
+def test_unparseable_solution_stack_name():
+    assert SolutionStackName.split_solution_stack_name('Something else entirely') is None
+
+
+STACKS = [
+    '64bit Amazon Linux 2 v3.1.0 running Python 3.7',
+    '64bit Amazon Linux 2018.03 v2.9.11 running Python 3.6',
+    'Malformed solution stack',
+    '64bit Amazon Linux 2018.03 v2.9.10 running Python 3.6',
+    '32bit Amazon Linux 2018.03 v2.9.11 running Python 3.6',
+    '64bit Windows Server Core 2019 running IIS 10.0',
+]
+
+
+def test_catalogue_find():
+    catalogue = SolutionStackCatalogue(STACKS)
+    assert catalogue.unparseable == ['Malformed solution stack']
+
+    name, components = catalogue.find(platform='Python 3.6', arch='64bit')
+    assert name == '64bit Amazon Linux 2018.03 v2.9.11 running Python 3.6'
+    assert (components['major'], components['minor'], components['patch']) == (2, 9, 11)
+
+    name, _ = catalogue.find(platform='Python 3.6', arch='64bit', patch=10)
+    assert name == '64bit Amazon Linux 2018.03 v2.9.10 running Python 3.6'
+
+    name, _ = catalogue.find(platform='Python 3.6', arch='32bit', major=2, minor=9)
+    assert name == '32bit Amazon Linux 2018.03 v2.9.11 running Python 3.6'
+
+    name, _ = catalogue.find(platform='IIS 10.0', arch='64bit')
+    assert name == '64bit Windows Server Core 2019 running IIS 10.0'
+
+    assert catalogue.find(platform='Python 3.6', arch='64bit', ami_starts_with='Amazon Linux 2 ') is None
+    assert catalogue.find(platform='Python 3.7', arch='64bit', ami_starts_with='Amazon Linux 2') is not None
+    assert catalogue.find(platform='IIS 10.0', arch='64bit', major=1) is None
+
+
+def test_catalogue_reused():
+    assert get_catalogue(STACKS) is get_catalogue(list(STACKS))
+    assert get_catalogue(STACKS[:2]) is not get_catalogue(STACKS)
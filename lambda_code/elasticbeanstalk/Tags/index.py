@@ -1,4 +1,5 @@
 from cfn_custom_resource import CloudFormationCustomResource
+from _runtime import instrumentation, tags
 
 
 class Tags(CloudFormationCustomResource):
@@ -10,23 +11,29 @@ class Tags(CloudFormationCustomResource):
     def tags_to_update(tags):
         return list(map(lambda tag: {'Key': tag[0], 'Value': tag[1]}, tags.items()))
 
-    def update_tags(self):
+    def update_tags(self, old_tags, new_tags):
         client = self.get_boto3_session().client('elasticbeanstalk')
-        client.update_tags_for_resource(
-            ResourceArn=self.environmentArn,
-            TagsToAdd=self.tags_to_update(self.tags)
+        tags.reconcile(
+            tags.ElasticBeanstalkAdapter(client),
+            self.environmentArn,
+            old=old_tags,
+            new=new_tags,
         )
-        return {'TagsToUpdate': self.tags_to_update(self.tags)}
+        return {'TagsToUpdate': self.tags_to_update(new_tags)}
 
     def create(self):
-        return self.update_tags()
+        return self.update_tags({}, self.tags)
 
     def update(self):
-        return self.update_tags()
+        old_tags = self.old_resource_properties.get('Tags', {})
+        if self.old_resource_properties.get('EnvironmentArn') != self.environmentArn:
+            old_tags = {}  # Different environment, leave the tags on the old one
+        return self.update_tags(old_tags, self.tags)
 
     def delete(self):
         # Deleting not supported for now. Tags will disappear when environment is deleted.
+        # Removing them would start an environment update, right before it is terminated.
         pass
 
 
-handler = Tags.get_handler()
+handler = instrumentation.instrument_handler(Tags.get_handler())
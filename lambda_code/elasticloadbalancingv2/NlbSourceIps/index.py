@@ -1,78 +1,117 @@
 import json
+import typing
+from distutils.util import strtobool
 
 from cfn_custom_resource import CloudFormationCustomResource
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import cache, instrumentation
 
 
-def lookup_internal_ipv4(ec2_client, public_ipv4: str) -> str:
-    # Paginator is also available, but use simple client. We are querying on Public IP,
-    # so we expect at most a single answer, no pagination issues expected.
-    eni = ec2_client.describe_network_interfaces(
-        Filters=[{
-            'Name': 'addresses.association.public-ip',
-            'Values': [public_ipv4],
-        }],
-    )
+# The ENIs of an NLB don't change during the life time of the NLB
+CACHE = cache.LookupCache('elasticloadbalancingv2.NlbSourceIps', ttl=6 * 60 * 60)
 
-    return public_ipv4
+MAX_FILTER_VALUES = 200  # Values per filter of DescribeNetworkInterfaces
+
+
+def eni_description(nlb_arn: str) -> str:
+    """
+    The description of the ENIs of an NLB: "ELB net/{name}/{id}"
+    """
+    resource = nlb_arn.split(':')[5]
+    return "ELB " + '/'.join(resource.split('/')[1:])
+
+
+def nlb_name(nlb_arn: str) -> str:
+    return nlb_arn.split(':')[5].split('/')[2]
+
+
+def ip_attributes(ipv4_addresses: typing.List[str], ipv6_addresses: typing.List[str], prefix: str = '') -> dict:
+    attributes = {
+        f"{prefix}IPv4Addresses": ipv4_addresses,
+        f"{prefix}IPv6Addresses": ipv6_addresses,
+    }
+    for i, ip in enumerate(ipv4_addresses):
+        attributes[f"{prefix}IPv4Address{i}"] = ip
+    for i, ip in enumerate(ipv6_addresses):
+        attributes[f"{prefix}IPv6Address{i}"] = ip
+    return attributes
 
 
 class NlbSourceIps(CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     def validate(self):
-        self.nlb_arn = self.resource_properties['LoadBalancerArn']
+        if 'LoadBalancerArns' in self.resource_properties:
+            self.nlb_arns = self.resource_properties['LoadBalancerArns']
+        else:
+            self.nlb_arns = [self.resource_properties['LoadBalancerArn']]
+        self.bypass_cache = strtobool(self.resource_properties.get('BypassCache', 'false'))
 
     def create(self):
-        print(f"Resolving private IPs for `{self.nlb_arn}`")
-
-        resource = self.nlb_arn.split(':')[5]
-        name = '/'.join(resource.split('/')[1:])
-        description = f"ELB {name}"
-        print(f"Doing lookup for ENIs with description `{description}`")
-
-        ec2_client = self.get_boto3_client('ec2')
-        # Paginator is also available, but use simple client. We are querying on Public IP,
-        # so we expect at most a single answer, no pagination issues expected.
-        enis = ec2_client.describe_network_interfaces(
-            Filters=[{
-                'Name': 'description',
-                'Values': [description],
-            }],
+        source_ips = {}
+        keys = {arn: CACHE.make_key(arn) for arn in self.nlb_arns}
+        if not self.bypass_cache:
+            for arn, key in keys.items():
+                try:
+                    source_ips[arn] = CACHE.get(key)
+                except KeyError:
+                    pass
+
+        missing = [arn for arn in self.nlb_arns if arn not in source_ips]
+        if len(missing) > 0:
+            for arn, ips in self.lookup_source_ips(missing).items():
+                source_ips[arn] = ips
+                if len(ips['IPv4']) > 0:  # The ENIs may not be created yet; don't remember that
+                    CACHE.put(keys[arn], ips)
+
+        attributes = ip_attributes(
+            sorted({ip for ips in source_ips.values() for ip in ips['IPv4']}),
+            sorted({ip for ips in source_ips.values() for ip in ips['IPv6']}),
         )
-        enis = enis['NetworkInterfaces']
-        print(f"Found {len(enis)} ENIs")
-
-        enis = [
-            eni
-            for eni in enis
-            if eni["InterfaceType"] == "network_load_balancer"
-            and eni["Attachment"]["InstanceOwnerId"] == "amazon-aws"
-        ]
-        print(f"Found {len(enis)} ENIs of type network_load_balancer")
-
-        ipv4_addresses = [
-            eni['PrivateIpAddress']
-            for eni in enis
-        ]
-        print("Found internal IP addresses:")
-        for a in ipv4_addresses:
-            print(a)
-
-        ipv4_addresses = sorted(list(ipv4_addresses))
-        attributes = {
-            'IPv4Addresses': ipv4_addresses,
-        }
-        for i, ip in enumerate(ipv4_addresses):
-            attributes[f"IPv4Address{i}"] = ip
+        if len(self.nlb_arns) > 1:
+            for arn in self.nlb_arns:
+                attributes.update(ip_attributes(
+                    source_ips[arn]['IPv4'], source_ips[arn]['IPv6'], prefix=f"{nlb_name(arn)}.",
+                ))
 
         print("Returning attributes:")
         print(json.dumps(attributes))
         return attributes
 
+    def lookup_source_ips(self, nlb_arns: typing.List[str]) -> typing.Dict[str, typing.Dict[str, typing.List[str]]]:
+        """
+        :return: {nlb_arn: {'IPv4': [...], 'IPv6': [...]}}, sorted
+        """
+        arn_by_description = {eni_description(arn): arn for arn in nlb_arns}
+        descriptions = sorted(arn_by_description.keys())
+        print(f"Doing lookup for ENIs with descriptions {descriptions}")
+
+        found = {arn: {'IPv4': set(), 'IPv6': set()} for arn in nlb_arns}
+        paginator = self.get_boto3_client('ec2').get_paginator('describe_network_interfaces')
+        for i in range(0, len(descriptions), MAX_FILTER_VALUES):
+            for page in paginator.paginate(Filters=[
+                {'Name': 'description', 'Values': descriptions[i:i + MAX_FILTER_VALUES]},
+                {'Name': 'interface-type', 'Values': ['network_load_balancer']},
+            ]):
+                for eni in page['NetworkInterfaces']:
+                    if eni['InterfaceType'] != 'network_load_balancer' or \
+                            eni['Attachment']['InstanceOwnerId'] != 'amazon-aws' or \
+                            eni['Description'] not in arn_by_description:
+                        continue
+                    ips = found[arn_by_description[eni['Description']]]
+                    ips['IPv4'].update(address['PrivateIpAddress'] for address in eni['PrivateIpAddresses'])
+                    ips['IPv6'].update(address['Ipv6Address'] for address in eni.get('Ipv6Addresses', []))
+
+        for arn, ips in found.items():
+            print(f"Found {len(ips['IPv4'])} IPv4 and {len(ips['IPv6'])} IPv6 addresses for {arn}")
+        return {
+            arn: {'IPv4': sorted(ips['IPv4']), 'IPv6': sorted(ips['IPv6'])}
+            for arn, ips in found.items()
+        }
+
     def update(self):
         return self.create()
 
@@ -80,4 +119,4 @@ class NlbSourceIps(CloudFormationCustomResource):
         pass
 
 
-handler = NlbSourceIps.get_handler()
+handler = instrumentation.instrument_handler(NlbSourceIps.get_handler())
@@ -157,31 +157,40 @@ def describe_network_interfaces(
     }
 
 
+def describe_eni_paginator(ips_by_description: typing.Mapping[str, typing.Mapping[str, str]]):
+    def paginate(*args, **kwargs):
+        assert len(args) == 0
+        filters = kwargs.pop('Filters')
+        assert len(kwargs) == 0
+        assert filters[0]['Name'] == 'description'
+        assert sorted(filters[0]['Values']) == sorted(ips_by_description.keys())
+        assert filters[1] == {'Name': 'interface-type', 'Values': ['network_load_balancer']}
+        for description, ips in ips_by_description.items():
+            page = describe_network_interfaces(ips)
+            for eni in page['NetworkInterfaces']:
+                eni['Description'] = description
+            yield page
+
+    def get_paginator(name):
+        assert name == 'describe_network_interfaces'
+        return mock.Mock(paginate=paginate)
+    return mock.Mock(get_paginator=get_paginator)
+
+
 def test_nlb_source_ips(nlb_arn_gen):
     name = "test-nlb"
     hex_id = "12345678"
     nlb_arn = nlb_arn_gen(name=name, hex_id=hex_id)
 
     o = index.NlbSourceIps()
-    o.nlb_arn = nlb_arn
+    o.nlb_arns = [nlb_arn]
+    o.bypass_cache = True
 
     ips = {
         '198.51.100.10': '192.0.2.1',
         '198.51.100.20': '192.0.2.2',
     }
-    def describe_eni(*args, **kwargs):
-        assert len(args) == 0
-        filters = kwargs.pop('Filters')
-        assert len(kwargs) == 0
-        assert len(filters) == 1
-        assert filters[0]['Name'] == 'description'
-        assert filters[0]['Values'] == [f"ELB net/{name}/{hex_id}"]
-        return describe_network_interfaces({
-            k: v
-            for k, v in ips.items()
-        })
-    ec2_client = mock.Mock(describe_network_interfaces=describe_eni)
-    o.BOTO3_CLIENTS['ec2'] = ec2_client
+    o.BOTO3_CLIENTS['ec2'] = describe_eni_paginator({f"ELB net/{name}/{hex_id}": ips})
 
     attributes = o.create()
 
@@ -191,3 +200,24 @@ def test_nlb_source_ips(nlb_arn_gen):
 
     for i, ip in enumerate(returned_ips, start=0):
         assert attributes[f"IPv4Address{i}"] in returned_ips
+
+    assert attributes['IPv6Addresses'] == ['2a05:d018:704:4105:a23c:c62b:542d:30ea']
+
+
+def test_multiple_nlbs(nlb_arn_gen):
+    arn_a = nlb_arn_gen(name='a', hex_id='1')
+    arn_b = nlb_arn_gen(name='b', hex_id='2')
+
+    o = index.NlbSourceIps()
+    o.nlb_arns = [arn_a, arn_b]
+    o.bypass_cache = True
+    o.BOTO3_CLIENTS['ec2'] = describe_eni_paginator({
+        "ELB net/a/1": {'198.51.100.10': '192.0.2.9'},
+        "ELB net/b/2": {'198.51.100.20': '192.0.2.1'},
+    })
+
+    attributes = o.create()
+
+    assert attributes['IPv4Addresses'] == ['192.0.2.1', '192.0.2.9']
+    assert attributes['a.IPv4Addresses'] == ['192.0.2.9']
+    assert attributes['b.IPv4Address0'] == '192.0.2.1'
@@ -6,6 +6,7 @@ import os
 
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation
 
 
 REGION = os.environ['AWS_REGION']
@@ -79,4 +80,4 @@ class Pipeline(CloudFormationCustomResource):
         )
 
 
-handler = Pipeline.get_handler()
+handler = instrumentation.instrument_handler(Pipeline.get_handler())
@@ -3,11 +3,155 @@ Custom resource to support Amazon Cloudwatch Logs ResourcePolicy.
 https://docs.aws.amazon.com/AmazonCloudWatchLogs/latest/APIReference/API_ResourcePolicy.html
 https://docs.aws.amazon.com/AmazonCloudWatchLogs/latest/APIReference/API_PutResourcePolicy.html
 https://docs.aws.amazon.com/AmazonCloudWatchLogs/latest/APIReference/API_DeleteResourcePolicy.html
-"""
 
+An account can only have 10 resource policies per region, of at most 5120
+characters each. With a Group, the statements of all resources with the same
+Group are packed together into as few policies as possible, named
+"<Group>-0", "<Group>-1", etc. The statements are minified, and statements of
+the same resource that only differ in their Resource are merged. The Sid of
+every statement is prefixed with an ID of the resource that owns it, so a
+resource only ever replaces its own statements. Only the policies whose
+content changed are rewritten.
+
+Resources updating the same Group at the same time may overwrite each other's
+changes. To keep that window small, the policies are read again right before
+every write, and statements that other resources added or removed in the
+meantime are merged in. After a short settle delay, the update is verified by
+reading the policies back, and retried when needed. This is best-effort: a
+resource that writes between another one's verification and the end of its
+deployment can still drop that one's statements, until its next update.
+"""
+import hashlib
 import json
+import re
+import time
+import typing
+
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation, retry
+
+POLICY_SIZE_LIMIT = 5120
+POLICY_VERSION = '2012-10-17'
+SETTLE_SECONDS = 2  # Before verifying, so concurrent writes show up
+LIST_KEYS = ('Action', 'NotAction', 'Resource', 'NotResource')
+
+
+def minify(value) -> str:
+    return json.dumps(value, separators=(',', ':'), sort_keys=True)
+
+
+def policy_document(statements: typing.List[dict]) -> dict:
+    return {'Version': POLICY_VERSION, 'Statement': statements}
+
+
+def document_size(statements: typing.List[dict]) -> int:
+    return len(minify(policy_document(statements)))
+
+
+def normalize_values(value):
+    """
+    Deduplicate and sort a list of values; a single value is returned as-is.
+    """
+    if not isinstance(value, list):
+        return value
+    values = sorted(set(value))
+    return values[0] if len(values) == 1 else values
+
+
+def normalize_statement(statement: dict) -> dict:
+    statement = dict(statement)
+    for key in LIST_KEYS:
+        if key in statement:
+            statement[key] = normalize_values(statement[key])
+    if isinstance(statement.get('Principal'), dict):
+        statement['Principal'] = {
+            principal_type: normalize_values(principals)
+            for principal_type, principals in statement['Principal'].items()
+        }
+    return statement
+
+
+def merge_statements(statements: typing.List[dict]) -> typing.List[dict]:
+    """
+    Merge the statements that only differ in their Resource (and Sid).
+    """
+    merged = {}
+    for statement in statements:
+        statement = normalize_statement(statement)
+        statement.pop('Sid', None)
+        if 'Resource' not in statement:
+            merged[minify(statement)] = statement
+            continue
+        resources = statement.pop('Resource')
+        resources = resources if isinstance(resources, list) else [resources]
+        key = 'Resource:' + minify(statement)
+        if key in merged:
+            existing = merged[key]['Resource']
+            resources += existing if isinstance(existing, list) else [existing]
+        statement['Resource'] = normalize_values(resources)
+        merged[key] = statement
+    return [merged[key] for key in sorted(merged.keys())]
+
+
+def first_fit(statements: typing.List[dict], bins: typing.Dict[int, typing.List[dict]]
+              ) -> typing.Dict[int, typing.List[dict]]:
+    """
+    Add the statements to the bins (policies), largest first, each in the
+    first bin it fits in. Starts new bins at the lowest free index.
+    """
+    bins = {index: list(statements_) for index, statements_ in bins.items()}
+    for statement in sorted(statements, key=lambda s: (-len(minify(s)), minify(s))):
+        if document_size([statement]) > POLICY_SIZE_LIMIT:
+            raise ValueError(f"Statement {statement.get('Sid')} does not fit in a policy on its own")
+        for index in sorted(bins.keys()):
+            if document_size(bins[index] + [statement]) <= POLICY_SIZE_LIMIT:
+                bins[index].append(statement)
+                break
+        else:
+            index = 0
+            while index in bins:
+                index += 1
+            bins[index] = [statement]
+    return bins
+
+
+def pack(statements: typing.List[dict], current: typing.Dict[int, typing.List[dict]]
+         ) -> typing.Dict[int, typing.List[dict]]:
+    """
+    Pack the statements into policies.
+
+    Statements stay in the policy they're currently in, and only new
+    statements are placed, to rewrite as few policies as possible. Unless
+    packing everything from scratch needs fewer policies.
+
+    :param current: the statements in the current policies, by index
+    :return: the statements per policy, by index
+    """
+    remaining = {minify(statement): statement for statement in statements}
+    bins = {}
+    for index, current_statements in sorted(current.items()):
+        kept = [
+            remaining.pop(minify(statement))
+            for statement in current_statements
+            if minify(statement) in remaining
+        ]
+        if len(kept) > 0:
+            bins[index] = kept
+    bins = first_fit(list(remaining.values()), bins)
+
+    repacked = first_fit(statements, {})
+    if len(repacked) < len(bins):
+        return repacked
+    return bins
+
+
+def owner_prefix(physical_resource_id: str) -> str:
+    # Sids may only contain alphanumeric characters
+    return 'Cr' + hashlib.sha256(physical_resource_id.encode('utf-8')).hexdigest()[:12]
 
 
 class ResourcePolicy(CloudFormationCustomResource):
@@ -15,16 +159,133 @@ class ResourcePolicy(CloudFormationCustomResource):
 
     def validate(self):
         self.policy_doc = self.resource_properties['PolicyDocument']
+        self.group = self.resource_properties.get('Group', None)
 
-    def create(self):
+    def own_statements(self) -> typing.List[dict]:
+        statements = self.policy_doc['Statement']
+        if isinstance(statements, dict):
+            statements = [statements]
+        prefix = owner_prefix(self.physical_resource_id)
+        return [
+            dict(statement, Sid=f"{prefix}{i}")
+            for i, statement in enumerate(merge_statements(statements))
+        ]
+
+    def group_policies(self, group: str) -> typing.Dict[int, typing.List[dict]]:
+        """
+        :return: the statements in the policies of the group, by index
+        """
+        name_pattern = re.compile(re.escape(group) + r'-(\d+)')
+        logs_client = self.get_boto3_client('logs')
+        policies = {}
+        kwargs = {}
+        while True:
+            response = logs_client.describe_resource_policies(**kwargs)
+            for policy in response['resourcePolicies']:
+                match = name_pattern.fullmatch(policy['policyName'])
+                if match:
+                    statements = json.loads(policy['policyDocument'])['Statement']
+                    policies[int(match.group(1))] = statements if isinstance(statements, list) else [statements]
+            if 'nextToken' not in response:
+                return policies
+            kwargs['nextToken'] = response['nextToken']
+
+    @staticmethod
+    def merge_concurrent_changes(statements: typing.List[dict], index: int, prefix: str,
+                                 current: typing.Dict[int, typing.List[dict]],
+                                 latest: typing.Dict[int, typing.List[dict]]) -> typing.List[dict]:
+        """
+        Apply the changes that other resources made to the policies since
+        `current` was read, to the statements to write in policy `index`:
+        drop their removed statements, and keep their added ones.
+        """
+        def others(policies):
+            return {
+                minify(statement)
+                for statements_ in policies.values()
+                for statement in statements_
+                if not statement.get('Sid', '').startswith(prefix)
+            }
+        current_others = others(current)
+        latest_others = others(latest)
+        kept = [
+            statement
+            for statement in statements
+            if statement.get('Sid', '').startswith(prefix) or minify(statement) in latest_others
+        ]
+        added = [
+            statement
+            for statement in latest.get(index, [])
+            if not statement.get('Sid', '').startswith(prefix) and minify(statement) not in current_others
+        ]
+        return kept + added
+
+    def write_group_policies(self, group: str, prefix: str, current: typing.Dict[int, typing.List[dict]],
+                             wanted: typing.Dict[int, typing.List[dict]]) -> None:
+        logs_client = self.get_boto3_client('logs')
+        for index in sorted(set(current.keys()) | set(wanted.keys())):
+            statements = wanted.get(index, [])
+            if index in current and minify(current[index]) == minify(statements):
+                continue
+
+            # Re-read right before writing, to not undo what others wrote since
+            latest = self.group_policies(group)
+            merged = self.merge_concurrent_changes(statements, index, prefix, current, latest)
+            if minify(merged) != minify(statements):
+                print(f"{group}-{index} was modified concurrently, merging the changes")
+            document = minify(policy_document(merged))
+            if len(document) > POLICY_SIZE_LIMIT:
+                continue  # Doesn't fit anymore; the verification will notice, and repack
+
+            if len(merged) > 0:
+                print(f"Writing {group}-{index} with {len(merged)} statements, {len(document)} characters")
+                logs_client.put_resource_policy(policyName=f"{group}-{index}", policyDocument=document)
+            elif index in latest:
+                print(f"Deleting {group}-{index}, it's empty")
+                try:
+                    logs_client.delete_resource_policy(policyName=f"{group}-{index}")
+                except logs_client.exceptions.ResourceNotFoundException:
+                    pass
+
+    def update_group(self, group: str, own_statements: typing.List[dict]) -> typing.List[str]:
+        """
+        Replace the statements of this resource in the policies of the group.
+
+        :return: the names of the policies of the group
+        """
+        prefix = owner_prefix(self.physical_resource_id)
+        wanted_own = sorted(minify(statement) for statement in own_statements)
+
+        for delay in retry.delays(initial=1, maximum=10, attempts=6):
+            current = self.group_policies(group)
+            others = [
+                statement
+                for statements in current.values()
+                for statement in statements
+                if not statement.get('Sid', '').startswith(prefix)
+            ]
+            wanted = pack(others + own_statements, current)
+            self.write_group_policies(group, prefix, current, wanted)
+
+            time.sleep(SETTLE_SECONDS)
+            written = self.group_policies(group)
+            written_own = sorted(
+                minify(statement)
+                for statements in written.values()
+                for statement in statements
+                if statement.get('Sid', '').startswith(prefix)
+            )
+            if written_own == wanted_own:
+                return [f"{group}-{index}" for index in sorted(written.keys())]
+            print("Policies were modified concurrently, retrying")
+            time.sleep(delay)
+        raise RuntimeError(f"Could not update the policies of {group}: they keep being modified concurrently")
+
+    def put_policy(self):
         cl = self.get_boto3_client('logs')
         cl.put_resource_policy(policyName=self.physical_resource_id, policyDocument=json.dumps(self.policy_doc))
-        return {}
-
-    def update(self):
-        return self.create()
 
-    def delete(self):
+    def delete_policy(self):
         cl = self.get_boto3_client('logs')
         try:
             cl.delete_resource_policy(policyName=self.physical_resource_id)
@@ -33,5 +294,26 @@ class ResourcePolicy(CloudFormationCustomResource):
             # Assume already deleted
             pass
 
+    def create(self):
+        if self.group is not None:
+            return {'PolicyNames': self.update_group(self.group, self.own_statements())}
+        self.put_policy()
+        return {}
+
+    def update(self):
+        old_group = self.old_resource_properties.get('Group', None)
+        attributes = self.create()
+        if old_group is None and self.group is not None:
+            self.delete_policy()
+        elif old_group is not None and old_group != self.group:
+            self.update_group(old_group, [])
+        return attributes
+
+    def delete(self):
+        if self.group is not None:
+            self.update_group(self.group, [])
+        else:
+            self.delete_policy()
+
 
-handler = ResourcePolicy.get_handler()
+handler = instrumentation.instrument_handler(ResourcePolicy.get_handler())
@@ -0,0 +1,111 @@
+import json
+from unittest import mock
+
+from ..index import POLICY_SIZE_LIMIT, ResourcePolicy, document_size, merge_statements, pack
+
+
+def statement(sid, resource, service='es.amazonaws.com'):
+    return {
+        'Sid': sid,
+        'Effect': 'Allow',
+        'Principal': {'Service': service},
+        'Action': ['logs:PutLogEvents', 'logs:CreateLogStream', 'logs:PutLogEvents'],
+        'Resource': resource,
+    }
+
+
+def test_merge_statements_merges_resources_and_dedupes():
+    merged = merge_statements([
+        statement('a', 'arn:b'),
+        statement('b', ['arn:a', 'arn:b']),
+        statement('c', 'arn:c', service='events.amazonaws.com'),
+    ])
+    assert len(merged) == 2
+    es = [s for s in merged if s['Principal']['Service'] == 'es.amazonaws.com'][0]
+    assert es['Resource'] == ['arn:a', 'arn:b']
+    assert es['Action'] == ['logs:CreateLogStream', 'logs:PutLogEvents']
+    assert 'Sid' not in es
+
+
+def test_pack_fills_policies_and_keeps_statements_in_place():
+    statements = [statement(f"s{i}", 'arn:aws:logs:eu-west-1:123456789012:log-group:' + 'x' * 200 + str(i))
+                  for i in range(40)]
+    bins = pack(statements, {})
+    assert all(document_size(b) <= POLICY_SIZE_LIMIT for b in bins.values())
+    assert sum(len(b) for b in bins.values()) == 40
+    assert len(bins) == 4  # 13 fit in one policy
+
+    # Removing a statement from the last policy leaves the others untouched
+    removed = bins[3][0]
+    repacked = pack([s for s in statements if s is not removed], bins)
+    assert [repacked[i] for i in range(3)] == [bins[i] for i in range(3)]
+
+
+def logs_client(policies: dict) -> mock.Mock:
+    client = mock.Mock()
+    client.describe_resource_policies.side_effect = lambda **kwargs: {'resourcePolicies': [
+        {'policyName': name, 'policyDocument': document}
+        for name, document in policies.items()
+    ]}
+    client.put_resource_policy.side_effect = lambda policyName, policyDocument: \
+        policies.__setitem__(policyName, policyDocument)
+    return client
+
+
+def group_resource(client: mock.Mock) -> ResourcePolicy:
+    resource = ResourcePolicy()
+    resource.BOTO3_CLIENTS = {'logs': client}
+    resource.physical_resource_id = 'policy-1'
+    resource.resource_properties = {
+        'Group': 'shared',
+        'PolicyDocument': {'Statement': [statement('x', 'arn:mine')]},
+    }
+    resource.validate()
+    return resource
+
+
+@mock.patch('time.sleep')
+def test_group_only_replaces_own_statements(sleep):
+    policies = {
+        'shared-0': json.dumps({'Version': '2012-10-17', 'Statement': [statement('Crother0000000', 'arn:other')]}),
+        'unrelated': json.dumps({'Version': '2012-10-17', 'Statement': []}),
+    }
+    client = logs_client(policies)
+    resource = group_resource(client)
+
+    assert resource.create() == {'PolicyNames': ['shared-0']}
+    assert '"Crother0000000"' in policies['shared-0']
+    assert '"arn:mine"' in policies['shared-0']
+
+    client.put_resource_policy.reset_mock()
+    resource.create()
+    client.put_resource_policy.assert_not_called()  # Unchanged
+
+    resource.delete()
+    assert '"arn:mine"' not in policies['shared-0']
+    assert '"Crother0000000"' in policies['shared-0']
+
+
+@mock.patch('time.sleep')
+def test_group_merges_concurrent_changes(sleep):
+    policies = {
+        'shared-0': json.dumps({'Version': '2012-10-17', 'Statement': [statement('Crother0000000', 'arn:other')]}),
+    }
+    client = logs_client(policies)
+    describe = client.describe_resource_policies.side_effect
+
+    def describe_while_another_resource_writes(**kwargs):
+        response = describe(**kwargs)
+        if client.describe_resource_policies.call_count == 1:
+            # After the first read, another resource replaces its statement
+            policies['shared-0'] = json.dumps({'Version': '2012-10-17', 'Statement': [
+                statement('Cranother0000', 'arn:another'),
+            ]})
+        return response
+    client.describe_resource_policies.side_effect = describe_while_another_resource_writes
+
+    group_resource(client).create()
+    assert '"arn:another"' in policies['shared-0']
+    assert '"arn:mine"' in policies['shared-0']
+    assert '"arn:other"' not in policies['shared-0']
+    client.put_resource_policy.assert_called_once()
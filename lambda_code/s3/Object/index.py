@@ -1,12 +1,35 @@
+import base64
+import gzip
+import hashlib
+import io
 import json
 import os
 
+import botocore.exceptions
+from boto3.s3.transfer import TransferConfig
 from cfn_custom_resource import CloudFormationCustomResource
-from _metadata import CUSTOM_RESOURCE_NAME
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation
 
 
 REGION = os.environ['AWS_REGION']
 
+# Larger uploads and copies are done in parts, concurrently
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_THRESHOLD,
+)
+
+# Metadata with the SHA-256 of the body; the ETag is only the MD5 for single part uploads
+CHECKSUM_METADATA_KEY = 'content-sha256'
+
+# Taken from the source object when copying, unless given
+COPIED_CONTENT_PROPERTIES = ('ContentType', 'ContentEncoding')
+
 
 class S3Object(CloudFormationCustomResource):
     """
@@ -15,6 +38,23 @@ class S3Object(CloudFormationCustomResource):
       Bucket: str: bucket name
       Key: str: location within bucket
       Body: str: content of object to create/update
+      BodyBase64Gzip: str: alternative to Body: gzipped and base64 encoded
+          content, e.g. binary content, see custom_resources.s3.Object.encode_body()
+      SourceBucket, SourceKey, SourceVersionId: str: alternative to Body:
+          copy the content of this object, server-side
+      ContentEncoding: str: Content-Encoding of the object. With "gzip" and
+          BodyBase64Gzip, the gzipped content is stored as-is
+      ObjectMetadata: dict: metadata of the object
+      ContentType: str: Content-Type of the object (default: binary/octet-stream)
+
+    For copies, ContentType and ContentEncoding default to those of the source object.
+
+    A body is only uploaded when its content changed, compared to the SHA-256
+    stored in the object metadata (or the ETag). When only the metadata
+    changed, the object is copied onto itself with the new metadata.
+
+    Attributes:
+      ContentSha256: SHA-256 of the body (not for copies)
     """
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use s3-path instead
@@ -23,34 +63,142 @@ class S3Object(CloudFormationCustomResource):
         self.region = self.resource_properties.get('Region', REGION)
         self.bucket = self.resource_properties['Bucket']
         self.key = self.resource_properties['Key']
-        self.body = self.resource_properties.get('Body', '')
         self.object_metadata = self.resource_properties.get('ObjectMetadata', {})
         self.content_type = self.resource_properties.get('ContentType', 'binary/octet-stream')  # copy AWS default
+        self.content_encoding = self.resource_properties.get('ContentEncoding', None)
+
+        self.copy_source = None
+        if 'SourceBucket' in self.resource_properties:
+            self.copy_source = {
+                'Bucket': self.resource_properties['SourceBucket'],
+                'Key': self.resource_properties['SourceKey'],
+            }
+            if 'SourceVersionId' in self.resource_properties:
+                self.copy_source['VersionId'] = self.resource_properties['SourceVersionId']
+            self.body = None
+        elif 'BodyBase64Gzip' in self.resource_properties:
+            self.body = base64.b64decode(self.resource_properties['BodyBase64Gzip'])
+            if self.content_encoding != 'gzip':
+                self.body = gzip.decompress(self.body)
+        else:
+            if self.content_encoding == 'gzip':
+                raise ValueError("ContentEncoding gzip needs gzipped content: use BodyBase64Gzip instead of Body")
+            body = self.resource_properties.get('Body', '')
+            if not isinstance(body, str):
+                body = json.dumps(body)
+            self.body = body.encode('utf-8')
+
+    def s3_client(self):
+        # Reused across warm invocations
+        return concurrency.client('s3', self.region)
+
+    def extra_args(self) -> dict:
+        args = {
+            'Metadata': self.object_metadata,
+            'ContentType': self.content_type,
+        }
+        if self.content_encoding is not None:
+            args['ContentEncoding'] = self.content_encoding
+        return args
 
-        if not isinstance(self.body, str):
-            self.body = json.dumps(self.body)
+    def head(self, s3_client):
+        """
+        :return: the head_object response, or None when the object does not exist
+        """
+        try:
+            return s3_client.head_object(Bucket=self.bucket, Key=self.key)
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def upload(self, s3_client) -> dict:
+        md5 = hashlib.md5(self.body)
+        sha256 = hashlib.sha256(self.body).hexdigest()
+        extra_args = self.extra_args()
+        extra_args['Metadata'] = dict(self.object_metadata, **{CHECKSUM_METADATA_KEY: sha256})
+
+        current = self.head(s3_client)
+        if current is not None and (
+                current['Metadata'].get(CHECKSUM_METADATA_KEY) == sha256 or
+                current['ETag'] == f'"{md5.hexdigest()}"'
+        ):
+            wanted_metadata = {key.lower(): value for key, value in extra_args['Metadata'].items()}  # As S3 returns them
+            if current['Metadata'] == wanted_metadata and \
+                    current.get('ContentType') == extra_args['ContentType'] and \
+                    current.get('ContentEncoding') == extra_args.get('ContentEncoding'):
+                print("Content and metadata unchanged, not uploading")
+            else:
+                print("Content unchanged, updating metadata")
+                s3_client.copy_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    CopySource={'Bucket': self.bucket, 'Key': self.key},
+                    MetadataDirective='REPLACE',
+                    **extra_args,
+                )
+            return {'ContentSha256': sha256}
+
+        if len(self.body) < MULTIPART_THRESHOLD:
+            s3_client.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=self.body,
+                ContentMD5=base64.b64encode(md5.digest()).decode('ascii'),
+                **extra_args,
+            )
+        else:
+            print(f"Uploading {len(self.body)} bytes in parts")
+            # The parts are checksummed by the transfer manager
+            s3_client.upload_fileobj(
+                io.BytesIO(self.body), self.bucket, self.key,
+                ExtraArgs=extra_args,
+                Config=TRANSFER_CONFIG,
+            )
+        return {'ContentSha256': sha256}
+
+    def copy(self, s3_client) -> None:
+        print(f"Copying s3://{self.copy_source['Bucket']}/{self.copy_source['Key']}")
+        extra_args = {
+            'Metadata': self.object_metadata,
+            'MetadataDirective': 'REPLACE',
+        }
+        explicit = {
+            name: self.resource_properties[name]
+            for name in COPIED_CONTENT_PROPERTIES
+            if name in self.resource_properties
+        }
+        if len(explicit) < len(COPIED_CONTENT_PROPERTIES):
+            # REPLACE (and a copy in parts) resets what is not given: keep the values of the source
+            source = s3_client.head_object(**self.copy_source)
+            extra_args.update({name: source[name] for name in COPIED_CONTENT_PROPERTIES if name in source})
+        extra_args.update(explicit)
+
+        # copy_object, or UploadPartCopy for large objects
+        s3_client.copy(
+            self.copy_source, self.bucket, self.key,
+            ExtraArgs=extra_args,
+            Config=TRANSFER_CONFIG,
+        )
 
     def create(self):
         self.physical_resource_id = f"{self.bucket}/{self.key}"
 
-        s3_client = self.get_boto3_session().client('s3', region_name=self.region)
-        s3_client.put_object(
-            Bucket=self.bucket,
-            Key=self.key,
-            Body=self.body.encode('utf-8'),
-            Metadata=self.object_metadata,
-            ContentType=self.content_type,
-        )
+        s3_client = self.s3_client()
+        if self.copy_source is not None:
+            self.copy(s3_client)
+            return {}
+        return self.upload(s3_client)
 
     def update(self):
         return self.create()
 
     def delete(self):
-        s3_client = self.get_boto3_session().client('s3', region_name=self.region)
+        s3_client = self.s3_client()
         s3_client.delete_object(
             Bucket=self.bucket,
             Key=self.key,
         )
 
 
-handler = S3Object.get_handler()
+handler = instrumentation.instrument_handler(S3Object.get_handler())
@@ -0,0 +1,111 @@
+import base64
+import hashlib
+
+import boto3.session
+import pytest
+from botocore.stub import Stubber
+
+from ..index import CHECKSUM_METADATA_KEY, S3Object
+
+BODY = b'content'
+SHA256 = hashlib.sha256(BODY).hexdigest()
+
+
+def s3_object(properties):
+    client = boto3.session.Session().client(
+        's3',
+        region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+    )
+    resource = S3Object()
+    resource.s3_client = lambda: client
+    resource.resource_properties = dict({'Bucket': 'bucket', 'Key': 'key'}, **properties)
+    resource.validate()
+    return resource, Stubber(client)
+
+
+def head_response(metadata, content_type='text/plain', etag='"other"'):
+    return {'Metadata': metadata, 'ContentType': content_type, 'ETag': etag}
+
+
+def test_unchanged_object_is_not_written():
+    resource, stubber = s3_object({'Body': 'content', 'ContentType': 'text/plain', 'ObjectMetadata': {'Team': 'x'}})
+    stubber.add_response('head_object', head_response({CHECKSUM_METADATA_KEY: SHA256, 'team': 'x'}),
+                         {'Bucket': 'bucket', 'Key': 'key'})
+    with stubber:
+        assert resource.create() == {'ContentSha256': SHA256}
+    stubber.assert_no_pending_responses()
+
+
+def test_unchanged_content_with_new_metadata_is_copied_onto_itself():
+    resource, stubber = s3_object({'Body': 'content', 'ContentType': 'text/plain', 'ObjectMetadata': {'Team': 'y'}})
+    stubber.add_response('head_object', head_response(
+        {'team': 'x'}, etag='"{}"'.format(hashlib.md5(BODY).hexdigest()),  # Uploaded before the checksum metadata
+    ))
+    stubber.add_response('copy_object', {}, {
+        'Bucket': 'bucket',
+        'Key': 'key',
+        'CopySource': {'Bucket': 'bucket', 'Key': 'key'},
+        'MetadataDirective': 'REPLACE',
+        'Metadata': {'Team': 'y', CHECKSUM_METADATA_KEY: SHA256},
+        'ContentType': 'text/plain',
+    })
+    with stubber:
+        resource.create()
+    stubber.assert_no_pending_responses()
+
+
+@pytest.mark.parametrize('current', ['missing', 'changed'])
+def test_new_content_is_put_with_md5(current):
+    resource, stubber = s3_object({'Body': 'content'})
+    if current == 'missing':
+        stubber.add_client_error('head_object', service_error_code='404', http_status_code=404)
+    else:
+        stubber.add_response('head_object', head_response({CHECKSUM_METADATA_KEY: 'old'}))
+    stubber.add_response('put_object', {}, {
+        'Bucket': 'bucket',
+        'Key': 'key',
+        'Body': BODY,
+        'ContentMD5': base64.b64encode(hashlib.md5(BODY).digest()).decode('ascii'),
+        'Metadata': {CHECKSUM_METADATA_KEY: SHA256},
+        'ContentType': 'binary/octet-stream',
+    })
+    with stubber:
+        assert resource.create() == {'ContentSha256': SHA256}
+    stubber.assert_no_pending_responses()
+    assert resource.physical_resource_id == 'bucket/key'
+
+
+def test_gzip_encoding_of_plain_body_is_rejected():
+    with pytest.raises(ValueError):
+        s3_object({'Body': 'content', 'ContentEncoding': 'gzip'})
+
+
+SOURCE = {'SourceBucket': 'source', 'SourceKey': 'source-key', 'SourceVersionId': 'v1'}
+
+
+@pytest.mark.parametrize('properties, expected', [
+    ({}, {'ContentType': 'text/html', 'ContentEncoding': 'gzip'}),  # As the source
+    ({'ContentType': 'text/plain'}, {'ContentType': 'text/plain', 'ContentEncoding': 'gzip'}),
+    ({'ContentType': 'text/plain', 'ContentEncoding': 'br'}, {'ContentType': 'text/plain', 'ContentEncoding': 'br'}),
+])
+def test_copy_keeps_content_type_and_encoding_of_source(properties, expected):
+    resource, stubber = s3_object(dict(SOURCE, ObjectMetadata={'Team': 'x'}, **properties))
+    source_head = dict(head_response({'team': 'source'}, content_type='text/html'),
+                       ContentEncoding='gzip', ContentLength=len(BODY))
+    copy_source = {'Bucket': 'source', 'Key': 'source-key', 'VersionId': 'v1'}
+    if len(properties) < 2:
+        stubber.add_response('head_object', source_head, copy_source)
+    stubber.add_response('head_object', source_head, copy_source)  # By the transfer manager, for the size
+    stubber.add_response('copy_object', {}, dict({
+        'Bucket': 'bucket',
+        'Key': 'key',
+        'CopySource': copy_source,
+        'MetadataDirective': 'REPLACE',
+        'Metadata': {'Team': 'x'},
+    }, **expected))
+    with stubber:
+        assert resource.create() == {}
+    stubber.assert_no_pending_responses()
+    assert resource.physical_resource_id == 'bucket/key'
@@ -1,7 +1,7 @@
 import datetime
 import hashlib
+import math
 import os
-import random
 import string
 import typing
 from distutils.util import strtobool
@@ -12,21 +12,105 @@ try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import instrumentation, tags
 
 REGION = os.environ['AWS_REGION']
 
 
-def generate_random(specs: dict) -> str:
-    length = int(specs.get('length', 22))
-    charset = specs.get('charset',
-                        string.ascii_uppercase +
-                        string.ascii_lowercase +
-                        string.digits)
-    r = ''.join([
-        random.SystemRandom().choice(charset)
-        for _ in range(length)
-    ])
-    return r
+CHARACTER_CLASSES = {
+    'uppercase': string.ascii_uppercase,
+    'lowercase': string.ascii_lowercase,
+    'digits': string.digits,
+    'symbols': string.punctuation,
+}
+
+
+def random_below(n: int, count: int) -> typing.List[int]:
+    """
+    Return `count` uniformly distributed random integers in [0, n).
+
+    Reads os.urandom in bulk, and rejects the values that would bias the
+    modulo (rejection sampling).
+    """
+    if n < 1:
+        raise ValueError("Can't pick from an empty set")
+    width = max(1, (n - 1).bit_length() + 7 >> 3)  # bytes per sample
+    space = 256 ** width
+    limit = space - space % n  # values >= limit would bias the result
+
+    result = []
+    while len(result) < count:
+        missing = count - len(result)
+        # Over-request by the expected rejection rate, plus a bit
+        batch = int(missing * space / limit) + 8
+        data = os.urandom(batch * width)
+        for i in range(0, len(data), width):
+            value = int.from_bytes(data[i:i + width], 'big') if width > 1 else data[i]
+            if value < limit:
+                result.append(value % n)
+                if len(result) == count:
+                    break
+    return result
+
+
+def generate_secret(
+        length: int,
+        charset: str,
+        exclude: str = '',
+        minimums: typing.Optional[typing.Dict[str, int]] = None,
+) -> typing.Tuple[str, float]:
+    """
+    Generate a random string of `length` characters from `charset`, with at
+    least `minimums[class]` characters of each of the CHARACTER_CLASSES.
+
+    :return: the string, and its entropy in bits. The entropy is a lower bound:
+             it ignores the positions of the required characters.
+    """
+    charset = ''.join(sorted(set(charset) - set(exclude)))
+    minimums = minimums or {}
+    if sum(minimums.values()) > length:
+        raise ValueError("Sum of the character class minimums exceeds the length")
+
+    pools = []  # (characters, count)
+    for cls, minimum in sorted(minimums.items()):
+        if minimum <= 0:
+            continue
+        cls_chars = ''.join(c for c in charset if c in CHARACTER_CLASSES[cls])
+        if len(cls_chars) == 0:
+            raise ValueError(f"No {cls} characters left in the charset")
+        pools.append((cls_chars, minimum))
+    pools.append((charset, length - sum(count for _, count in pools)))
+
+    chars = []
+    entropy = 0.0
+    for pool, count in pools:
+        chars.extend(pool[i] for i in random_below(len(pool), count))
+        entropy += count * math.log2(len(pool)) if count > 0 else 0.0
+
+    # Shuffle by sorting on random 64-bit keys, so the required characters end up anywhere
+    keys = os.urandom(8 * len(chars))
+    order = sorted(range(len(chars)), key=lambda i: keys[8 * i:8 * i + 8])
+    chars = [chars[i] for i in order]
+
+    return ''.join(chars), entropy
+
+
+def generate_random(specs: dict) -> typing.Tuple[str, float]:
+    """
+    :return: a random value according to the RandomValue specs, and its entropy in bits
+    """
+    return generate_secret(
+        length=int(specs.get('length', 22)),
+        charset=specs.get('charset',
+                          string.ascii_uppercase +
+                          string.ascii_lowercase +
+                          string.digits),
+        exclude=specs.get('exclude', ''),
+        minimums={
+            cls: int(specs.get(f"min_{cls}", 0))
+            for cls in CHARACTER_CLASSES.keys()
+        },
+    )
 
 
 class Parameter(CloudFormationCustomResource):
@@ -42,7 +126,12 @@ class Parameter(CloudFormationCustomResource):
             Set Value to a random string with these properties:
              - length: int: default=22
              - charset: string: default=ascii_lowercase + ascii_uppercase + digits
+             - exclude: string: characters to remove from the charset, default=''
+             - min_uppercase, min_lowercase, min_digits, min_symbols: int:
+               minimum number of characters of this class, default=0
              - anything-else: whatever: if it is changed, the value is regenerated
+            The (lower bound of the) entropy in bits of the generated value is
+            returned in the 'Entropy' attribute.
         Tags: list of {'Key': k, 'Value': v}: optional:
 
         ReturnValue: bool: optional: default False
@@ -77,9 +166,10 @@ class Parameter(CloudFormationCustomResource):
 
         self.value = self.resource_properties.get('Value', '')
         self.random_value = False
+        self.entropy = None
         if 'RandomValue' in self.resource_properties:
             self.random_value = True
-            self.value = generate_random(self.resource_properties['RandomValue'])
+            self.value, self.entropy = generate_random(self.resource_properties['RandomValue'])
 
         self.key_id = self.resource_properties.get('KeyId', None)
         self.tags = self.resource_properties.get('Tags', [])
@@ -92,6 +182,9 @@ class Parameter(CloudFormationCustomResource):
             'Arn': 'arn:aws:ssm:{}:{}:parameter{}'.format(REGION, account_id, self.name)
         }
 
+        if self.entropy is not None:
+            attr['Entropy'] = int(self.entropy)
+
         if self.return_value:
             attr['Value'] = self.value
 
@@ -121,46 +214,37 @@ class Parameter(CloudFormationCustomResource):
         }
         if self.key_id is not None:
             params['KeyId'] = self.key_id
+        if not overwrite and len(self.tags) > 0:
+            params['Tags'] = self.tags  # Not allowed in combination with Overwrite
 
         _ = ssm.put_parameter(**params)
         self.physical_resource_id = self.name
 
-        self.update_tags(self.tags)
-
         return self.attributes()
 
+    def is_up_to_date(self) -> bool:
+        """
+        Check if the current parameter already has the desired Value and Type.
+        SecureStrings are not compared: that would need decrypt permissions.
+        """
+        if self.type == 'SecureString':
+            return False
+        ssm = self.get_boto3_client('ssm')
+        try:
+            current = ssm.get_parameter(Name=self.name)['Parameter']
+        except ssm.exceptions.ParameterNotFound:
+            return False
+        return current['Type'] == self.type and current['Value'] == self.value
+
     def update_tags(self,
                     new_tags: typing.List[typing.Dict[str, str]],
                     old_tags: typing.List[typing.Dict[str, str]] = None
                     ) -> None:
-        if old_tags is None:
-            old_tags = []
-
-        ssm = self.get_boto3_client('ssm')
-
-        if len(old_tags) > 0:
-            new_tags_keys = {
-                tag['Key']: True
-                for tag in new_tags
-            }
-
-            to_delete = []
-
-            for tag in old_tags:
-                if tag['Key'] not in new_tags_keys:
-                    to_delete.append(tag['Key'])
-
-            if len(to_delete) > 0:
-                ssm.remove_tags_from_resource(
-                    ResourceType='Parameter',
-                    ResourceId=self.physical_resource_id,
-                    TagKeys=to_delete,
-                )
-
-        ssm.add_tags_to_resource(
-            ResourceType='Parameter',
-            ResourceId=self.physical_resource_id,
-            Tags=self.tags,
+        tags.reconcile(
+            tags.SsmParameterAdapter(self.get_boto3_client('ssm')),
+            self.physical_resource_id,
+            old=old_tags,
+            new=new_tags,
         )
 
     def create(self):
@@ -190,6 +274,14 @@ class Parameter(CloudFormationCustomResource):
             return self.create()
             # Old one will be deleted by CloudFormation
 
+        if need_put and not self.random_value and \
+                not self.has_property_changed('Description') and \
+                not self.has_property_changed('KeyId') and \
+                self.is_up_to_date():
+            # e.g. a rollback to a Value that was never overwritten
+            print("Parameter is already up to date")
+            need_put = False
+
         if need_put:
             print("Updating parameter")
             self.put_parameter(overwrite=True)
@@ -210,4 +302,4 @@ class Parameter(CloudFormationCustomResource):
             pass
 
 
-handler = Parameter.get_handler()
+handler = instrumentation.instrument_handler(Parameter.get_handler())
@@ -0,0 +1,28 @@
+"""
+Micro-benchmark of the RandomValue generator.
+
+Run from the lambda_code directory:
+
+    AWS_REGION=none python -m ssm.Parameter.test.benchmark_random
+"""
+import string
+import timeit
+
+from ..index import generate_secret
+
+CHARSET = string.ascii_letters + string.digits + string.punctuation
+
+
+def main():
+    for length, count in ((22, 10000), (64, 10000), (1024, 1000), (65536, 10)):
+        seconds = timeit.timeit(
+            lambda: generate_secret(length, CHARSET, minimums={'uppercase': 1, 'digits': 1, 'symbols': 1}),
+            number=count,
+        )
+        print(f"length {length:>6} x {count:>5}: {seconds:7.3f}s, "
+              f"{length * count / seconds / 1e6:6.2f}M chars/s, "
+              f"{count / seconds:9.0f} secrets/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import collections
+import string
+from unittest import mock
+
+import botocore.session
+import pytest
+from botocore.stub import Stubber
+
+from ..index import Parameter, generate_random, generate_secret, random_below
+
+
+def test_random_below_is_in_range():
+    for n in (1, 2, 7, 62, 256, 257, 70000):
+        values = random_below(n, 500)
+        assert len(values) == 500
+        assert all(0 <= v < n for v in values)
+
+
+def test_random_below_is_roughly_uniform():
+    counts = collections.Counter(random_below(3, 30000))
+    assert all(9000 < counts[i] < 11000 for i in range(3))
+
+
+def test_defaults():
+    value, entropy = generate_random({})
+    assert len(value) == 22
+    assert set(value) <= set(string.ascii_letters + string.digits)
+    assert entropy == pytest.approx(22 * 5.954, abs=0.01)  # log2(62) per character
+
+
+def test_minimums_and_exclude():
+    for _ in range(50):
+        value, _ = generate_random({
+            'length': 12,
+            'charset': string.ascii_letters + string.digits + '!@#',
+            'exclude': 'lIO0',
+            'min_uppercase': 2,
+            'min_digits': 3,
+            'min_symbols': 1,
+        })
+        assert len(value) == 12
+        assert not set(value) & set('lIO0')
+        assert sum(c in string.ascii_uppercase for c in value) >= 2
+        assert sum(c in string.digits for c in value) >= 3
+        assert sum(c in '!@#' for c in value) >= 1
+
+
+def test_impossible_specs():
+    with pytest.raises(ValueError):
+        generate_secret(4, string.digits, minimums={'digits': 5})
+    with pytest.raises(ValueError):
+        generate_secret(4, string.digits, minimums={'symbols': 1})
+
+
+def parameter(properties, old_properties=None):
+    resource = Parameter()
+    resource.BOTO3_CLIENTS = {'ssm': botocore.session.get_session().create_client(
+        'ssm',
+        region_name='eu-west-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+    )}
+    resource.context = mock.Mock(invoked_function_arn='arn:aws:lambda:eu-west-1:123456789012:function:f')
+    resource.resource_properties = properties
+    resource.old_resource_properties = old_properties or {}
+    resource.physical_resource_id = (old_properties or {}).get('Name')
+    resource.validate()
+    return resource, Stubber(resource.BOTO3_CLIENTS['ssm'])
+
+
+def test_create_with_tags():
+    resource, stubber = parameter({'Name': '/p', 'Value': 'v', 'Tags': [{'Key': 'team', 'Value': 'x'}]})
+    stubber.add_response('put_parameter', {'Version': 1}, {
+        'Name': '/p', 'Type': 'String', 'Value': 'v', 'Description': '', 'Overwrite': False,
+        'Tags': [{'Key': 'team', 'Value': 'x'}],
+    })
+    with stubber:
+        attributes = resource.create()
+    stubber.assert_no_pending_responses()
+    assert resource.physical_resource_id == '/p'
+    assert attributes == {'Arn': 'arn:aws:ssm:eu-west-1:123456789012:parameter/p'}
+
+
+def test_update_skips_put_when_up_to_date():
+    resource, stubber = parameter({'Name': '/p', 'Value': 'v'}, old_properties={'Name': '/p', 'Value': 'old'})
+    stubber.add_response('get_parameter', {'Parameter': {'Name': '/p', 'Type': 'String', 'Value': 'v'}})
+    with stubber:
+        resource.update()
+    stubber.assert_no_pending_responses()  # No put_parameter
+
+
+def test_update_puts_when_not_up_to_date():
+    resource, stubber = parameter({'Name': '/p', 'Value': 'v'}, old_properties={'Name': '/p', 'Value': 'old'})
+    stubber.add_client_error('get_parameter', service_error_code='ParameterNotFound')
+    stubber.add_response('put_parameter', {'Version': 2}, {
+        'Name': '/p', 'Type': 'String', 'Value': 'v', 'Description': '', 'Overwrite': True,
+    })
+    with stubber:
+        resource.update()
+    stubber.assert_no_pending_responses()
+
+
+def test_update_only_applies_tag_delta():
+    resource, stubber = parameter(
+        {'Name': '/p', 'Value': 'v', 'Tags': [{'Key': 'same', 'Value': '1'}, {'Key': 'changed', 'Value': 'new'}]},
+        old_properties={'Name': '/p', 'Value': 'v', 'Tags': [
+            {'Key': 'same', 'Value': '1'}, {'Key': 'changed', 'Value': 'old'}, {'Key': 'removed', 'Value': '3'},
+        ]},
+    )
+    stubber.add_response('remove_tags_from_resource', {}, {
+        'ResourceType': 'Parameter', 'ResourceId': '/p', 'TagKeys': ['removed'],
+    })
+    stubber.add_response('add_tags_to_resource', {}, {
+        'ResourceType': 'Parameter', 'ResourceId': '/p', 'Tags': [{'Key': 'changed', 'Value': 'new'}],
+    })
+    with stubber:
+        resource.update()  # No put_parameter: the value didn't change
+    stubber.assert_no_pending_responses()
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import typing
+
+from cfn_custom_resource import CloudFormationCustomResource
+
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+from _runtime import concurrency, instrumentation, retry, tags
+
+REGION = os.environ['AWS_REGION']
+DELETE_BATCH_SIZE = 10  # DeleteParameters limit
+MAX_WORKERS = 8
+
+
+def value_hash(value: str) -> str:
+    # Same as ssm.Parameter's ValueHash
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+class ParameterSet(CloudFormationCustomResource):
+    """
+    Properties:
+        Path: str: required: Prefix of all Parameters, e.g. "/my-service/config"
+        Parameters: dict: required: {name: value}; the Parameter is created
+            as Path + "/" + name
+        Type: enum["String", "StringList", "SecureString"]: optional:
+              default "String", applies to all Parameters
+        KeyId: str: optional: KMS key for SecureString
+        Description: str: optional: applies to all Parameters
+        Tags: list of {'Key': k, 'Value': v}: optional: applies to all Parameters
+
+    Only the Parameters that are added or changed are written, concurrently,
+    under a shared rate limiter that backs off when SSM throttles. Removed
+    Parameters are deleted in batches.
+
+    Attributes:
+        Value.<name>: the value (not for SecureString)
+        ValueHash.<name>: a hash of the value, changes whenever the value changes
+    """
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use Path instead
+
+    def validate(self):
+        self.path = '/' + self.resource_properties['Path'].strip('/')
+        self.parameters = self.resource_properties['Parameters']
+        self.type = self.resource_properties.get('Type', 'String')
+        self.key_id = self.resource_properties.get('KeyId', None)
+        self.description = self.resource_properties.get('Description', '')
+        self.tags = self.resource_properties.get('Tags', [])
+        self.limiter = retry.AdaptiveRateLimiter(rate=5)
+
+    def full_name(self, name: str, path: typing.Optional[str] = None) -> str:
+        return (path or self.path) + '/' + name.lstrip('/')
+
+    def attributes(self):
+        attr = {}
+        for name, value in sorted(self.parameters.items()):
+            if self.type != 'SecureString':
+                attr[f"Value.{name}"] = value
+            attr[f"ValueHash.{name}"] = value_hash(value)
+        return attr
+
+    def run(self, fn: typing.Callable, items: typing.Iterable) -> None:
+        """
+        Call fn for all items concurrently, under the rate limiter, and raise
+        the errors, if any.
+        """
+        ssm = self.get_boto3_client('ssm')
+        outcomes = concurrency.run_concurrently(
+            lambda item: retry.call(lambda: fn(ssm, item), self.limiter),
+            items,
+            max_workers=MAX_WORKERS,
+        )
+        errors = [f"{outcome.item}: {outcome.error}" for outcome in outcomes if outcome.error is not None]
+        if len(errors) > 0:
+            raise RuntimeError(f"{len(errors)} operations failed: " + "; ".join(errors))
+
+    def put_parameter(self, ssm, name: str, overwrite: bool) -> None:
+        params = {
+            'Name': self.full_name(name),
+            'Type': self.type,
+            'Value': self.parameters[name],
+            'Description': self.description,
+            'Overwrite': overwrite,
+        }
+        if self.key_id is not None:
+            params['KeyId'] = self.key_id
+        if not overwrite and len(self.tags) > 0:
+            params['Tags'] = self.tags  # Not allowed in combination with Overwrite
+        ssm.put_parameter(**params)
+
+    def put_parameters(self, names: typing.Iterable[str], overwrite: bool) -> None:
+        names = sorted(names)
+        if len(names) == 0:
+            return
+        print(f"Writing {len(names)} parameters under {self.path}")
+        self.run(lambda ssm, name: self.put_parameter(ssm, name, overwrite), names)
+
+    def delete_parameters(self, full_names: typing.Iterable[str]) -> None:
+        full_names = sorted(full_names)
+        if len(full_names) == 0:
+            return
+        print(f"Deleting {len(full_names)} parameters")
+        batches = [
+            full_names[i:i + DELETE_BATCH_SIZE]
+            for i in range(0, len(full_names), DELETE_BATCH_SIZE)
+        ]
+        self.run(lambda ssm, batch: ssm.delete_parameters(Names=batch), batches)
+        # Parameters that are already gone are returned as InvalidParameters, that's fine
+
+    def update_tags(self, names: typing.Iterable[str]) -> None:
+        delta = tags.diff(self.old_resource_properties.get('Tags'), self.tags)
+        if not delta.is_empty():
+            print("Updating tags")
+            self.run(
+                lambda ssm, name: tags.SsmParameterAdapter(ssm).apply(self.full_name(name), delta),
+                sorted(names),
+            )
+
+    def create(self):
+        # Set before writing: if the cleanup below fails too, delete() removes what's left
+        previous_physical_resource_id = self.physical_resource_id
+        self.physical_resource_id = self.path
+
+        created = []
+
+        def create_parameter(ssm, name):
+            self.put_parameter(ssm, name, overwrite=False)
+            created.append(name)
+
+        names = sorted(self.parameters.keys())
+        print(f"Writing {len(names)} parameters under {self.path}")
+        try:
+            self.run(create_parameter, names)
+        except Exception:
+            # Don't leave the created parameters behind. The others may not be ours,
+            # e.g. when they already existed, so delete() must not touch them.
+            print(f"Create failed, deleting the {len(created)} parameters that were created")
+            self.delete_parameters(self.full_name(name) for name in created)
+            self.physical_resource_id = previous_physical_resource_id
+            raise
+        return self.attributes()
+
+    def update(self):
+        if self.physical_resource_id != self.path:
+            return self.create()
+            # Old ones will be deleted by CloudFormation
+
+        old_parameters = self.old_resource_properties.get('Parameters', {})
+        rewrite_all = self.has_property_changed('Type') or \
+            self.has_property_changed('KeyId') or \
+            self.has_property_changed('Description')
+
+        added = [name for name in self.parameters if name not in old_parameters]
+        changed = [
+            name
+            for name, value in self.parameters.items()
+            if name in old_parameters and (rewrite_all or old_parameters[name] != value)
+        ]
+        removed = [name for name in old_parameters if name not in self.parameters]
+        print(f"{len(added)} parameters added, {len(changed)} changed, {len(removed)} removed")
+
+        self.put_parameters(added, overwrite=False)
+        self.put_parameters(changed, overwrite=True)
+        if self.has_property_changed('Tags'):
+            # Added parameters got the new tags on creation
+            self.update_tags(name for name in self.parameters if name not in added)
+        self.delete_parameters(self.full_name(name) for name in removed)
+
+        return self.attributes()
+
+    def delete(self):
+        if not self.physical_resource_id.startswith('/'):
+            return  # Create failed before writing anything
+        self.delete_parameters(
+            self.full_name(name, path=self.physical_resource_id)
+            for name in self.parameters
+        )
+
+
+handler = instrumentation.instrument_handler(ParameterSet.get_handler())
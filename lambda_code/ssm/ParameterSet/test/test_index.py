@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+
+from ..index import ParameterSet, value_hash
+
+
+class ApiError(Exception):
+    pass
+
+
+def parameter_set(properties, old_properties=None, physical_resource_id=None):
+    ssm = mock.Mock()
+    resource = ParameterSet()
+    resource.BOTO3_CLIENTS = {'ssm': ssm}
+    resource.resource_properties = properties
+    resource.old_resource_properties = old_properties or {}
+    resource.physical_resource_id = physical_resource_id
+    resource.validate()
+    return resource, ssm
+
+
+def written(ssm):
+    return {call[1]['Name']: call[1] for call in ssm.put_parameter.call_args_list}
+
+
+def test_create():
+    resource, ssm = parameter_set({
+        'Path': '/service/config/',
+        'Parameters': {'a': '1', 'b': '2'},
+        'Tags': [{'Key': 'team', 'Value': 'x'}],
+    })
+    attributes = resource.create()
+
+    assert resource.physical_resource_id == '/service/config'
+    assert sorted(written(ssm).keys()) == ['/service/config/a', '/service/config/b']
+    assert written(ssm)['/service/config/a']['Tags'] == [{'Key': 'team', 'Value': 'x'}]
+    assert not written(ssm)['/service/config/a']['Overwrite']
+    assert attributes == {
+        'Value.a': '1', 'ValueHash.a': value_hash('1'),
+        'Value.b': '2', 'ValueHash.b': value_hash('2'),
+    }
+
+
+def test_failed_create_deletes_only_the_created_parameters():
+    resource, ssm = parameter_set({'Path': '/p', 'Parameters': {'a': '1', 'b': '2', 'c': '3'}})
+
+    def put_parameter(Name, **kwargs):
+        if Name == '/p/b':
+            raise ApiError(f"{Name} already exists")
+    ssm.put_parameter.side_effect = put_parameter
+
+    with pytest.raises(RuntimeError):
+        resource.create()
+    ssm.delete_parameters.assert_called_once_with(Names=['/p/a', '/p/c'])
+    assert resource.physical_resource_id is None  # delete() won't touch /p/b
+
+
+def test_failed_cleanup_leaves_the_path_for_delete():
+    resource, ssm = parameter_set({'Path': '/p', 'Parameters': {'a': '1', 'b': '2'}})
+    def put_parameter(Name, **kwargs):
+        if Name == '/p/b':
+            raise ApiError("access denied")
+    ssm.put_parameter.side_effect = put_parameter
+    ssm.delete_parameters.side_effect = ApiError("access denied")
+
+    with pytest.raises(RuntimeError):
+        resource.create()
+    assert resource.physical_resource_id == '/p'
+
+
+def test_update_only_writes_the_difference():
+    resource, ssm = parameter_set(
+        {'Path': '/p', 'Parameters': {'same': '1', 'changed': 'new', 'added': '3'},
+         'Tags': [{'Key': 'k', 'Value': 'new'}]},
+        old_properties={'Path': '/p', 'Parameters': {'same': '1', 'changed': 'old', 'removed': '4'},
+                        'Tags': [{'Key': 'k', 'Value': 'old'}]},
+        physical_resource_id='/p',
+    )
+    resource.update()
+
+    puts = written(ssm)
+    assert sorted(puts.keys()) == ['/p/added', '/p/changed']
+    assert not puts['/p/added']['Overwrite'] and puts['/p/added']['Tags'] == [{'Key': 'k', 'Value': 'new'}]
+    assert puts['/p/changed']['Overwrite'] and 'Tags' not in puts['/p/changed']
+    ssm.delete_parameters.assert_called_once_with(Names=['/p/removed'])
+    # The added parameter got its tags on creation
+    assert sorted(call[1]['ResourceId'] for call in ssm.add_tags_to_resource.call_args_list) == \
+        ['/p/changed', '/p/same']
+
+
+def test_update_of_description_rewrites_everything():
+    resource, ssm = parameter_set(
+        {'Path': '/p', 'Parameters': {'a': '1', 'b': '2'}, 'Description': 'new'},
+        old_properties={'Path': '/p', 'Parameters': {'a': '1', 'b': '2'}},
+        physical_resource_id='/p',
+    )
+    resource.update()
+    assert sorted(written(ssm).keys()) == ['/p/a', '/p/b']
+    ssm.delete_parameters.assert_not_called()
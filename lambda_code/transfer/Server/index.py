@@ -1,5 +1,6 @@
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation
 
 API_GATEWAY_IDENTITY_PROVIDER = 'API_GATEWAY'
 
@@ -97,4 +98,4 @@ class Server(CloudFormationCustomResource):
         transfer_client.delete_server(ServerId=self.physical_resource_id)
 
 
-handler = Server.get_handler()
+handler = instrumentation.instrument_handler(Server.get_handler())
@@ -1,5 +1,6 @@
 from cfn_custom_resource import CloudFormationCustomResource
 from _metadata import CUSTOM_RESOURCE_NAME
+from _runtime import instrumentation
 
 
 class User(CloudFormationCustomResource):
@@ -75,4 +76,4 @@ class User(CloudFormationCustomResource):
         transfer_client.delete_user(ServerId=self.server_id, UserName=self.username)
 
 
-handler = User.get_handler()
+handler = instrumentation.instrument_handler(User.get_handler())